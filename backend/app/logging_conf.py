@@ -1,10 +1,161 @@
-import logging, sys
+"""
+logging_conf.py - Logs estruturados sem bloquear as requisições
+
+Quem loga (event loop ou threads dos executors) só enfileira o registro
+(QueueHandler); uma thread (QueueListener) formata e escreve no stdout.
+Com a fila cheia o registro é descartado e contado, nunca bloqueia.
+
+- LOG_FORMAT: json (padrão, uma linha por registro) ou text;
+- LOG_LEVELS: níveis por logger, ex.: "azure_blob=DEBUG,httpx=WARNING";
+- LOG_DEBUG_SAMPLE_RATE: fração dos DEBUG mantida, por mensagem (os logs
+  de cada upload/download do storage são DEBUG);
+- trace_id/span_id do span atual (tracing) vão em cada registro.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Optional
+
+import orjson
+
 from .settings import settings
+from .services import tracing
+
+# Atributos padrão do LogRecord: o resto veio de extra= e vai para o JSON
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# Loggers de bibliotecas que logam a cada requisição
+_DEFAULT_LEVELS = {
+    "azure.core.pipeline.policies.http_logging_policy": "WARNING",
+    "httpx": "WARNING",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class TraceContextFilter(logging.Filter):
+    """Anexa trace_id/span_id do span atual ao registro ("-" fora de trace)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id, span_id = tracing.current_ids()
+        record.trace_id = trace_id or "-"
+        record.span_id = span_id or "-"
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Mantém 1 a cada N registros DEBUG de cada mensagem (N = 1 / taxa)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        key = (record.name, record.msg)
+        seen = self._counts.get(key, 0)
+        self._counts[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enfileira sem esperar; descartes são informados no próximo registro."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mensagem e traceback resolvidos aqui: os args podem mudar depois e
+        # o traceback não atravessa a fila
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        if self.dropped:
+            record.dropped_before, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "trace_id", "-") != "-":
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in ("trace_id", "span_id"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
 
 def configure_logging():
-    level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+    global _listener
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "text":
+        formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | trace=%(trace_id)s | %(message)s")
+    else:
+        formatter = JsonFormatter()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    # Filtros rodam em quem loga: é lá que está o contexto do span
+    handler.addFilter(TraceContextFilter())
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    for name, level in {**_DEFAULT_LEVELS, **_parse_levels(settings.LOG_LEVELS)}.items():
+        logging.getLogger(name).setLevel(level)
+
+    # Logs do uvicorn (inclusive o access log) pela mesma fila
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,5 +1,7 @@
 # app/main.py (VERSÃO CORRIGIDA E COMPATÍVEL + CORS FIX)
 
+import asyncio
+
 from fastapi import FastAPI, Request, APIRouter, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import update
@@ -8,24 +10,39 @@ from jose import jwt, JWTError
 from prometheus_client import make_asgi_app
 
 from app.settings import settings
+from app.responses import ORJSONResponse
 from app.logging_conf import configure_logging
-from app.services.db import engine, async_session_maker, init_db 
+from app.services.db import async_session_maker
 from app.errors import botocore_error_handler, generic_error_handler
+from app.services import face_registry, storage, storage_aio, storage_catalog, jobs, renditions, http_cache, pubsub, \
+    event_cache, retention, instrumentation, tracing, profiling, db, face, passwords
+from app.services import metrics as usage_metrics
+from app.services.resources import ResourceRegistry
+from app.services.storage import get_bucket_raw
 from botocore.exceptions import BotoCoreError, ClientError
 
 from app.routes import health, events, ingest, search, admin, privacy, users, metrics, auth, uploads, sessions, \
-    users_me, gallery, photos, comments, dowload_link
+    users_me, gallery, photos, comments, dowload_link, stream
 from app.schemas.session import active_sessions_table
 from app.security.jwt import SECRET_KEY, ALGORITHM
 
 # --- Configuração Inicial ---
 configure_logging()
+resources = ResourceRegistry()
 app = FastAPI(
     title="Face Event MVP",
     description="API para gerenciamento de eventos e reconhecimento facial.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=resources.lifespan,
 )
 
+# --- Cache HTTP (ETag/304) das rotas de leitura ---
+# Registrado antes do CORS: fica por dentro dele, então as respostas em
+# cache também recebem os headers de CORS. Fica também por dentro do
+# last_seen: um hit autenticado ainda faz o UPDATE da sessão.
+app.middleware("http")(http_cache.middleware)
+
 # --- Middleware CORS ---
 origins = settings.CORS_ALLOW_ORIGINS.split(",") if settings.CORS_ALLOW_ORIGINS != "*" else ["*"]
 app.add_middleware(
@@ -59,22 +76,83 @@ async def update_last_seen_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# --- Perfil de uma requisição sob demanda (header X-Profile, só admin) ---
+app.add_middleware(profiling.ProfileRequestMiddleware)
+
+# --- Métricas por rota (registrado por último: mede todos os middlewares) ---
+app.add_middleware(instrumentation.RequestMetricsMiddleware)
+# Span raiz de cada requisição (mais externo: logs de todos os middlewares levam o trace_id)
+app.add_middleware(tracing.TracingMiddleware)
+
 # --- Middleware OPTIONS preflight ---
 @app.options("/{full_path:path}")
 async def preflight_handler(full_path: str):
     return Response(status_code=200)
 
-# --- Eventos de startup/shutdown ---
-@app.on_event("startup")
-async def on_startup():
-    pass
-
-@app.on_event("shutdown")
-async def on_shutdown():
-    await engine.dispose() 
+# --- Recursos do ciclo de vida (startup/shutdown) ---
+# Estágio 0: base; estágio 1: sobe em paralelo; estágio 2: jobs (usam os anteriores)
+async def _warm_face_registry():
+    # Pré-carrega as collections de faces já provisionadas (evita checagens no provider)
+    async with async_session_maker("jobs") as session:
+        await face_registry.warm_up(session)
+
+
+async def _load_event_cache():
+    # Catálogo de eventos em memória (leituras de eventos não vão ao banco)
+    async with async_session_maker("jobs") as session:
+        await event_cache.load(session)
+
+
+async def _ensure_containers():
+    # Valida/cria os containers uma única vez; as rotas não checam existência
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, storage.ensure_containers, [get_bucket_raw()])
+
+
+async def _prewarm_face_provider():
+    # Só o provider configurado é importado (e tem o cliente criado), fora do event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, face.startup)
+
+
+def _start_jobs():
+    # Reconciliador do catalogo de objetos (um worker por rodada, via advisory lock)
+    jobs.run_periodic(
+        "storage_catalog_reconcile",
+        settings.STORAGE_CATALOG_RECONCILE_SECONDS,
+        lambda session: storage_catalog.reconcile(session, get_bucket_raw()),
+    )
+    # Renditions de fotos antigas (ou que falharam no upload)
+    jobs.run_periodic("renditions_backfill", settings.RENDITION_BACKFILL_SECONDS, renditions.backfill)
+    # Expurgo de dados expirados (desligado por padrão)
+    jobs.run_periodic(
+        "retention",
+        settings.RETENTION_INTERVAL_SECONDS if settings.RETENTION_ENABLED else 0,
+        lambda session: retention.run(session, dry_run=False),
+    )
+
+
+# Executor padrão instrumentado e amostragem das filas dos executors
+resources.add("instrumentation", instrumentation.startup, instrumentation.shutdown)
+resources.add("database", db.startup, db.dispose_engine, critical=True)
+# Réplicas de leitura: primeira checagem de atraso antes do tráfego
+resources.add("db_replicas", db.start_replica_monitor, db.stop_replica_monitor, stage=1)
+resources.add("face_registry", _warm_face_registry, stage=1)
+resources.add("event_cache", _load_event_cache, stage=1)
+resources.add("storage_containers", _ensure_containers, stage=1)
+# Cliente assíncrono de storage com pool de conexões próprio
+resources.add("storage_aio", storage_aio.startup, storage_aio.shutdown, stage=1)
+resources.add("face_provider", _prewarm_face_provider, stage=1)
+# Ponte LISTEN/NOTIFY: feed SSE e invalidação de caches entre workers
+resources.add("pubsub", pubsub.startup, pubsub.shutdown, stage=1)
+resources.add("renditions", stop=renditions.shutdown, stage=1)
+resources.add("passwords", stop=passwords.shutdown, stage=1)
+resources.add("metrics_queue", usage_metrics.startup, usage_metrics.shutdown, stage=1)
+resources.add("jobs", _start_jobs, jobs.shutdown, stage=2)
 
 # --- Prometheus Metrics ---
-metrics_app = make_asgi_app()
+# Em multiprocess (PROMETHEUS_MULTIPROC_DIR) agrega todos os workers
+metrics_app = make_asgi_app(registry=instrumentation.registry())
 app.mount("/metrics", metrics_app)
 
 # --- Rotas ---
@@ -91,6 +169,7 @@ api_router.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(users_me.router, prefix="/users", tags=["Users Me"])
 app.include_router(gallery.router, prefix="/gallery", tags=["Gallery"])
 app.include_router(comments.router, prefix="/comments", tags=["Comments"])
+app.include_router(stream.router, prefix="/stream", tags=["Stream"])
 app.include_router(dowload_link.router, prefix="/download", tags=["Download"])
 
 app.include_router(photos.router, prefix="/photos", tags=["Photos"])
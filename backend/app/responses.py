@@ -0,0 +1,42 @@
+"""
+responses.py - Serialização JSON com orjson
+
+- ORJSONResponse é a resposta padrão da app (main.py).
+- rows_to_json() codifica linhas do banco direto em bytes JSON, sem criar
+  um modelo Pydantic por linha. Usar só em listagens de leitura cujas
+  colunas já batem com o schema de saída (dados confiáveis do banco).
+"""
+
+from typing import Any, Callable, Iterable, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+
+# UUID, datetime/date/time, enums e dataclasses são nativos do orjson
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=_OPTIONS)
+
+
+def rows_to_json(rows: Iterable, extra: Optional[Callable[[dict], dict]] = None) -> bytes:
+    """
+    Linhas (Row do SQLAlchemy) -> bytes JSON de uma lista de objetos.
+    `extra(row_dict)` pode acrescentar campos calculados (ex.: URLs assinadas).
+    """
+    items = []
+    for row in rows:
+        item = row._asdict()
+        if extra is not None:
+            item.update(extra(item))
+        items.append(item)
+    return dumps(items)
+
+
+class JSONBytesResponse(Response):
+    """Resposta com corpo JSON já serializado (bytes)."""
+    media_type = "application/json"
+
+
+__all__ = ["ORJSONResponse", "JSONBytesResponse", "dumps", "rows_to_json"]
@@ -1,16 +1,26 @@
+import asyncio
+import os
 import secrets
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, case
-from typing import List, Literal
+from typing import List, Literal, Optional
+import uuid
 from pydantic import BaseModel
 from datetime import datetime, timezone, timedelta
 
 # Import de serviços
-from app.services.db import get_conn
+from app.services.db import get_conn, get_read_conn
 from app.services import events as event_service
 from app.services import downloads as downloads_service
+from app.services import event_cache
+from app.services import bulk_delete
+from app.services import retention
+from app.services import tracing
+from app.services import profiling
+from app.settings import settings
 
 # Import de schemas e tabelas
 from app.schemas.event import CreateEventIn, EventOut, UpdateEventIn, events_table
@@ -28,6 +38,22 @@ class DownloadLinkOut(BaseModel):
     """Schema para a resposta da geração de link."""
     url: str
 
+class BulkDeleteIn(BaseModel):
+    """Critérios da remoção em lote (informe ao menos um)."""
+    photo_ids: Optional[List[uuid.UUID]] = None
+    uploader_id: Optional[uuid.UUID] = None
+    all: bool = False
+    include_media: bool = False
+
+class BulkDeleteOut(BaseModel):
+    status: Literal["done", "queued"]
+    job_id: Optional[str] = None
+    photos: int
+    media: int
+    objects: int = 0
+    faces: int = 0
+    failed_keys: List[str] = []
+
 class RawMetricOut(BaseModel):
     """Schema para a resposta da rota de atividade bruta (gráfico)."""
     # ✅ FIX: Adicionado 'upload_media' à lista de tipos permitidos
@@ -39,8 +65,10 @@ class RawMetricOut(BaseModel):
 # --- ROTAS DE EVENTOS (sem alterações) ---
 
 @router.get("/events", response_model=List[EventOut])
-async def list_events(conn: AsyncSession = Depends(get_conn)):
+async def list_events(conn: AsyncSession = Depends(get_read_conn)):
     """Lista todos os eventos cadastrados."""
+    if event_cache.is_loaded():
+        return event_cache.list_by_date_desc()
     result = await conn.execute(select(events_table).order_by(events_table.c.event_date.desc()))
     rows = result.mappings().all()
     return [EventOut.model_validate(row) for row in rows]
@@ -59,6 +87,103 @@ async def update_event(slug: str, payload: UpdateEventIn, conn: AsyncSession = D
     return updated_event
 
 
+@router.post("/events/{slug}/photos/bulk-delete", response_model=BulkDeleteOut)
+async def bulk_delete_photos(slug: str, payload: BulkDeleteIn, conn: AsyncSession = Depends(get_conn)):
+    """
+    Remove fotos (por ids, por fotógrafo ou o evento inteiro) e, opcionalmente,
+    as mídias. Conjuntos grandes rodam em background.
+    """
+    if not (payload.photo_ids or payload.uploader_id or payload.all):
+        raise HTTPException(status_code=400, detail="Informe photo_ids, uploader_id ou all=true")
+    if payload.include_media and payload.photo_ids:
+        # photo_ids só seleciona fotos; mídias saem por uploader_id ou all=true
+        raise HTTPException(status_code=400, detail="include_media não pode ser combinado com photo_ids")
+
+    selection = bulk_delete.Selection(
+        event_slug=slug,
+        photo_ids=payload.photo_ids,
+        uploader_id=payload.uploader_id,
+        whole_event=payload.all,
+        include_media=payload.include_media,
+    )
+    photos, media = await bulk_delete.count(conn, selection)
+    if photos + media > settings.BULK_DELETE_SYNC_LIMIT:
+        job_id = bulk_delete.start_job(selection)
+        return BulkDeleteOut(status="queued", job_id=job_id, photos=photos, media=media)
+
+    result = await bulk_delete.run(conn, selection)
+    return BulkDeleteOut(
+        status="done",
+        photos=result.photos,
+        media=result.media,
+        objects=result.objects,
+        faces=result.faces,
+        failed_keys=result.failed_keys,
+    )
+
+
+# --- RETENÇÃO ---
+
+@router.get("/retention/report")
+async def retention_report(conn: AsyncSession = Depends(get_conn)):
+    """Dry-run: o que a próxima rodada de retenção removeria."""
+    return await retention.run(conn, dry_run=True)
+
+@router.post("/retention/run")
+async def retention_run(conn: AsyncSession = Depends(get_conn)):
+    """Executa uma rodada de retenção agora (mesmo com o agendamento desligado)."""
+    return await retention.run(conn, dry_run=False)
+
+
+# --- TRACES ---
+
+@router.get("/traces")
+async def list_traces(limit: int = 50):
+    """Traces amostradas recentes deste worker (lentas, com erro ou sorteadas)."""
+    return tracing.recent(min(max(limit, 1), settings.TRACE_BUFFER_SIZE))
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Spans de uma trace amostrada (o id vem no header traceparent da resposta)."""
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace nao encontrada neste worker")
+    return trace
+
+
+# --- PROFILING ---
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+        seconds: float = Query(10, gt=0),
+        mode: Literal["wall", "cpu"] = "wall",
+        hz: Optional[int] = Query(None, ge=1, le=1000),
+        conn: AsyncSession = Depends(get_conn),
+):
+    """
+    Amostra o worker que atendeu por `seconds` (máx. PROFILE_MAX_SECONDS) e
+    devolve as pilhas no formato collapsed (flamegraph.pl / speedscope).
+    """
+    # Não segura uma conexão do pool durante a amostragem
+    await conn.close()
+    loop = asyncio.get_running_loop()
+    try:
+        text, samples = await loop.run_in_executor(None, profiling.profile, seconds, mode, hz)
+    except profiling.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="Ja existe um perfil em andamento neste worker")
+    return PlainTextResponse(text, headers={
+        "Content-Disposition": f'attachment; filename="profile-{mode}-{os.getpid()}.collapsed"',
+        "X-Profile-Samples": str(samples),
+        "X-Profile-Pid": str(os.getpid()),
+    })
+
+@router.get("/tasks")
+async def dump_tasks():
+    """Tasks asyncio pendentes do worker que atendeu e o que cada uma aguarda."""
+    tasks = profiling.dump_tasks()
+    return {"pid": os.getpid(), "count": len(tasks), "tasks": tasks}
+
+
 # --- GERAÇÃO DE LINK PARA DOWNLOAD (sem alterações) ---
 
 # ✅ response_model usa o DownloadLinkOut importado, que contém url, password e expires_at
@@ -67,7 +192,7 @@ async def generate_download_link(slug: str, conn: AsyncSession = Depends(get_con
     password = secrets.token_hex(3)
     expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
 
-    zip_url = await downloads_service.generate_event_photos_zip_url(slug)
+    zip_url = await downloads_service.generate_event_photos_zip_url(conn, slug)
 
     await conn.execute(
         download_links_table.insert().values(
@@ -86,7 +211,7 @@ async def generate_download_link(slug: str, conn: AsyncSession = Depends(get_con
         "expires_at": expires_at,
     }
 @router.get("/metrics", response_model=List[AdminMetricSummary])
-async def all_aggregated_metrics(conn: AsyncSession = Depends(get_conn)):
+async def all_aggregated_metrics(conn: AsyncSession = Depends(get_read_conn)):
     """
     Lista métricas de engajamento agregadas por usuário para TODOS os eventos.
     Usa LEFT JOIN para incluir usuários sem métricas.
@@ -118,7 +243,7 @@ async def all_aggregated_metrics(conn: AsyncSession = Depends(get_conn)):
     return result.mappings().all()
 
 @router.get("/metrics/activity", response_model=List[RawMetricOut])
-async def get_raw_activity_metrics(conn: AsyncSession = Depends(get_conn)):
+async def get_raw_activity_metrics(conn: AsyncSession = Depends(get_read_conn)):
     """
     Retorna uma lista de métricas brutas (não agregadas) para
     alimentar o gráfico de atividade em tempo real no dashboard.
@@ -134,7 +259,7 @@ async def get_raw_activity_metrics(conn: AsyncSession = Depends(get_conn)):
     return result.mappings().all()
 
 @router.get("/events/{event_slug}/metrics", response_model=List[AdminMetricSummary])
-async def event_metrics_by_slug(event_slug: str, conn: AsyncSession = Depends(get_conn)):
+async def event_metrics_by_slug(event_slug: str, conn: AsyncSession = Depends(get_read_conn)):
     """
     Lista métricas de engajamento para TODOS os usuários de um evento específico.
     """
@@ -171,7 +296,7 @@ async def event_metrics_by_slug(event_slug: str, conn: AsyncSession = Depends(ge
 # --- ROTAS DE USUÁRIOS (sem alterações) ---
 
 @router.get("/users/{event_slug}", response_model=List[UserOut])
-async def users_by_event(event_slug: str, conn: AsyncSession = Depends(get_conn)):
+async def users_by_event(event_slug: str, conn: AsyncSession = Depends(get_read_conn)):
     """Lista todos os usuários detalhados de um evento específico."""
     result = await conn.execute(
         select(users_table).where(users_table.c.event_slug == event_slug)
@@ -2,25 +2,17 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Form, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert
-from passlib.hash import bcrypt
+from sqlalchemy import insert
 import uuid
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from app.services.db import get_conn
-from app.schemas.user import users_table, UserOut, UserRole
+from app.schemas.user import UserOut, UserRole
 from app.schemas.session import active_sessions_table
 from app.security.jwt import create_access_token, require_any_user
+from app.services.users import authenticate_user
 
 router = APIRouter()
 
-# Executor para operações bloqueantes de autenticação (bcrypt)
-_auth_executor = ThreadPoolExecutor(
-    max_workers=20,
-    thread_name_prefix="auth_worker"
-)
-
 
 @router.post("/login", status_code=status.HTTP_200_OK)
 async def login(
@@ -29,24 +21,11 @@ async def login(
         password: str = Form(...),
         conn: AsyncSession = Depends(get_conn),
 ):
-    stmt = select(users_table).where(users_table.c.email == email)
-    result = await conn.execute(stmt)
-    user_from_db = result.mappings().first()
-
-    # Verificação básica de existência do usuário
-    if not user_from_db or not user_from_db["password_hash"]:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
-
-    # Mover bcrypt.verify para thread pool (operação bloqueante)
-    loop = asyncio.get_running_loop()
-    password_valid = await loop.run_in_executor(
-        _auth_executor,
-        bcrypt.verify,
-        password,
-        user_from_db["password_hash"]
-    )
+    # bcrypt no pool de processos (services/passwords); um hash com custo
+    # antigo é refeito e gravado no commit junto com a sessão
+    user_from_db = await authenticate_user(conn, email, password)
 
-    if not password_valid:
+    if not user_from_db:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
 
     jti = str(uuid.uuid4())
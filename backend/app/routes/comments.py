@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert, func
 from uuid import uuid4
-from app.services.db import get_conn
+from app.services.db import get_conn, get_read_conn
+from app.services import http_cache, feed
+from app.responses import JSONBytesResponse, rows_to_json
 from app.schemas.comments import comments_table, CommentIn, CommentResponse
 from app.schemas.user import users_table
 
@@ -23,6 +25,7 @@ async def create_comment(comment: CommentIn, session: AsyncSession = Depends(get
         )
     )
     await session.commit()
+    http_cache.bump(f"comments:{comment.event_slug}")
 
     result = await session.execute(
         select(comments_table).where(comments_table.c.id == new_id)
@@ -32,12 +35,14 @@ async def create_comment(comment: CommentIn, session: AsyncSession = Depends(get
     if not created_comment:
         raise HTTPException(status_code=500, detail="Erro ao criar comentário")
 
-    return CommentResponse(**created_comment._mapping)
+    response = CommentResponse(**created_comment._mapping)
+    await feed.publish(comment.event_slug, feed.COMMENT_ADDED, response.model_dump(mode="json"))
+    return response
 
 
 # --- Listar comentários de um evento com nome + sobrenome do usuário ---
 @router.get("/{event_slug}", response_model=list[CommentResponse])
-async def list_comments(event_slug: str, session: AsyncSession = Depends(get_conn)):
+async def list_comments(event_slug: str, session: AsyncSession = Depends(get_read_conn)):
     result = await session.execute(
         select(
             comments_table.c.id,
@@ -53,5 +58,5 @@ async def list_comments(event_slug: str, session: AsyncSession = Depends(get_con
         .order_by(comments_table.c.created_at.desc())
     )
 
-    comments = result.fetchall()
-    return [CommentResponse(**c._mapping) for c in comments]
+    # Caminho rápido: as colunas já são as do CommentResponse
+    return JSONBytesResponse(rows_to_json(result.fetchall()))
@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.event import CreateEventIn, EventOut
-from app.services.db import get_conn
+from app.services.db import get_read_conn
 from app.services.events import create_event as create_event_service
-from app.services.events import get_event_by_slug as get_event_by_slug_service
+from app.services.events import get_event_json
 from app.services.events import list_events
+from app.services import event_cache
 from typing import List
 router = APIRouter()
 
 
 @router.get("/{slug}", response_model=EventOut)
-async def get_event(slug: str, conn: AsyncSession = Depends(get_conn)):
-    event = await get_event_by_slug_service(conn, slug)
+async def get_event(slug: str, conn: AsyncSession = Depends(get_read_conn)):
+    # JSON pré-serializado do catálogo em memória (sem banco nem Pydantic)
+    event = await get_event_json(conn, slug)
     if not event:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
-    return event
+    return Response(content=event, media_type="application/json")
 
 # Listar eventos
 @router.get("", response_model=List[EventOut])
-async def events_list(conn: AsyncSession = Depends(get_conn)):
+async def events_list(conn: AsyncSession = Depends(get_read_conn)):
+    if event_cache.is_loaded():
+        return Response(content=event_cache.list_json(), media_type="application/json")
     return await list_events(conn)
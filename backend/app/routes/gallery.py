@@ -1,33 +1,45 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.services.storage import list_keys_in_prefix, presign_get, get_bucket_raw
-from app.services.db import get_conn
+from typing import Optional
+from app.services.storage import presign_get, get_bucket_raw
+from app.services.storage_catalog import list_keys
+from app.services.db import get_read_conn
 
 router = APIRouter()
 
 @router.get("/{event_slug}/general")
-async def list_general_photos(event_slug: str, conn: AsyncSession = Depends(get_conn)):
+async def list_general_photos(
+    event_slug: str,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    conn: AsyncSession = Depends(get_read_conn),
+):
     """
-    Lista as fotos gerais de um evento e gera URLs pre-assinadas.
+    Lista as fotos gerais de um evento (via catalogo; limit/offset opcionais) e gera URLs pre-assinadas.
     """
     try:
         bucket = get_bucket_raw()
         folder = f"{event_slug}/general/"
-        keys = list_keys_in_prefix(bucket, folder)
+        keys = await list_keys(conn, bucket, folder, limit=limit, offset=offset)
         files = [{"key": key, "url": presign_get(bucket, key)} for key in keys]
         return files
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar fotos: {e}")
 
 @router.get("/{event_slug}/videos")
-async def list_event_videos(event_slug: str, conn: AsyncSession = Depends(get_conn)):
+async def list_event_videos(
+    event_slug: str,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    conn: AsyncSession = Depends(get_read_conn),
+):
     """
-    Lista os videos de um evento e gera URLs pre-assinadas.
+    Lista os videos de um evento (via catalogo; limit/offset opcionais) e gera URLs pre-assinadas.
     """
     try:
         bucket = get_bucket_raw()
         folder = f"{event_slug}/videos/"
-        keys = list_keys_in_prefix(bucket, folder)
+        keys = await list_keys(conn, bucket, folder, limit=limit, offset=offset)
         files = [{"key": key.split("/")[-1], "url": presign_get(bucket, key)} for key in keys]
         return files
     except Exception as e:
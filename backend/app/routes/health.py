@@ -1,6 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from app.services import storage
+
 router = APIRouter()
 
 @router.get("/health")
-def health():
-    return {"ok": True}
+def health(response: Response):
+    # Status dos containers validados no startup; so os que falharam sao
+    # revalidados (com backoff). Antes da validacao terminar ainda nao esta pronto
+    containers = storage.recheck_failed_containers()
+    ok = bool(containers) and all(status["ok"] for status in containers.values())
+    if not ok:
+        response.status_code = 503
+    return {"ok": ok, "storage": containers}
@@ -1,6 +1,8 @@
-﻿import time
+﻿import asyncio
+import logging
+import time
 import uuid
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,13 +10,15 @@ from sqlalchemy import insert
 
 from app.schemas.media import media_table, MediaTypeDB
 from app.services.db import get_conn
-from app.services.storage import put_bytes, get_bucket_raw, make_object_key, delete_object
+from app.services.storage import get_bucket_raw, make_object_key
+from app.services import storage_aio
 from app.services.face import index_s3_object, sanitize_key_for_rekognition
 from app.services.metrics import track
 import enum
 import imghdr
 
 router = APIRouter()
+log = logging.getLogger("ingest")
 
 MAX_SIZE_MB = 1000
 MAX_MEDIA_SIZE_MB = 3000
@@ -28,9 +32,10 @@ ALLOWED_IMAGE_FORMATS = {"jpeg", "png", "jpg"}
 ALLOWED_VIDEO_FORMATS = {"mp4", "mov", "avi", "mkv"}
 
 
-def _validate_media_file(media_type: MediaType, data: bytes, filename: str):
+def _validate_media_file(media_type: MediaType, data: bytes, filename: str, size: Optional[int] = None):
     """Valida fotos gerais e videos com regras mais flexiveis."""
-    if len(data) > MAX_MEDIA_SIZE_MB * 1024 * 1024:
+    size = len(data) if size is None else size
+    if size > MAX_MEDIA_SIZE_MB * 1024 * 1024:
         raise HTTPException(status_code=413, detail=f"O arquivo '{filename}' excede o limite de {MAX_MEDIA_SIZE_MB}MB.")
 
     if media_type == MediaType.GENERAL:
@@ -63,8 +68,10 @@ async def ingest_photo(
     original_key = make_object_key(event_slug, file.filename or "image.jpg")
     safe_key = sanitize_key_for_rekognition(original_key.replace("/", "_"))
 
-    put_bytes(bucket, safe_key, data, file.content_type or "image/jpeg")
-    index_s3_object(event_slug, bucket, safe_key)
+    await storage_aio.put_bytes(bucket, safe_key, data, file.content_type or "image/jpeg")
+    await asyncio.get_running_loop().run_in_executor(
+        None, lambda: index_s3_object(event_slug, bucket, safe_key)
+    )
 
     await track(
         conn,
@@ -86,40 +93,52 @@ async def ingest_media(
     conn: AsyncSession = Depends(get_conn),
 ):
     successful_keys = []
+    uploaded = []
     bucket = get_bucket_raw()
 
     for file in files:
         try:
-            data = await file.read()
-            _validate_media_file(media_type, data, file.filename)
-
             sanitized_name = sanitize_key_for_rekognition(file.filename)
             ts = int(time.time())
             folder_name = media_type.value
             s3_key = f"{event_slug}/{folder_name}/{ts}-{uuid.uuid4().hex}-{sanitized_name}"
 
-            put_bytes(bucket, s3_key, data, file.content_type)
-
-            stmt = insert(media_table).values(
-                event_slug=event_slug,
-                media_type=media_type.value,
-                s3_key=s3_key,
-            )
+            if media_type == MediaType.VIDEOS:
+                # Videos (ate GBs) vao em streaming, em blocos paralelos, sem ler tudo em memoria
+                size = file.size
+                _validate_media_file(media_type, b"", file.filename, size=size or 0)
+                await storage_aio.put_stream(bucket, s3_key, file, file.content_type, length=size)
+            else:
+                data = await file.read()
+                size = len(data)
+                _validate_media_file(media_type, data, file.filename)
+                await storage_aio.put_bytes(bucket, s3_key, data, file.content_type)
+
+            uploaded.append((file.filename, size, s3_key))
+
+        except Exception:
+            log.exception("Erro ao processar %r", file.filename)
+            raise
 
-            await conn.execute(stmt)
+    # Registros so depois dos uploads: a sessao nao segura uma conexao do
+    # pool enquanto os arquivos (videos de GBs) sobem
+    for filename, size, s3_key in uploaded:
+        stmt = insert(media_table).values(
+            event_slug=event_slug,
+            media_type=media_type.value,
+            s3_key=s3_key,
+        )
 
-            await track(
-                conn,
-                action="upload_media",
-                event_slug=event_slug,
-                data={"filename": file.filename, "size": len(data), "media_type": media_type.value, "s3_key": s3_key},
-            )
+        await conn.execute(stmt)
 
-            successful_keys.append(s3_key)
+        await track(
+            conn,
+            action="upload_media",
+            event_slug=event_slug,
+            data={"filename": filename, "size": size, "media_type": media_type.value, "s3_key": s3_key},
+        )
 
-        except Exception as e:
-            print(f"!!!!!!!! ERRO AO PROCESSAR '{file.filename}': {e} !!!!!!!!")
-            raise
+        successful_keys.append(s3_key)
 
     await conn.commit()
 
@@ -145,9 +164,9 @@ async def delete_media(
         raise HTTPException(status_code=404, detail="Midia nao encontrada")
 
     try:
-        delete_object(get_bucket_raw(), media.s3_key)
+        await storage_aio.delete_object(get_bucket_raw(), media.s3_key)
     except Exception as e:
-        print("Erro ao deletar Storage:", e)
+        log.warning("Erro ao deletar do storage %s: %s", media.s3_key, e)
 
     await conn.execute(
         media_table.delete().where(media_table.c.id == media_id)
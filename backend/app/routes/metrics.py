@@ -1,4 +1,4 @@
-import traceback
+import logging
 
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,11 +6,12 @@ from typing import List, Optional
 from app.security.jwt import require_any_user
 
 from app.services.metrics import add_metric # ✅ Importe a função de serviço
-from app.services.db import get_conn
+from app.services.db import get_conn, get_read_conn
 from app.services.metrics import add_metric, get_metrics
 from app.schemas.metrics import MetricIn, MetricOut, DownloadMetricIn
 
 router = APIRouter()
+log = logging.getLogger("metrics")
 
 
 # --- POST: cria uma métrica ---
@@ -28,7 +29,7 @@ async def list_metrics(
         event_slug: Optional[str] = Query(None, description="Filtrar métricas por evento"),
         limit: int = Query(100, ge=1, le=1000, description="Limite máximo de registros"),
         offset: int = Query(0, ge=0, description="Offset para paginação"),
-        conn: AsyncSession = Depends(get_conn),
+        conn: AsyncSession = Depends(get_read_conn),
 ):
     """
     Lista métricas, com suporte a filtros e paginação.
@@ -43,9 +44,6 @@ async def log_download_metric(
         conn: AsyncSession = Depends(get_conn),
         token_data: dict = Depends(require_any_user)
 ):
-    # ✅ TESTE: Esta linha tem que aparecer no seu terminal
-    print("\n>>> ROTA /admin/metrics/download ACIONADA <<<\n")
-
     user_id = token_data.get("user_id")
 
     try:
@@ -59,14 +57,8 @@ async def log_download_metric(
         await add_metric(conn, metric_to_create)
         await conn.commit()
 
-    except Exception as e:
-        # 🛑 Se houver um erro, este bloco será executado
-        print("\n!!!!!!!!!! ERRO AO SALVAR MÉTRICA !!!!!!!!!!")
-        print(f"TIPO DO ERRO: {type(e)}")
-        print(f"DETALHES: {e}")
-        print("--- TRACEBACK COMPLETO ---")
-        traceback.print_exc()
-        print("------------------------------------------\n")
+    except Exception:
+        log.exception("Erro ao salvar metrica de download")
 
         await conn.rollback()
         raise HTTPException(status_code=500, detail="Erro interno ao salvar métrica.")
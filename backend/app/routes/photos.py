@@ -1,15 +1,22 @@
-﻿import uuid
-from typing import List, Optional
+﻿import asyncio
+import logging
+import uuid
+from typing import List, Literal, Optional
 from uuid import UUID as PyUUID
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.media import MediaOut, MediaType, media_table
-from app.services.db import get_conn
+from app.services.db import get_conn, get_read_conn, async_session_maker
 from app.schemas.photo import PhotoResponse, photos_table
-from app.services.storage import get_bucket_raw, presign_get, delete_object
+from app.services.storage import get_bucket_raw, presign_get
+from app.services import storage_aio, renditions, imaging, bulk_delete
+from app.services.render_cache import cache as render_cache, variant_key
+from app.settings import settings
+from app.responses import JSONBytesResponse, rows_to_json
 
 router = APIRouter()
+log = logging.getLogger("photos")
 
 # ===============================
 #     FOTOS DO EVENTO
@@ -18,20 +25,99 @@ router = APIRouter()
 async def get_photos_for_event(
     event_slug: str,
     uploader_id: Optional[PyUUID] = Query(None),
-    db: AsyncSession = Depends(get_conn)
+    db: AsyncSession = Depends(get_read_conn)
 ):
     bucket = get_bucket_raw()
-    query = select(photos_table).where(photos_table.c.event_slug == event_slug)
+    # Colunas do PhotoResponse (s3_url e as renditions viram URLs assinadas)
+    query = select(
+        photos_table.c.id,
+        photos_table.c.uploader_id,
+        photos_table.c.event_slug,
+        photos_table.c.s3_key,
+        photos_table.c.status,
+        photos_table.c.created_at,
+        photos_table.c.thumb_key,
+        photos_table.c.web_key,
+    ).where(photos_table.c.event_slug == event_slug)
     if uploader_id:
         query = query.where(photos_table.c.uploader_id == uploader_id)
     result = await db.execute(query)
-    photos = result.all()
-    response_data = []
-    for row in photos:
-        p = dict(row._mapping)
-        p["s3_url"] = presign_get(bucket, p["s3_key"])
-        response_data.append(p)
-    return response_data
+
+    def _urls(p: dict) -> dict:
+        urls = renditions.urls_for(p, bucket)
+        urls["s3_url"] = presign_get(bucket, p["s3_key"])
+        del p["thumb_key"], p["web_key"]
+        return urls
+
+    # Caminho rápido: linhas do banco direto para JSON, sem validar modelo por linha
+    return JSONBytesResponse(rows_to_json(result.all(), extra=_urls))
+
+# ===============================
+#     RESIZE SOB DEMANDA
+# ===============================
+# Publico para o CDN, mas curto: nao ha purge, entao uma foto apagada so
+# continua servida pela borda ate RENDER_CDN_MAX_AGE_SECONDS
+_RENDER_CACHE_CONTROL = (
+    f"public, max-age={settings.RENDER_CDN_MAX_AGE_SECONDS}, s-maxage={settings.RENDER_CDN_MAX_AGE_SECONDS}"
+)
+_renders_in_flight: dict[str, asyncio.Future] = {}
+
+
+async def _render_photo(photo_uuid: uuid.UUID, w: int, h: int, fmt: str, key: str) -> bytes:
+    # Sessao propria: o render e compartilhado entre requisicoes simultaneas
+    async with async_session_maker() as session:
+        row = (
+            await session.execute(select(photos_table.c.s3_key).where(photos_table.c.id == photo_uuid))
+        ).first()
+    if not row:
+        raise HTTPException(404, "Foto nao encontrada")
+    original = await storage_aio.get_bytes(get_bucket_raw(), row.s3_key)
+    data = await renditions.run_in_pool(imaging.render_box, original, w, h, fmt)
+    await asyncio.get_running_loop().run_in_executor(None, render_cache.put, str(photo_uuid), key, data)
+    return data
+
+
+@router.get("/{photo_id}/render")
+async def render_photo(
+    photo_id: PyUUID,
+    request: Request,
+    w: int = Query(..., ge=16),
+    h: Optional[int] = Query(None, ge=16),
+    fmt: Literal["webp", "jpeg"] = "webp",
+    db: AsyncSession = Depends(get_read_conn),
+):
+    """
+    Foto redimensionada para caber em w x h (h padrao = w), para tamanhos
+    que nao tem rendition pre-calculada. O original e imutavel, entao a
+    resposta tem ETag forte; a foto precisa existir antes do 304 e do cache
+    em disco, para que uma foto apagada nao continue acessivel.
+    """
+    w = min(w, settings.RENDER_MAX_DIMENSION)
+    h = min(h or w, settings.RENDER_MAX_DIMENSION)
+    key = variant_key(photo_id, w, h, fmt)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": _RENDER_CACHE_CONTROL}
+
+    exists = (await db.execute(select(photos_table.c.id).where(photos_table.c.id == photo_id))).first()
+    if not exists:
+        raise HTTPException(404, "Foto nao encontrada")
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(None, render_cache.get, str(photo_id), key)
+    if data is None:
+        # Requisicoes simultaneas da mesma variante esperam um unico render
+        pending = _renders_in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(_render_photo(photo_id, w, h, fmt, key))
+            _renders_in_flight[key] = pending
+            pending.add_done_callback(lambda _: _renders_in_flight.pop(key, None))
+        data = await asyncio.shield(pending)
+
+    return Response(content=data, media_type=imaging.FORMATS[fmt][1], headers=headers)
+
 
 @router.delete("/photo/{photo_id}")
 async def delete_photo(
@@ -43,19 +129,12 @@ async def delete_photo(
     except:
         raise HTTPException(400, "photo_id invalido")
     row = (
-        await db.execute(
-            select(photos_table.c.s3_key).where(photos_table.c.id == photo_uuid)
-        )
+        await db.execute(select(photos_table.c.event_slug).where(photos_table.c.id == photo_uuid))
     ).first()
     if not row:
         raise HTTPException(404, "Foto nao encontrada")
-    s3_key = row.s3_key
-    try:
-        delete_object(get_bucket_raw(), s3_key)
-    except Exception as e:
-        print("[Storage] erro ao excluir:", e)
-    await db.execute(delete(photos_table).where(photos_table.c.id == photo_uuid))
-    await db.commit()
+    # Mesmo caminho da remoção em lote: linha, original + renditions e faces do índice
+    await bulk_delete.run(db, bulk_delete.Selection(event_slug=row.event_slug, photo_ids=[photo_uuid]))
     return {"ok": True, "message": "Foto excluida com sucesso"}
 
 # ===============================
@@ -66,7 +145,7 @@ async def get_media_for_event(
     event_slug: str,
     media_type: Optional[MediaType] = Query(None),
     uploader_id: Optional[uuid.UUID] = Query(None),
-    db: AsyncSession = Depends(get_conn)
+    db: AsyncSession = Depends(get_read_conn)
 ):
     bucket = get_bucket_raw()
     query = select(media_table).where(media_table.c.event_slug == event_slug)
@@ -75,13 +154,9 @@ async def get_media_for_event(
     if uploader_id:
         query = query.where(media_table.c.uploader_id == uploader_id)
     result = await db.execute(query)
-    rows = result.all()
-    items = []
-    for row in rows:
-        m = dict(row._mapping)
-        m["s3_url"] = presign_get(bucket, m["s3_key"])
-        items.append(m)
-    return items
+    return JSONBytesResponse(
+        rows_to_json(result.all(), extra=lambda m: {"s3_url": presign_get(bucket, m["s3_key"])})
+    )
 
 @router.delete("/media/{media_id}")
 async def delete_media(
@@ -101,9 +176,9 @@ async def delete_media(
         raise HTTPException(404, "Midia nao encontrada")
     s3_key = row.s3_key
     try:
-        delete_object(get_bucket_raw(), s3_key)
+        await storage_aio.delete_object(get_bucket_raw(), s3_key)
     except Exception as e:
-        print("[Storage] erro:", e)
+        log.warning("Erro ao remover do storage %s: %s", s3_key, e)
     await db.execute(delete(media_table).where(media_table.c.id == media_uuid))
     await db.commit()
     return {"ok": True, "message": "Midia excluida com sucesso"}
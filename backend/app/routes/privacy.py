@@ -1,12 +1,16 @@
 from fastapi import APIRouter
+from app.services import event_cache
+from app.settings import settings
 router = APIRouter()
 
 @router.get("/{event_slug}")
 def privacy(event_slug: str):
     # MVP: texto simples; no frontend você pode apontar pra este endpoint
+    event = event_cache.get(event_slug)
+    retention_days = event.retention_days if event and event.retention_days is not None else settings.RETENTION_DEFAULT_DAYS
     return {
         "title": f"Política de Privacidade - {event_slug}",
         "consent_required": True,
-        "retention_days": 10,
+        "retention_days": retention_days,
         "contact": "privacidade@seu-dominio.com"
     }
@@ -2,22 +2,22 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.storage import presign_get, get_bucket_raw
 from app.services.face import search_by_image_bytes
-from app.services.db import get_conn
-from app.schemas.search import SearchOut, ItemUrl
+from app.services.db import get_conn, release_conn
+from app.schemas.search import SearchOut, SearchItem, FaceGroupOut
+from app.services.search_results import build_resolution_index, aggregate_matches
+from app.settings import settings
 from app.routes.uploads import validate_image_bytes
-from app.services.zips import create_zip_from_keys
+from app.services.zips import create_zip_from_keys, zip_key_for
 from app.services.metrics import track
 from app.security.jwt import require_any_user
-import hashlib
+from app.services.instrumentation import register_executor
+from app.services.tracing import ContextThreadPoolExecutor
 import time
-import uuid
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
 
-from sqlalchemy import select
-from app.schemas.photo import photos_table
-
-_rekognition_executor = ThreadPoolExecutor(max_workers=10)
+_rekognition_executor = ContextThreadPoolExecutor(max_workers=10)
+register_executor("face_search", _rekognition_executor)
 
 router = APIRouter()
 
@@ -28,58 +28,90 @@ async def search_faces(
         background_tasks: BackgroundTasks,
         selfie: UploadFile = File(...),
         create_zip: bool = False,
+        multi_face: bool = False,
+        ranking: Literal["best", "combined"] = "best",
         conn: AsyncSession = Depends(get_conn),
         user=Depends(require_any_user),
 ):
     """
     Busca faces correspondentes a uma imagem de selfie em um evento especifico.
+    Com multi_face=true busca todas as faces da selfie (casal, familia) e
+    retorna tambem os resultados agrupados por face.
     """
     start_time = time.time()
     img_bytes = await selfie.read()
     validate_image_bytes(img_bytes)
 
+    # A checagem do token (denylist) abriu uma transacao: devolve a conexao
+    # ao pool enquanto o provider de faces responde
+    await release_conn(conn)
+
     try:
         loop = asyncio.get_running_loop()
         res = await loop.run_in_executor(
             _rekognition_executor,
-            lambda: search_by_image_bytes(event_slug, img_bytes, max_faces=50, threshold=75)
+            lambda: search_by_image_bytes(
+                event_slug,
+                img_bytes,
+                max_faces=settings.FACE_SEARCH_MAX_CANDIDATES,
+                threshold=75,
+                multi_face=multi_face,
+                ranking=ranking,
+            )
         )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar faces: {str(e)}"
         )
 
-    matches = sorted(
-        res.get("FaceMatches", []), key=lambda m: m["Similarity"], reverse=True
-    )
-
-    matched_image_ids = [m['Face']['ExternalImageId'] for m in matches]
-
-    if not matched_image_ids:
+    matches = res.get("FaceMatches", [])
+    if not matches:
         return SearchOut(count=0, items=[], zip=None)
 
-    try:
-        uuid_list = [uuid.UUID(img_id) for img_id in matched_image_ids]
-    except ValueError:
-        print("Erro: Face API retornou um ExternalImageId que nao e um UUID.")
-        uuid_list = []
-
-    s3_keys = []
-    if uuid_list:
-        query = select(photos_table.c.s3_key).where(
-            photos_table.c.id.in_(uuid_list)
-        )
-        result = await conn.execute(query)
-        s3_keys = [row[0] for row in result.all() if row[0] is not None]
-
+    # Agrega por foto (uma consulta ao banco, ids em formatos mistos) e
+    # ordena por similaridade; cada foto e assinada uma unica vez
     bucket = get_bucket_raw()
-    urls = [ItemUrl(key=k, url=presign_get(bucket, k)) for k in s3_keys]
+    external_ids = [m["Face"]["ExternalImageId"] for m in matches]
+    index = await build_resolution_index(conn, bucket, external_ids)
+    photos = aggregate_matches(matches, index)
+    s3_keys = [p["key"] for p in photos]
+
+    url_by_key = {k: presign_get(bucket, k) for k in s3_keys}
+    # Grade usa a thumbnail; sem rendition, cai no original
+    thumb_by_key = {
+        p["key"]: presign_get(bucket, p["thumb_key"]) if p["thumb_key"] else url_by_key[p["key"]]
+        for p in photos
+    }
+
+    def _items(ranked: list[dict]) -> list[SearchItem]:
+        return [
+            SearchItem(
+                key=p["key"],
+                url=url_by_key[p["key"]],
+                thumb_url=thumb_by_key[p["key"]],
+                photo_id=p["photo_id"],
+                similarity=p["similarity"],
+            )
+            for p in ranked
+        ]
+
+    urls = _items(photos)
+
+    faces = None
+    if multi_face:
+        faces = []
+        for group in res.get("FaceGroups", []):
+            group_photos = aggregate_matches(group["FaceMatches"], index)
+            faces.append(FaceGroupOut(
+                index=group["FaceIndex"],
+                bounding_box=group.get("BoundingBox"),
+                count=len(group_photos),
+                items=_items(group_photos),
+            ))
 
     zip_download_url = None
     if create_zip and s3_keys:
-        keys_tuple = tuple(sorted(s3_keys))
-        zip_hash = hashlib.md5(str(keys_tuple).encode()).hexdigest()
-        zip_key = f"zips/search-{zip_hash}.zip"
+        zip_key = zip_key_for(s3_keys)
         background_tasks.add_task(create_zip_from_keys, s3_keys, zip_key)
         zip_download_url = presign_get(bucket, zip_key, expires=300)
 
@@ -94,10 +126,11 @@ async def search_faces(
             "file_size": len(img_bytes),
             "matches_count": len(s3_keys),
             "create_zip": create_zip,
+            "multi_face": multi_face,
             "duration_ms": int(duration * 1000),
         },
     )
 
     await conn.commit()
 
-    return SearchOut(count=len(s3_keys), items=urls, zip=zip_download_url)
+    return SearchOut(count=len(s3_keys), items=urls, zip=zip_download_url, faces=faces)
@@ -0,0 +1,36 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.services import feed, pubsub
+from app.settings import settings
+
+router = APIRouter()
+
+
+@router.get("/{event_slug}")
+async def stream_event(event_slug: str, request: Request):
+    """
+    Feed SSE do evento: photo_added / photo_deleted / comment_added.
+    Substitui o polling das listagens; o cliente recebe so o incremento.
+    """
+    async def _events():
+        async with pubsub.subscribe(feed.topic(event_slug)) as queue:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Mantem a conexao viva atraves do proxy
+                    yield ": ping\n\n"
+                    continue
+                data = json.dumps(message["data"], default=str)
+                yield f"event: {message['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
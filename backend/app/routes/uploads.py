@@ -2,6 +2,7 @@
 from typing import List, Optional
 import imghdr
 import asyncio
+import logging
 import time
 import uuid
 
@@ -10,10 +11,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.photo import photos_table, PhotoResponse
 from app.services.db import get_conn
-from app.services.storage import put_bytes, get_bucket_raw, presign_get
-from app.services.face import index_s3_object, sanitize_key_for_rekognition
+from app.services.storage import get_bucket_raw, presign_get
+from app.services import storage_aio, renditions, http_cache, feed
+from app.services.face import index_s3_object, face_ids_of, sanitize_key_for_rekognition
 
 router = APIRouter()
+log = logging.getLogger("uploads")
 MAX_SIZE_MB = 1000
 ALLOWED_FORMATS = {"jpeg", "png", "jpg"}
 
@@ -42,21 +45,29 @@ async def process_file(event_slug: str, uploader_id: Optional[uuid.UUID], file:
         bucket = get_bucket_raw()
 
         # 1. Envia para o Storage
-        put_bytes(bucket, s3_key, data, file.content_type or "image/jpeg")
+        await storage_aio.put_bytes(bucket, s3_key, data, file.content_type or "image/jpeg")
 
-        # 2. Envia para o Face API
+        # 2. Envia para o Face API e gera as renditions (pool de processos) em paralelo
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None, lambda: index_s3_object(event_slug, bucket, s3_key, str(image_id))
+        index_result, rendition_keys = await asyncio.gather(
+            loop.run_in_executor(
+                None, lambda: index_s3_object(event_slug, bucket, s3_key, str(image_id))
+            ),
+            renditions.generate(event_slug, image_id, data),
         )
 
-        return {"image_id": image_id, "s3_key": s3_key}
+        return {
+            "image_id": image_id,
+            "s3_key": s3_key,
+            "renditions": rendition_keys,
+            "face_ids": face_ids_of(index_result),
+        }
 
     except HTTPException as e:
-        print(f"!!!!!!!! ERRO DE VALIDACAO: {file.filename}: {e.detail} !!!!!!!!")
+        log.info("Arquivo rejeitado na validacao %r: %s", file.filename, e.detail)
         return None
-    except Exception as e:
-        print(f"!!!!!!!! ERRO AO PROCESSAR O ARQUIVO {file.filename}: {e} !!!!!!!!")
+    except Exception:
+        log.exception("Erro ao processar o arquivo %r", file.filename)
         return None
 
 
@@ -92,6 +103,8 @@ async def upload_photos_batch(
             "s3_key": res["s3_key"],
             "s3_url": None,
             "status": "active",
+            "face_ids": res["face_ids"],
+            **renditions.columns_for(res["renditions"]),
         })
 
     # Insere os novos registros no banco
@@ -104,6 +117,7 @@ async def upload_photos_batch(
     result = await db.execute(query)
 
     await db.commit()
+    http_cache.bump(f"photos:{event_slug}")
 
     newly_created_photos = result.all()
 
@@ -112,6 +126,11 @@ async def upload_photos_batch(
     for photo_row in newly_created_photos:
         photo_dict = dict(photo_row._mapping)
         photo_dict["s3_url"] = presign_get(bucket, photo_dict["s3_key"])
+        photo_dict.update(renditions.urls_for(photo_dict, bucket))
         response_data.append(photo_dict)
 
+    # Feed SSE: uma mensagem por foto (cabe no limite do NOTIFY)
+    for photo_dict in response_data:
+        await feed.publish(event_slug, feed.PHOTO_ADDED, PhotoResponse.model_validate(photo_dict).model_dump(mode="json"))
+
     return response_data
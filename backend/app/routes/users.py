@@ -4,8 +4,10 @@ from sqlalchemy import select
 from uuid import UUID
 
 from app.schemas.user import UserCreate, UserOut, AdminCreate, users_table  # <-- import correto da tabela
+from app.security.jwt import require_admin
 from app.services.db import get_conn
-from app.services.users import create_or_get_user, create_admin_user
+from app.services.users import create_or_get_user, create_admin_user, create_users_bulk
+from app.settings import settings
 
 router = APIRouter()
 
@@ -20,6 +22,21 @@ async def register_user(payload: UserCreate, conn: AsyncSession = Depends(get_co
     return UserOut(**user_data)
 
 
+# --- Cadastro em massa (lista de convidados, só admin) ---
+@router.post(
+    "/bulk",
+    response_model=list[UserOut],
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_admin)],
+)
+async def register_users_bulk(payload: list[UserCreate], conn: AsyncSession = Depends(get_conn)):
+    if len(payload) > settings.USERS_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo de {settings.USERS_BULK_MAX} usuários por requisição.")
+
+    users = await create_users_bulk(conn, payload)
+    return [UserOut(**{**dict(user), "id": str(user["id"])}) for user in users]
+
+
 # --- Cadastro de admin ---
 @router.post("/admin", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 async def register_admin(payload: AdminCreate, conn: AsyncSession = Depends(get_conn)):
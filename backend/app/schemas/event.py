@@ -1,7 +1,7 @@
-from sqlalchemy import Table, Column, String, Date, Time, Integer
+from sqlalchemy import Table, Column, String, Date, Time, Integer, DateTime
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
-from datetime import date, time  # Import date and time types
+from datetime import date, time, datetime  # Import date and time types
 from .base import metadata
 
 # Tabela de eventos no banco com os novos campos
@@ -15,6 +15,11 @@ events_table = Table(
     Column("start_time", Time, nullable=True),
     Column("end_time", Time, nullable=True),
     Column("participants_count", Integer, nullable=True),
+    # Collection (Rekognition) / FaceList (Azure) provisionada para o evento
+    Column("face_collection_id", String, nullable=True),
+    # Retenção: dias após event_date (nulo = padrão RETENTION_DEFAULT_DAYS)
+    Column("retention_days", Integer, nullable=True),
+    Column("purged_at", DateTime, nullable=True),
 )
 
 # --- Schemas Pydantic -------------------
@@ -28,6 +33,7 @@ class CreateEventIn(BaseModel):
     start_time: Optional[time] = None
     end_time: Optional[time] = None
     participants_count: Optional[int] = None
+    retention_days: Optional[int] = None
 
 class EventOut(BaseModel):
     """Schema para retornar dados de um evento."""
@@ -38,6 +44,8 @@ class EventOut(BaseModel):
     start_time: Optional[time] = None
     end_time: Optional[time] = None
     participants_count: Optional[int] = None
+    retention_days: Optional[int] = None
+    purged_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -50,4 +58,5 @@ class UpdateEventIn(BaseModel):
     event_date: Optional[date] = None
     start_time: Optional[time] = None
     end_time: Optional[time] = None
-    participants_count: Optional[int] = None
\ No newline at end of file
+    participants_count: Optional[int] = None
+    retention_days: Optional[int] = None
@@ -1,5 +1,5 @@
 from sqlalchemy import Table, Column, String, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID as SQLAlchemyUUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as SQLAlchemyUUID
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
 from datetime import datetime
@@ -17,6 +17,12 @@ photos_table = Table(
     Column("s3_key", String, nullable=False),
     Column("s3_url", String, nullable=True),
     Column("status", String, nullable=False, default="active"),
+    # Renditions geradas apos o upload ({evento}/renditions/{id}/{variante}.{ext})
+    Column("thumb_key", String, nullable=True),
+    Column("web_key", String, nullable=True),
+    # Ids das faces no provider (FaceId / persistedFaceId), para remover sem
+    # listar a collection; NULL = indexada antes desta coluna
+    Column("face_ids", ARRAY(String), nullable=True),
     Column("created_at", DateTime, default=datetime.utcnow),
 )
 
@@ -39,6 +45,8 @@ class PhotoResponse(BaseModel):
     event_slug: str
     s3_key: str
     s3_url: HttpUrl
+    thumb_url: Optional[str] = None
+    web_url: Optional[str] = None
     status: str
     created_at: datetime
 
@@ -1,8 +1,24 @@
-from typing import List, Optional
+import uuid
+from typing import List, Optional, Any
 from pydantic import BaseModel
 from .common import ItemUrl
 
+class SearchItem(ItemUrl):
+    """Foto encontrada, com a melhor similaridade entre as faces que casaram."""
+    photo_id: Optional[uuid.UUID] = None
+    similarity: float
+    # Rendition para exibir na grade; `url` continua sendo o original (download)
+    thumb_url: Optional[str] = None
+
+class FaceGroupOut(BaseModel):
+    """Resultados de uma das faces da selfie (busca multi-face)."""
+    index: int
+    bounding_box: Optional[Any] = None
+    count: int
+    items: List[SearchItem]
+
 class SearchOut(BaseModel):
     count: int
-    items: List[ItemUrl]
+    items: List[SearchItem]
     zip: Optional[str] = None
+    faces: Optional[List[FaceGroupOut]] = None
@@ -0,0 +1,24 @@
+from sqlalchemy import Table, Column, String, BigInteger, DateTime, Index, PrimaryKeyConstraint
+from datetime import datetime
+from .base import metadata
+
+
+# Catalogo dos objetos do storage (espelho do container/bucket).
+# Preenchido no upload/delete e reconciliado periodicamente com o storage real;
+# as listagens da galeria e do zip leem daqui em vez de listar o container.
+storage_objects_table = Table(
+    "storage_objects",
+    metadata,
+    Column("bucket", String, nullable=False),
+    # Collation "C" no Postgres: a PK (bucket, key) fica em ordem de bytes e
+    # serve a listagem por prefixo como um range scan (key >= p AND key < p_next)
+    Column("key", String().with_variant(String(collation="C"), "postgresql"), nullable=False),
+    # "pasta" do objeto, com a barra final (ex.: "evento/general/")
+    Column("prefix", String, nullable=False),
+    Column("size", BigInteger, nullable=True),
+    Column("content_type", String, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, nullable=False),
+    PrimaryKeyConstraint("bucket", "key"),
+    Index("ix_storage_objects_bucket_prefix_key", "bucket", "prefix", "key"),
+)
@@ -14,6 +14,7 @@ Documentação: https://learn.microsoft.com/en-us/azure/storage/blobs/storage-qu
 """
 
 import io
+import logging
 import mimetypes
 import uuid
 import time
@@ -33,6 +34,9 @@ from azure.core.exceptions import AzureError, ResourceNotFoundError
 from fastapi import HTTPException
 
 from ..settings import settings
+from .transfer import DEFAULT_CONFIG
+
+log = logging.getLogger("azure_blob")
 
 # ============================================================
 # CONFIGURAÇÃO
@@ -42,26 +46,45 @@ AZURE_BLOB_CONNECTION_STRING = os.getenv("AZURE_BLOB_CONNECTION_STRING", "")
 AZURE_BLOB_ACCOUNT_NAME = os.getenv("AZURE_BLOB_ACCOUNT_NAME", "")
 AZURE_BLOB_ACCOUNT_KEY = os.getenv("AZURE_BLOB_ACCOUNT_KEY", "")
 
-# Validação de configuração
-if not AZURE_BLOB_CONNECTION_STRING and not (AZURE_BLOB_ACCOUNT_NAME and AZURE_BLOB_ACCOUNT_KEY):
-    raise RuntimeError(
-        "Configure AZURE_BLOB_CONNECTION_STRING ou (AZURE_BLOB_ACCOUNT_NAME + AZURE_BLOB_ACCOUNT_KEY) no .env"
-    )
+# Tamanhos de bloco/range do motor de transferência (ver transfer.py)
+_TRANSFER_KWARGS = {
+    "max_block_size": DEFAULT_CONFIG.block_size,
+    "max_single_put_size": DEFAULT_CONFIG.single_put_threshold,
+    "max_chunk_get_size": DEFAULT_CONFIG.range_size,
+    "max_single_get_size": DEFAULT_CONFIG.range_size,
+}
 
-# Inicializa o cliente
+# Extrai account name da connection string
 if AZURE_BLOB_CONNECTION_STRING:
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_BLOB_CONNECTION_STRING)
-    # Extrai account name da connection string
     for part in AZURE_BLOB_CONNECTION_STRING.split(";"):
         if part.startswith("AccountName="):
             AZURE_BLOB_ACCOUNT_NAME = part.split("=")[1]
             break
-else:
-    account_url = f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net"
-    blob_service_client = BlobServiceClient(
-        account_url=account_url,
-        credential=AZURE_BLOB_ACCOUNT_KEY
-    )
+
+# Cliente criado no primeiro uso (startup valida os containers): importar o
+# módulo não exige configuração
+_blob_service_client: Optional[BlobServiceClient] = None
+
+
+def _service_client() -> BlobServiceClient:
+    global _blob_service_client
+    if _blob_service_client is not None:
+        return _blob_service_client
+
+    # Validação de configuração
+    if not AZURE_BLOB_CONNECTION_STRING and not (AZURE_BLOB_ACCOUNT_NAME and AZURE_BLOB_ACCOUNT_KEY):
+        raise RuntimeError(
+            "Configure AZURE_BLOB_CONNECTION_STRING ou (AZURE_BLOB_ACCOUNT_NAME + AZURE_BLOB_ACCOUNT_KEY) no .env"
+        )
+    if AZURE_BLOB_CONNECTION_STRING:
+        _blob_service_client = BlobServiceClient.from_connection_string(AZURE_BLOB_CONNECTION_STRING, **_TRANSFER_KWARGS)
+    else:
+        _blob_service_client = BlobServiceClient(
+            account_url=f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net",
+            credential=AZURE_BLOB_ACCOUNT_KEY,
+            **_TRANSFER_KWARGS
+        )
+    return _blob_service_client
 
 # Container padrão (equivalente ao BUCKET_RAW do S3)
 CONTAINER_RAW = os.getenv("AZURE_BLOB_CONTAINER", settings.S3_BUCKET_RAW if hasattr(settings, 'S3_BUCKET_RAW') else "photo-find-raw")
@@ -73,26 +96,59 @@ EXPIRE = getattr(settings, 'PRESIGNED_EXPIRE_SECONDS', 3600)
 BUCKET_RAW = CONTAINER_RAW
 
 
+# ============================================================
+# REGISTRO DE CONTAINERS
+# ============================================================
+
+# Clientes de container em cache (criar o cliente não faz chamada de rede)
+_CONTAINER_CLIENTS: dict[str, ContainerClient] = {}
+
+# Resultado da validação feita no startup, exposto em /health
+CONTAINER_STATUS: dict[str, dict] = {}
+
+
+def ensure_containers(containers: list[str]) -> dict[str, dict]:
+    """
+    Valida (e cria, se não existir) cada container no startup; depois só o
+    /health revalida os que falharam. O caminho de requisição só usa os
+    clientes em cache.
+    """
+    for container in containers:
+        container_client = _get_container_client(container)
+        status = {"ok": True, "created": False}
+        try:
+            container_client.get_container_properties()
+        except ResourceNotFoundError:
+            try:
+                container_client.create_container()
+                status["created"] = True
+                log.info("Container criado: %s", container)
+            except AzureError as e:
+                status = {"ok": False, "created": False, "error": str(e)}
+        except AzureError as e:
+            status = {"ok": False, "created": False, "error": str(e)}
+        if not status["ok"]:
+            log.warning("Container indisponivel %s: %s", container, status["error"])
+        CONTAINER_STATUS[container] = status
+    return CONTAINER_STATUS
+
+
 # ============================================================
 # FUNÇÕES AUXILIARES
 # ============================================================
 
 def _get_container_client(container: str) -> ContainerClient:
-    """Obtém cliente do container, criando se não existir."""
-    container_client = blob_service_client.get_container_client(container)
-    
-    try:
-        container_client.get_container_properties()
-    except ResourceNotFoundError:
-        container_client.create_container()
-        print(f"[Azure Blob] Container criado: {container}")
-    
+    """Obtém o cliente (em cache) do container. A existência é validada no startup."""
+    container_client = _CONTAINER_CLIENTS.get(container)
+    if container_client is None:
+        container_client = _service_client().get_container_client(container)
+        _CONTAINER_CLIENTS[container] = container_client
     return container_client
 
 
 def _get_blob_client(container: str, blob_name: str) -> BlobClient:
     """Obtém cliente do blob."""
-    return blob_service_client.get_blob_client(container=container, blob=blob_name)
+    return _get_container_client(container).get_blob_client(blob_name)
 
 
 # ============================================================
@@ -104,13 +160,19 @@ def put_bytes(bucket: str, key: str, data: bytes, content_type: str = "applicati
     try:
         blob_client = _get_blob_client(bucket, key)
         content_settings = ContentSettings(content_type=content_type or "application/octet-stream")
-        blob_client.upload_blob(data, overwrite=True, content_settings=content_settings)
-        print(f"[Azure Blob] Upload realizado: {bucket}/{key} ({len(data)} bytes)")
+        blob_client.upload_blob(
+            data,
+            overwrite=True,
+            content_settings=content_settings,
+            max_concurrency=DEFAULT_CONFIG.max_concurrency,
+            validate_content=DEFAULT_CONFIG.validate_content,
+        )
+        log.debug("Upload realizado: %s/%s (%d bytes)", bucket, key, len(data))
     except AzureError as e:
-        print(f"[Azure Blob] Erro ao enviar {key}: {e}")
+        log.error("Erro ao enviar %s: %s", key, e)
         raise HTTPException(status_code=500, detail=f"Falha ao enviar {key}: {e}")
     except Exception as e:
-        print(f"[Azure Blob] Erro inesperado: {e}")
+        log.exception("Erro inesperado ao enviar %s", key)
         raise HTTPException(status_code=500, detail=f"Erro inesperado ao enviar arquivo: {e}")
 
 
@@ -122,15 +184,18 @@ def get_blob_bytes(bucket: str, key: str) -> bytes:
     """Baixa um blob como bytes. Usada pelo azure_face.py."""
     try:
         blob_client = _get_blob_client(bucket, key)
-        download_stream = blob_client.download_blob()
+        download_stream = blob_client.download_blob(
+            max_concurrency=DEFAULT_CONFIG.max_concurrency,
+            validate_content=DEFAULT_CONFIG.validate_content,
+        )
         data = download_stream.readall()
-        print(f"[Azure Blob] Download realizado: {bucket}/{key} ({len(data)} bytes)")
+        log.debug("Download realizado: %s/%s (%d bytes)", bucket, key, len(data))
         return data
     except ResourceNotFoundError:
-        print(f"[Azure Blob] Blob nao encontrado: {bucket}/{key}")
+        log.info("Blob nao encontrado: %s/%s", bucket, key)
         raise HTTPException(status_code=404, detail=f"Arquivo nao encontrado: {key}")
     except AzureError as e:
-        print(f"[Azure Blob] Erro ao baixar {key}: {e}")
+        log.error("Erro ao baixar %s: %s", key, e)
         raise HTTPException(status_code=500, detail=f"Falha ao baixar {key}: {e}")
 
 
@@ -151,8 +216,8 @@ def presign_get(bucket: str, key: str, expires: int = EXPIRE) -> str:
             expiry=expiry_time
         )
         return f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net/{bucket}/{key}?{sas_token}"
-    except Exception as e:
-        print(f"[Azure Blob] Erro ao gerar URL assinada para {key}: {e}")
+    except Exception:
+        log.exception("Erro ao gerar URL assinada para %s", key)
         return f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net/{bucket}/{key}"
 
 
@@ -171,7 +236,7 @@ def presign_put(bucket: str, key: str, content_type: str, expires: int = EXPIRE)
         )
         return f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net/{bucket}/{key}?{sas_token}"
     except Exception as e:
-        print(f"[Azure Blob] Erro ao gerar URL de upload para {key}: {e}")
+        log.exception("Erro ao gerar URL de upload para %s", key)
         raise HTTPException(status_code=500, detail=f"Erro ao gerar URL de upload: {e}")
 
 
@@ -213,9 +278,9 @@ def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
         blobs = container_client.list_blobs(name_starts_with=prefix)
         for blob in blobs:
             keys.append(blob.name)
-        print(f"[Azure Blob] Listados {len(keys)} blobs com prefixo '{prefix}'")
+        log.debug("Listados %d blobs com prefixo %r", len(keys), prefix)
     except AzureError as e:
-        print(f"[Azure Blob] Erro ao listar prefixo {prefix}: {e}")
+        log.error("Erro ao listar prefixo %s: %s", prefix, e)
     return keys
 
 
@@ -232,7 +297,7 @@ async def list_s3_files(prefix: str, bucket: str = None) -> list[dict]:
             url = f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net/{bucket}/{key}"
             items.append({"key": key.split('/')[-1], "url": url})
     except AzureError as e:
-        print(f"[Azure Blob] Erro ao listar arquivos do prefixo {prefix}: {e}")
+        log.error("Erro ao listar arquivos do prefixo %s: %s", prefix, e)
     return items
 
 
@@ -245,14 +310,14 @@ def delete_object(bucket: str, key: str) -> None:
     try:
         blob_client = _get_blob_client(bucket, key)
         blob_client.delete_blob()
-        print(f"[Azure Blob] Removido: {bucket}/{key}")
+        log.debug("Removido: %s/%s", bucket, key)
     except ResourceNotFoundError:
-        print(f"[Azure Blob] Blob ja nao existia: {bucket}/{key}")
+        log.debug("Blob ja nao existia: %s/%s", bucket, key)
     except AzureError as e:
-        print(f"[Azure Blob] Falha ao apagar {bucket}/{key}: {e}")
+        log.error("Falha ao apagar %s/%s: %s", bucket, key, e)
         raise HTTPException(status_code=500, detail=f"Erro ao apagar arquivo: {e}")
-    except Exception as e:
-        print(f"[Azure Blob] Erro inesperado ao apagar {bucket}/{key}: {e}")
+    except Exception:
+        log.exception("Erro inesperado ao apagar %s/%s", bucket, key)
         raise HTTPException(status_code=500, detail="Erro inesperado ao apagar arquivo")
 
 
@@ -0,0 +1,214 @@
+"""
+azure_blob_aio.py - Storage assíncrono com azure.storage.blob.aio
+
+Mesma interface de azure_blob.py, mas com funções awaitable: uploads e
+downloads não bloqueiam o event loop. O cliente (e o pool de conexões
+aiohttp) é criado no startup da aplicação e fechado no shutdown.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+from azure.core.exceptions import AzureError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from fastapi import HTTPException
+
+from ..settings import settings
+from .transfer import DEFAULT_CONFIG, Source, TransferConfig, iter_blocks
+from .azure_blob import (
+    AZURE_BLOB_CONNECTION_STRING,
+    AZURE_BLOB_ACCOUNT_NAME,
+    AZURE_BLOB_ACCOUNT_KEY,
+)
+
+log = logging.getLogger("azure_blob_aio")
+
+_service_client: Optional[BlobServiceClient] = None
+_container_clients: dict[str, ContainerClient] = {}
+_http_session: Optional[aiohttp.ClientSession] = None
+_lock = asyncio.Lock()
+
+
+# ============================================================
+# CICLO DE VIDA DO CLIENTE
+# ============================================================
+
+def _build_client() -> BlobServiceClient:
+    global _http_session
+    connector = aiohttp.TCPConnector(
+        limit=settings.STORAGE_MAX_CONNECTIONS,
+        limit_per_host=settings.STORAGE_MAX_CONNECTIONS,
+        ttl_dns_cache=300,
+    )
+    _http_session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(
+            sock_connect=settings.STORAGE_CONNECT_TIMEOUT,
+            sock_read=settings.STORAGE_READ_TIMEOUT,
+        ),
+    )
+    transport = AioHttpTransport(session=_http_session, session_owner=False)
+    # Tamanhos de bloco/range do motor de transferência (ver transfer.py)
+    transfer_kwargs = {
+        "max_block_size": DEFAULT_CONFIG.block_size,
+        "max_single_put_size": DEFAULT_CONFIG.single_put_threshold,
+        "max_chunk_get_size": DEFAULT_CONFIG.range_size,
+        "max_single_get_size": DEFAULT_CONFIG.range_size,
+    }
+
+    if AZURE_BLOB_CONNECTION_STRING:
+        return BlobServiceClient.from_connection_string(
+            AZURE_BLOB_CONNECTION_STRING, transport=transport, **transfer_kwargs
+        )
+    return BlobServiceClient(
+        account_url=f"https://{AZURE_BLOB_ACCOUNT_NAME}.blob.core.windows.net",
+        credential=AZURE_BLOB_ACCOUNT_KEY,
+        transport=transport,
+        **transfer_kwargs,
+    )
+
+
+async def startup() -> None:
+    """Cria o cliente e o pool de conexões (chamado no startup da app)."""
+    global _service_client
+    async with _lock:
+        if _service_client is None:
+            _service_client = _build_client()
+
+
+async def shutdown() -> None:
+    """Fecha o cliente e o pool de conexões."""
+    global _service_client, _http_session
+    async with _lock:
+        if _service_client is not None:
+            await _service_client.close()
+            _service_client = None
+        _container_clients.clear()
+        if _http_session is not None:
+            await _http_session.close()
+            _http_session = None
+
+
+async def _client() -> BlobServiceClient:
+    if _service_client is None:
+        await startup()
+    return _service_client
+
+
+async def _container(bucket: str) -> ContainerClient:
+    """Cliente do container em cache (a existência é validada no startup)."""
+    container_client = _container_clients.get(bucket)
+    if container_client is None:
+        container_client = (await _client()).get_container_client(bucket)
+        _container_clients[bucket] = container_client
+    return container_client
+
+
+# ============================================================
+# OPERAÇÕES
+# ============================================================
+
+async def put_bytes(bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+    """Faz upload de bytes para o Azure Blob Storage."""
+    await put_stream(bucket, key, data, content_type, length=len(data))
+
+
+async def put_stream(
+    bucket: str,
+    key: str,
+    source: Source,
+    content_type: str = "application/octet-stream",
+    length: Optional[int] = None,
+    config: TransferConfig = DEFAULT_CONFIG,
+):
+    """
+    Upload em blocos paralelos (max_concurrency), com MD5 validado por bloco.
+    `source` pode ser bytes, um arquivo ou um async iterator.
+    """
+    if not isinstance(source, (bytes, bytearray)):
+        source = iter_blocks(source, config.block_size)
+    try:
+        blob_client = (await _container(bucket)).get_blob_client(key)
+        content_settings = ContentSettings(content_type=content_type or "application/octet-stream")
+        await blob_client.upload_blob(
+            source,
+            length=length,
+            overwrite=True,
+            content_settings=content_settings,
+            max_concurrency=config.max_concurrency,
+            validate_content=config.validate_content,
+        )
+        log.debug("Upload realizado: %s/%s (%s bytes)", bucket, key, length)
+    except AzureError as e:
+        log.error("Erro ao enviar %s: %s", key, e)
+        raise HTTPException(status_code=500, detail=f"Falha ao enviar {key}: {e}")
+
+
+async def get_bytes(bucket: str, key: str, config: TransferConfig = DEFAULT_CONFIG) -> bytes:
+    """Baixa um blob como bytes, em ranges paralelos quando é grande."""
+    try:
+        blob_client = (await _container(bucket)).get_blob_client(key)
+        downloader = await blob_client.download_blob(
+            max_concurrency=config.max_concurrency,
+            validate_content=config.validate_content,
+        )
+        return await downloader.readall()
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Arquivo nao encontrado: {key}")
+    except AzureError as e:
+        log.error("Erro ao baixar %s: %s", key, e)
+        raise HTTPException(status_code=500, detail=f"Falha ao baixar {key}: {e}")
+
+
+async def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
+    """Lista todas as chaves (blobs) com um determinado prefixo."""
+    keys = []
+    try:
+        container_client = await _container(bucket)
+        async for blob in container_client.list_blobs(name_starts_with=prefix):
+            keys.append(blob.name)
+    except AzureError as e:
+        log.error("Erro ao listar prefixo %s: %s", prefix, e)
+    return keys
+
+
+async def delete_object(bucket: str, key: str) -> None:
+    """Remove um blob do container."""
+    try:
+        blob_client = (await _container(bucket)).get_blob_client(key)
+        await blob_client.delete_blob()
+    except ResourceNotFoundError:
+        log.debug("Blob ja nao existia: %s/%s", bucket, key)
+    except AzureError as e:
+        log.error("Falha ao apagar %s/%s: %s", bucket, key, e)
+        raise HTTPException(status_code=500, detail=f"Erro ao apagar arquivo: {e}")
+
+
+# Limite de sub-requisições por chamada do Blob Batch
+BATCH_DELETE_SIZE = 256
+
+
+async def delete_objects(bucket: str, keys: list[str]) -> list[str]:
+    """
+    Remove vários blobs com o Blob Batch (até 256 por chamada).
+    Retorna as chaves que falharam (blob inexistente conta como removido).
+    """
+    failed = []
+    container_client = await _container(bucket)
+    for start in range(0, len(keys), BATCH_DELETE_SIZE):
+        chunk = keys[start:start + BATCH_DELETE_SIZE]
+        try:
+            responses = await container_client.delete_blobs(*chunk, raise_on_any_failure=False)
+            index = 0
+            async for response in responses:
+                if response.status_code not in (202, 404):
+                    failed.append(chunk[index])
+                index += 1
+        except AzureError as e:
+            log.error("Falha no batch delete em %s: %s", bucket, e)
+            failed.extend(chunk)
+    return failed
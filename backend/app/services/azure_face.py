@@ -2,12 +2,19 @@
 azure_face.py - Servico de Reconhecimento Facial com Azure Face API
 """
 
+import logging
 import os
 import re
 import httpx
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+from app.services import face_registry
+from app.services.instrumentation import register_executor
+from app.services import tracing
+from app.services.tracing import ContextThreadPoolExecutor
+from app.settings import settings
+
 AZURE_FACE_ENDPOINT = os.getenv("AZURE_FACE_ENDPOINT", "")
 AZURE_FACE_KEY = os.getenv("AZURE_FACE_KEY", "")
 
@@ -16,9 +23,29 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
-FACELISTS_CACHE = set()
 FACELIST_PREFIX = os.getenv("AZURE_FACELIST_PREFIX", "evt-")
 
+log = logging.getLogger("azure_face")
+
+# Pool para os findsimilars concorrentes da busca multi-face: todas as faces
+# de FACE_SEARCH_MULTI_CONCURRENCY selfies em paralelo
+_search_executor = ContextThreadPoolExecutor(
+    max_workers=settings.FACE_SEARCH_MAX_FACES * settings.FACE_SEARCH_MULTI_CONCURRENCY,
+    thread_name_prefix="azure_findsimilars",
+)
+register_executor("face_multi_search", _search_executor)
+# Remoções de faces (bulk delete) num pool próprio, sem ocupar o das buscas
+_delete_executor = ContextThreadPoolExecutor(max_workers=8, thread_name_prefix="azure_face_delete")
+register_executor("face_delete", _delete_executor)
+
+def _post(operation: str, client: httpx.Client, url: str, **kwargs) -> httpx.Response:
+    """POST na Face API com span por sub-chamada (detect, add, findsimilars)."""
+    with tracing.span(f"azure_face.{operation}", "client") as span:
+        resp = client.post(url, **kwargs)
+        if span is not None:
+            span.set_attribute("http.status_code", resp.status_code)
+        return resp
+
 def _get_api_url(path: str) -> str:
     return f"{AZURE_FACE_ENDPOINT.rstrip('/')}/face/v1.0/{path.lstrip('/')}"
 
@@ -28,20 +55,23 @@ def sanitize_key_for_rekognition(s: str) -> str:
 def sanitize_key_for_azure(s: str) -> str:
     return sanitize_key_for_rekognition(s)
 
+def collection_id_for(event_slug: str) -> str:
+    return f"{FACELIST_PREFIX}{sanitize_key_for_azure(event_slug)}"[:64]
+
 def ensure_collection(event_slug: str) -> str:
-    facelist_id = f"{FACELIST_PREFIX}{sanitize_key_for_azure(event_slug)}"[:64]
-    if facelist_id in FACELISTS_CACHE:
+    facelist_id = collection_id_for(event_slug)
+    if face_registry.is_known(facelist_id):
         return facelist_id
     with httpx.Client(timeout=30) as client:
         check = client.get(_get_api_url(f"facelists/{facelist_id}"), headers=HEADERS)
         if check.status_code == 200:
-            FACELISTS_CACHE.add(facelist_id)
+            face_registry.mark_known(facelist_id)
             return facelist_id
         if check.status_code == 404:
             body = {"name": event_slug[:128], "recognitionModel": "recognition_04"}
             create = client.put(_get_api_url(f"facelists/{facelist_id}"), headers=HEADERS, json=body)
             if create.status_code in (200, 201):
-                FACELISTS_CACHE.add(facelist_id)
+                face_registry.mark_known(facelist_id)
                 return facelist_id
             raise RuntimeError(f"Erro ao criar FaceList: {create.text}")
         raise RuntimeError(f"Erro ao verificar FaceList: {check.text}")
@@ -51,13 +81,14 @@ def index_image_bytes(event_slug: str, image_data: bytes, external_image_id: str
     with httpx.Client(timeout=60) as client:
         detect_headers = {"Ocp-Apim-Subscription-Key": AZURE_FACE_KEY, "Content-Type": "application/octet-stream"}
         detect_params = {"returnFaceId": "true", "recognitionModel": "recognition_04", "detectionModel": "detection_03"}
-        detect = client.post(_get_api_url("detect"), headers=detect_headers, params=detect_params, content=image_data)
+        detect = _post("detect", client, _get_api_url("detect"), headers=detect_headers, params=detect_params, content=image_data)
         if detect.status_code != 200:
             return {"indexed": 0, "error": detect.text}
         faces = detect.json()
         if not faces:
             return {"indexed": 0, "reason": "no_faces_detected"}
         indexed = 0
+        face_ids = []
         for face in faces:
             face_id = face.get("faceId")
             if not face_id:
@@ -65,10 +96,11 @@ def index_image_bytes(event_slug: str, image_data: bytes, external_image_id: str
             user_data = external_image_id[:1024]
             add_params = {"userData": user_data}
             add_headers = {"Ocp-Apim-Subscription-Key": AZURE_FACE_KEY, "Content-Type": "application/octet-stream"}
-            add = client.post(_get_api_url(f"facelists/{facelist_id}/persistedfaces"), headers=add_headers, params=add_params, content=image_data)
+            add = _post("add", client, _get_api_url(f"facelists/{facelist_id}/persistedfaces"), headers=add_headers, params=add_params, content=image_data)
             if add.status_code in (200, 201):
                 indexed += 1
-        return {"indexed": indexed, "faces_detected": len(faces)}
+                face_ids.append(add.json().get("persistedFaceId"))
+        return {"indexed": indexed, "faces_detected": len(faces), "face_ids": [f for f in face_ids if f]}
 
 def index_s3_object(event_slug: str, bucket: str, file_key: str, external_image_id: str = None) -> dict:
     from app.services.storage import get_bytes
@@ -76,35 +108,70 @@ def index_s3_object(event_slug: str, bucket: str, file_key: str, external_image_
     ext_id = external_image_id or file_key
     return index_image_bytes(event_slug, image_data, ext_id)
 
+def _detect_faces(client: httpx.Client, data: bytes) -> tuple[list, Optional[str]]:
+    detect_headers = {"Ocp-Apim-Subscription-Key": AZURE_FACE_KEY, "Content-Type": "application/octet-stream"}
+    detect_params = {"returnFaceId": "true", "recognitionModel": "recognition_04", "detectionModel": "detection_03"}
+    detect = _post("detect", client, _get_api_url("detect"), headers=detect_headers, params=detect_params, content=data)
+    if detect.status_code != 200:
+        return [], detect.text
+    return detect.json(), None
+
+def _find_similar(client: httpx.Client, facelist_id: str, face_id: str, max_faces: int, threshold: int) -> tuple[list, Optional[str]]:
+    find_body = {"faceId": face_id, "faceListId": facelist_id, "maxNumOfCandidatesReturned": max_faces}
+    find = _post("findsimilars", client, _get_api_url("findsimilars"), headers=HEADERS, json=find_body)
+    if find.status_code != 200:
+        return [], find.text
+    matches = []
+    for s in find.json():
+        conf = s.get("confidence", 0) * 100
+        if conf >= threshold:
+            matches.append({
+                "Similarity": conf,
+                "Face": {"FaceId": s.get("persistedFaceId", ""), "ExternalImageId": s.get("userData", "")}
+            })
+    return matches, None
+
 def search_by_image_bytes(event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75) -> dict:
-    facelist_id = f"{FACELIST_PREFIX}{sanitize_key_for_azure(event_slug)}"[:64]
+    facelist_id = collection_id_for(event_slug)
     with httpx.Client(timeout=60) as client:
-        detect_headers = {"Ocp-Apim-Subscription-Key": AZURE_FACE_KEY, "Content-Type": "application/octet-stream"}
-        detect_params = {"returnFaceId": "true", "recognitionModel": "recognition_04", "detectionModel": "detection_03"}
-        detect = client.post(_get_api_url("detect"), headers=detect_headers, params=detect_params, content=data)
-        if detect.status_code != 200:
-            return {"FaceMatches": [], "error": detect.text}
-        faces = detect.json()
+        faces, error = _detect_faces(client, data)
+        if error:
+            return {"FaceMatches": [], "error": error}
         if not faces:
             return {"FaceMatches": []}
         face_id = faces[0].get("faceId")
         if not face_id:
             return {"FaceMatches": []}
-        find_body = {"faceId": face_id, "faceListId": facelist_id, "maxNumOfCandidatesReturned": max_faces}
-        find = client.post(_get_api_url("findsimilars"), headers=HEADERS, json=find_body)
-        if find.status_code != 200:
-            return {"FaceMatches": [], "error": find.text}
-        similar = find.json()
-        matches = []
-        for s in similar:
-            conf = s.get("confidence", 0) * 100
-            if conf >= threshold:
-                matches.append({
-                    "Similarity": conf,
-                    "Face": {"FaceId": s.get("persistedFaceId", ""), "ExternalImageId": s.get("userData", "")}
-                })
+        matches, error = _find_similar(client, facelist_id, face_id, max_faces, threshold)
+        if error:
+            return {"FaceMatches": [], "error": error}
         return {"FaceMatches": matches}
 
+def search_faces_in_image(event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75, max_detected: int = 10) -> list[dict]:
+    """
+    Busca cada face detectada na selfie. Os findsimilars rodam em paralelo,
+    entao o tempo total e ~ detect + o findsimilars mais lento.
+    """
+    facelist_id = collection_id_for(event_slug)
+    with httpx.Client(timeout=60) as client:
+        faces, error = _detect_faces(client, data)
+        if error:
+            raise RuntimeError(f"Erro no detect: {error}")
+        faces = [f for f in faces if f.get("faceId")][:max_detected]
+        if not faces:
+            return []
+        futures = [
+            _search_executor.submit(_find_similar, client, facelist_id, f["faceId"], max_faces, threshold)
+            for f in faces
+        ]
+        groups = []
+        for index, (face, future) in enumerate(zip(faces, futures)):
+            matches, error = future.result()
+            if error:
+                log.warning("Erro no findsimilars da face %d: %s", index, error)
+            groups.append({"FaceIndex": index, "BoundingBox": face.get("faceRectangle"), "FaceMatches": matches})
+        return groups
+
 def reindex_all(event_slug: str, bucket: str, keys: list[str]):
     def _index(key):
         try:
@@ -113,3 +180,51 @@ def reindex_all(event_slug: str, bucket: str, keys: list[str]):
             return {"error": str(e), "key": key}
     with ThreadPoolExecutor(max_workers=5) as executor:
         return list(executor.map(_index, keys))
+
+def face_ids_of(index_result: dict) -> list[str]:
+    """persistedFaceIds criados por index_s3_object (guardados em photos.face_ids)."""
+    return list((index_result or {}).get("face_ids", []))
+
+def _delete_persisted(client: httpx.Client, facelist_id: str, face_ids: list[str]) -> int:
+    # A Face API não tem delete em lote: as remoções vão em paralelo
+    def _delete(face_id):
+        r = client.delete(_get_api_url(f"facelists/{facelist_id}/persistedfaces/{face_id}"), headers=HEADERS)
+        return r.status_code in (200, 404)
+
+    return sum(_delete_executor.map(_delete, face_ids))
+
+def delete_face_ids(event_slug: str, face_ids: list[str]) -> int:
+    """Remove faces da FaceList pelo persistedFaceId, sem listar a FaceList."""
+    facelist_id = collection_id_for(event_slug)
+    with httpx.Client(timeout=60) as client:
+        return _delete_persisted(client, facelist_id, face_ids)
+
+def delete_faces(event_slug: str, should_delete) -> int:
+    """
+    Remove da FaceList as faces cujo userData satisfaz should_delete.
+    Lê a FaceList inteira (O(tamanho da lista)): só para fotos sem face_ids registrados.
+    """
+    facelist_id = collection_id_for(event_slug)
+    with httpx.Client(timeout=60) as client:
+        resp = client.get(_get_api_url(f"facelists/{facelist_id}"), headers=HEADERS)
+        if resp.status_code == 404:
+            return 0
+        if resp.status_code != 200:
+            raise RuntimeError(f"Erro ao listar FaceList: {resp.text}")
+        face_ids = [
+            f["persistedFaceId"]
+            for f in resp.json().get("persistedFaces", [])
+            if should_delete(f.get("userData") or "")
+        ]
+        return _delete_persisted(client, facelist_id, face_ids)
+
+
+def drop_collection(event_slug: str) -> bool:
+    """Apaga a FaceList do evento inteira."""
+    facelist_id = collection_id_for(event_slug)
+    with httpx.Client(timeout=30) as client:
+        resp = client.delete(_get_api_url(f"facelists/{facelist_id}"), headers=HEADERS)
+    face_registry.forget(facelist_id)
+    if resp.status_code not in (200, 404):
+        raise RuntimeError(f"Erro ao apagar FaceList: {resp.text}")
+    return resp.status_code == 200
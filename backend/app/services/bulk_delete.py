@@ -0,0 +1,181 @@
+"""
+bulk_delete.py - Remoção em lote de fotos e mídias de um evento
+
+Em vez de uma chamada ao storage e uma transação por foto:
+- as linhas saem do banco com um único DELETE por tabela;
+- os objetos (original + renditions) saem em lote (Blob Batch / DeleteObjects);
+- os renders sob demanda saem do cache em disco;
+- as faces saem do índice (DeleteFaces / persistedfaces) pelos ids guardados
+  em photos.face_ids, para a busca não devolver matches de fotos apagadas;
+  só fotos indexadas antes dessa coluna caem na listagem filtrada da collection.
+
+Conjuntos grandes rodam como tarefa em background (start_job).
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.media import media_table
+from app.schemas.photo import photos_table
+from app.services import face, feed, http_cache, render_cache, renditions, storage_aio
+from app.services.db import async_session_maker
+from app.services.search_results import parse_external_id
+from app.services.storage import get_bucket_raw
+
+log = logging.getLogger("bulk_delete")
+
+# Ids por mensagem do feed (cabe no limite do NOTIFY)
+_FEED_CHUNK = 100
+
+_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class Selection:
+    """O que apagar de um evento (ao menos um critério; include_media não vale com photo_ids)."""
+    event_slug: str
+    photo_ids: Optional[list[uuid.UUID]] = None
+    uploader_id: Optional[uuid.UUID] = None
+    whole_event: bool = False
+    include_media: bool = False
+
+
+@dataclass
+class Result:
+    photos: int = 0
+    media: int = 0
+    objects: int = 0
+    faces: int = 0
+    failed_keys: list[str] = field(default_factory=list)
+
+
+def _photo_filter(sel: Selection):
+    conditions = [photos_table.c.event_slug == sel.event_slug]
+    if sel.photo_ids:
+        conditions.append(photos_table.c.id.in_(sel.photo_ids))
+    if sel.uploader_id:
+        conditions.append(photos_table.c.uploader_id == sel.uploader_id)
+    return conditions
+
+
+def _media_filter(sel: Selection):
+    conditions = [media_table.c.event_slug == sel.event_slug]
+    if sel.uploader_id:
+        conditions.append(media_table.c.uploader_id == sel.uploader_id)
+    return conditions
+
+
+async def count(conn: AsyncSession, sel: Selection) -> tuple[int, int]:
+    photos = (await conn.execute(select(func.count()).select_from(photos_table).where(*_photo_filter(sel)))).scalar()
+    media = 0
+    if sel.include_media and not sel.photo_ids:
+        media = (await conn.execute(select(func.count()).select_from(media_table).where(*_media_filter(sel)))).scalar()
+    return photos, media
+
+
+async def run(conn: AsyncSession, sel: Selection, remove_faces: bool = True) -> Result:
+    """
+    Apaga a seleção: linhas (1 DELETE por tabela), objetos em lote e faces.
+    remove_faces=False quando a collection inteira vai ser apagada depois.
+    """
+    result = Result()
+
+    # 1. Banco: um DELETE ... RETURNING por tabela
+    photo_rows = (
+        await conn.execute(
+            delete(photos_table)
+            .where(*_photo_filter(sel))
+            .returning(
+                photos_table.c.id,
+                photos_table.c.s3_key,
+                photos_table.c.thumb_key,
+                photos_table.c.web_key,
+                photos_table.c.face_ids,
+            )
+        )
+    ).all()
+    media_rows = []
+    if sel.include_media and not sel.photo_ids:
+        media_rows = (
+            await conn.execute(delete(media_table).where(*_media_filter(sel)).returning(media_table.c.s3_key))
+        ).all()
+    await conn.commit()
+    result.photos, result.media = len(photo_rows), len(media_rows)
+    if not photo_rows and not media_rows:
+        return result
+
+    http_cache.bump(f"photos:{sel.event_slug}")
+    ids = [str(row.id) for row in photo_rows]
+    if len(ids) == 1:
+        await feed.publish(sel.event_slug, feed.PHOTO_DELETED, {"id": ids[0]})
+    else:
+        for start in range(0, len(ids), _FEED_CHUNK):
+            await feed.publish(sel.event_slug, feed.PHOTOS_DELETED, {"ids": ids[start:start + _FEED_CHUNK]})
+
+    # 2. Storage em lote: originais, renditions e mídias
+    keys = [row.s3_key for row in photo_rows] + [k for row in photo_rows for k in renditions.keys_of(row)]
+    keys += [row.s3_key for row in media_rows]
+    result.failed_keys = await storage_aio.delete_objects(get_bucket_raw(), keys)
+    result.objects = len(keys) - len(result.failed_keys)
+    if result.failed_keys:
+        log.warning("%d objetos nao removidos do storage (%s)", len(result.failed_keys), sel.event_slug)
+
+    # 3. Renders sob demanda em cache (a rota também confere a linha antes de servir)
+    if photo_rows:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, render_cache.evict_photos, [row.id for row in photo_rows]
+            )
+        except Exception:
+            log.exception("Falha ao limpar renders em cache (%s)", sel.event_slug)
+
+    # 4. Índice de faces: pelos ids guardados na indexação
+    if photo_rows and remove_faces:
+        face_ids = [face_id for row in photo_rows for face_id in row.face_ids or ()]
+        # Sem face_ids (indexadas antes da coluna): ExternalImageId = id da foto ou chave
+        unknown = [row for row in photo_rows if row.face_ids is None]
+        deleted_ids = {row.id for row in unknown}
+        deleted_keys = {row.s3_key for row in unknown}
+
+        def _should_delete(external_id: str) -> bool:
+            if not external_id:
+                return False
+            photo_id, key = parse_external_id(external_id)
+            return photo_id in deleted_ids or key in deleted_keys
+
+        try:
+            loop = asyncio.get_running_loop()
+            result.faces = await loop.run_in_executor(None, face.delete_face_ids, sel.event_slug, face_ids)
+            if unknown:
+                result.faces += await loop.run_in_executor(None, face.delete_faces, sel.event_slug, _should_delete)
+        except Exception:
+            log.exception("Falha ao remover faces do evento %s", sel.event_slug)
+
+    log.info(
+        "Bulk delete %s: %d fotos, %d midias, %d objetos, %d faces",
+        sel.event_slug, result.photos, result.media, result.objects, result.faces,
+    )
+    return result
+
+
+def start_job(sel: Selection) -> str:
+    """Roda run() em background, com sessão própria. Retorna o id do job (para os logs)."""
+    job_id = uuid.uuid4().hex
+
+    async def _job():
+        try:
+            async with async_session_maker("jobs") as session:
+                await run(session, sel)
+        except Exception:
+            log.exception("Falha no job de bulk delete %s (%s)", job_id, sel.event_slug)
+
+    task = asyncio.create_task(_job(), name=f"bulk_delete:{job_id}")
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job_id
@@ -1,42 +1,315 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import itertools
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from fastapi import Request
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.schemas.user import metadata
 import os
-from dotenv import load_dotenv
-
-# carrega o .env
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL não definida no .env")
-
-# Ajuste do engine com pool seguro para asyncpg
-engine = create_async_engine(
-    DATABASE_URL,
-    pool_size=30,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_recycle=3600,
-    pool_pre_ping=True,
-    echo=False
+from app.services import http_cache, tracing
+from app.services.instrumentation import (
+    DB_READS_ROUTED,
+    DB_REPLICA_HEALTHY,
+    DB_REPLICA_LAG_SECONDS,
+    TimedQueuePool,
+    instrument_engine,
 )
+from app.settings import settings
+
+log = logging.getLogger("db")
+
+# Um pool por classe de carga, para uma não esgotar as conexões da outra:
+# - write: sessões das requisições (get_conn), leitura e escrita;
+# - read: rotas só de leitura (get_read_conn), no primário ou nas réplicas;
+# - jobs: tarefas em background (jobs periódicos, bulk delete, startup).
+POOLS = ("write", "read", "jobs")
+
+# Engines criados sob demanda (startup da app ou primeira sessão): importar o
+# módulo não abre pool nem exige DATABASE_URL
+_engines: dict[str, AsyncEngine] = {}
+_session_factories: dict[str, sessionmaker] = {}
+
+
+def _database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL não definida no .env")
+    return url
+
+
+def _pool_kwargs(pool: str, name: Optional[str] = None) -> dict:
+    size, overflow = {
+        "write": (settings.DB_POOL_WRITE_SIZE, settings.DB_POOL_WRITE_OVERFLOW),
+        "read": (settings.DB_POOL_READ_SIZE, settings.DB_POOL_READ_OVERFLOW),
+        "jobs": (settings.DB_POOL_JOBS_SIZE, settings.DB_POOL_JOBS_OVERFLOW),
+    }[pool]
+    return dict(
+        poolclass=TimedQueuePool,
+        pool_logging_name=name or pool,
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
+def _connect_args(url: str) -> dict:
+    if not (settings.DB_PGBOUNCER and "+asyncpg" in url):
+        return {}
+    # Transaction pooling: a conexão do servidor muda entre transações, então
+    # nada de prepared statements em cache (e nomes únicos para os não cacheados)
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4().hex}__",
+    }
+
+
+def _create_engine(url: str, pool: str, name: Optional[str] = None) -> AsyncEngine:
+    kwargs = {} if url.startswith("sqlite") else _pool_kwargs(pool, name)
+    engine = create_async_engine(url, echo=False, connect_args=_connect_args(url), **kwargs)
+    # Metricas de query e do pool (Prometheus) e spans das queries (tracing)
+    instrument_engine(engine, name or pool)
+    tracing.instrument_engine(engine)
+    return engine
+
+
+def get_engine(pool: str = "write") -> AsyncEngine:
+    if pool not in POOLS:
+        raise ValueError(f"pool invalido: {pool!r}")
+    url = _database_url()
+    # SQLite (benchmarks) fica com um engine só, no pool padrão do driver:
+    # escritas por conexões diferentes disputariam o lock do arquivo
+    if url.startswith("sqlite"):
+        pool = "write"
+    engine = _engines.get(pool)
+    if engine is None:
+        engine = _engines[pool] = _create_engine(url, pool)
+    return engine
 
-async_session_maker = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+
+async def startup() -> None:
+    """Cria os engines (os pools abrem conexões sob demanda)."""
+    for pool in POOLS:
+        get_engine(pool)
+    _load_replicas()
+
+
+async def dispose_engine() -> None:
+    """Fecha os pools; a próxima sessão cria engines novos."""
+    engines = list(_engines.values()) + [r.engine for r in _replicas]
+    _engines.clear()
+    _session_factories.clear()
+    _replicas.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def _factory(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def async_session_maker(pool: str = "write", **kwargs) -> AsyncSession:
+    """Nova sessão no pool indicado (o sessionmaker é ligado ao engine na primeira chamada)."""
+    factory = _session_factories.get(pool)
+    if factory is None:
+        factory = _session_factories[pool] = _factory(get_engine(pool))
+    return factory(**kwargs)
+
+
+async def release_conn(session: AsyncSession) -> None:
+    """
+    Devolve a conexão da sessão ao pool (commit da transação aberta) antes de
+    uma chamada externa longa; a sessão pega outra conexão no próximo uso.
+    """
+    if session.in_transaction():
+        await session.commit()
+
+
+@asynccontextmanager
+async def autocommit_conn(session: AsyncSession):
+    """
+    Conexão do mesmo engine da sessão em AUTOCOMMIT, para uma leitura que não
+    deve abrir transação na sessão (sem BEGIN/COMMIT extras antes de uma
+    chamada externa longa).
+    """
+    async with session.bind.connect() as conn:
+        yield await conn.execution_options(isolation_level="AUTOCOMMIT")
 
 # Inicializa tabelas
 async def init_db():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(metadata.create_all)
 
-# Dependency para FastAPI
-async def get_conn() -> AsyncSession:
-    async with async_session_maker() as session:
+
+# ============================================================
+# RÉPLICAS DE LEITURA
+# ============================================================
+
+# Atraso em segundos: 0 no primário ou com todo o WAL recebido já aplicado
+# (réplica em dia com um primário ocioso não conta o tempo sem escritas).
+# NULL quando a réplica não está recebendo WAL por streaming: sem receiver o
+# LSN recebido congela e "tudo aplicado" deixaria de significar "em dia".
+_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        parsed = make_url(url)
+        self.name = f"replica:{parsed.host}:{parsed.port or 5432}"
+        self.engine = _create_engine(url, "read", self.name)
+        self.sessions = _factory(self.engine)
+        # Fora da rotação até a primeira checagem (None: ainda não checada)
+        self.healthy: Optional[bool] = None
+        self.lag: Optional[float] = None
+
+    def set_health(self, healthy: bool, reason: str = "") -> None:
+        if healthy != self.healthy:
+            if healthy:
+                log.info("Réplica %s de volta na rotação (atraso %.1fs)", self.name, self.lag or 0)
+            else:
+                log.warning("Réplica %s fora da rotação: %s", self.name, reason)
+        self.healthy = healthy
+        DB_REPLICA_HEALTHY.labels(self.name).set(1 if healthy else 0)
+
+
+_replicas: list[Replica] = []
+_rotation = itertools.count()
+_monitor: Optional[asyncio.Task] = None
+
+
+def _load_replicas() -> None:
+    if _replicas:
+        return
+    for url in settings.DATABASE_READ_URLS.split(","):
+        if url.strip():
+            _replicas.append(Replica(url.strip()))
+
+
+async def _check(replica: Replica) -> None:
+    async def _lag() -> Optional[float]:
+        async with replica.engine.connect() as conn:
+            lag = (await conn.execute(_LAG_SQL)).scalar()
+            return None if lag is None else float(lag)
+
+    try:
+        lag = await asyncio.wait_for(_lag(), timeout=settings.DB_REPLICA_CHECK_SECONDS)
+    except Exception as e:
+        replica.set_health(False, f"checagem falhou ({type(e).__name__}: {e})")
+        return
+    if lag is None:
+        replica.set_health(False, "sem streaming do primário (WAL receiver parado)")
+        return
+    replica.lag = lag
+    DB_REPLICA_LAG_SECONDS.labels(replica.name).set(replica.lag)
+    if replica.lag > settings.DB_REPLICA_MAX_LAG_SECONDS:
+        replica.set_health(False, f"atraso de {replica.lag:.1f}s")
+    else:
+        replica.set_health(True)
+
+
+async def _monitor_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+        await asyncio.gather(*(_check(r) for r in _replicas))
+
+
+async def start_replica_monitor() -> None:
+    """Primeira checagem das réplicas (antes de receber tráfego) e checagem periódica."""
+    global _monitor
+    _load_replicas()
+    if not _replicas or _monitor is not None:
+        return
+    await asyncio.gather(*(_check(r) for r in _replicas))
+    _monitor = asyncio.create_task(_monitor_loop(), name="db-replica-monitor")
+
+
+async def stop_replica_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        await asyncio.gather(_monitor, return_exceptions=True)
+        _monitor = None
+
+
+def _route_read(path: str) -> Optional[Replica]:
+    """Réplica para a leitura, ou None para o primário."""
+    if not _replicas:
+        return None
+    # Escrita recente no recurso da rota: a réplica pode ainda não tê-la
+    if http_cache.changed_within(path, settings.DB_REPLICA_MAX_LAG_SECONDS):
+        DB_READS_ROUTED.labels("primary", "recent_write").inc()
+        return None
+    healthy = [r for r in _replicas if r.healthy]
+    if not healthy:
+        DB_READS_ROUTED.labels("primary", "no_healthy_replica").inc()
+        return None
+    return healthy[next(_rotation) % len(healthy)]
+
+
+# ============================================================
+# DEPENDENCIES (FASTAPI)
+# ============================================================
+
+@asynccontextmanager
+async def _session(pool: str, make_session: Callable[[], AsyncSession]):
+    # Span da sessão sem virar o atual: as queries ficam sob o span da rota
+    span = tracing.start_span("db.session", pool=pool)
+    async with make_session() as session:
         try:
             yield session
         finally:
             await session.close()
+            if span is not None:
+                span.end()
+
+
+async def get_conn() -> AsyncSession:
+    async with _session("write", lambda: async_session_maker("write")) as session:
+        yield session
+
+
+async def get_read_conn(request: Request) -> AsyncSession:
+    """
+    Dependency das rotas só de leitura: uma réplica saudável (em rodízio)
+    ou, sem réplica disponível, com escrita recente no recurso da rota ou
+    com a réplica recusando a conexão, o pool "read" do primário.
+    """
+    replica = _route_read(request.url.path)
+    if replica is not None:
+        connected = False
+        try:
+            async with _session(replica.name, replica.sessions) as session:
+                try:
+                    # Conecta já no checkout: se a réplica recusar, ainda dá para cair no primário
+                    await session.connection()
+                    connected = True
+                    DB_READS_ROUTED.labels("replica", "healthy").inc()
+                except (exc.OperationalError, exc.InterfaceError) as e:
+                    replica.set_health(False, f"conexão recusada ({type(e).__name__})")
+                if connected:
+                    yield session
+        except (exc.OperationalError, exc.InterfaceError) as e:
+            # Conexão caiu no meio da rota: sai da rotação até a próxima checagem
+            replica.set_health(False, f"erro na sessão ({type(e).__name__})")
+            raise
+        if connected:
+            return
+        DB_READS_ROUTED.labels("primary", "replica_unavailable").inc()
+
+    async with _session("read", lambda: async_session_maker("read")) as session:
+        yield session
@@ -0,0 +1,107 @@
+"""
+event_cache.py - Catálogo de eventos em memória
+
+Eventos mudam raramente e são lidos em quase toda página de convidado.
+O catálogo é carregado no startup e mantido assim:
+
+- create_event / update_event gravam no banco e atualizam o cache (write-through);
+- a alteração é repassada aos outros workers pelo pubsub (NOTIFY), já com
+  os dados do evento, então ninguém precisa reconsultar o banco;
+- cada evento fica também pré-serializado (JSON bytes), servido direto
+  pelas rotas públicas.
+
+Se o startup não conseguiu carregar o catálogo, is_loaded() é False e os
+serviços voltam a consultar o banco.
+"""
+
+import logging
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.event import EventOut, events_table
+from app.services import http_cache, pubsub
+
+log = logging.getLogger("event_cache")
+
+_TOPIC = "event_cache"
+
+_events: dict[str, EventOut] = {}
+_json: dict[str, bytes] = {}
+_list_json: Optional[bytes] = None
+_loaded = False
+
+
+def is_loaded() -> bool:
+    return _loaded
+
+
+def _store(event: EventOut) -> None:
+    global _list_json
+    _events[event.slug] = event
+    _json[event.slug] = event.model_dump_json().encode()
+    _list_json = None
+
+
+async def load(conn: AsyncSession) -> int:
+    """Carrega todos os eventos do banco (startup)."""
+    global _loaded, _list_json
+    rows = (await conn.execute(select(events_table))).mappings().all()
+    _events.clear()
+    _json.clear()
+    _list_json = None
+    for row in rows:
+        _store(EventOut.model_validate(row))
+    _loaded = True
+    log.info("Catalogo de eventos carregado: %d eventos", len(_events))
+    return len(_events)
+
+
+def put(event: EventOut) -> None:
+    """Write-through: atualiza este worker e avisa os demais."""
+    _store(event)
+    pubsub.publish_nowait(_TOPIC, event.model_dump(mode="json"))
+    http_cache.bump("events")
+
+
+def _on_remote(topic: str, message) -> None:
+    if topic == _TOPIC:
+        _store(EventOut.model_validate(message))
+
+
+pubsub.add_handler(_on_remote)
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def get(slug: str) -> Optional[EventOut]:
+    return _events.get(slug)
+
+
+def get_json(slug: str) -> Optional[bytes]:
+    return _json.get(slug)
+
+
+def list_all() -> list[EventOut]:
+    return [_events[slug] for slug in sorted(_events)]
+
+
+def list_json() -> bytes:
+    """Lista de eventos pré-serializada (refeita só quando algo muda)."""
+    global _list_json
+    if _list_json is None:
+        _list_json = b"[" + b",".join(_json[slug] for slug in sorted(_json)) + b"]"
+    return _list_json
+
+
+def list_by_date_desc() -> list[EventOut]:
+    """Mesma ordem do ORDER BY event_date DESC do Postgres (nulos primeiro)."""
+    return sorted(
+        _events.values(),
+        key=lambda e: (e.event_date is None, e.event_date or date.min),
+        reverse=True,
+    )
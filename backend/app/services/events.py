@@ -4,14 +4,33 @@ from sqlalchemy import select, insert, update
 from app.schemas.event import CreateEventIn, EventOut, events_table, UpdateEventIn
 from pydantic import AnyUrl
 from typing import List, Optional
+from app.services import face_registry, event_cache
 
 
 # Buscar evento por slug
 async def get_event_by_slug(conn: AsyncSession, slug: str) -> Optional[EventOut]:
+    cached = event_cache.get(slug)
+    if cached is not None:
+        return cached
     stmt = select(events_table).where(events_table.c.slug == slug)
     result = await conn.execute(stmt)
     row = result.mappings().first()
-    return EventOut(**row) if row else None
+    if not row:
+        return None
+    event = EventOut(**row)
+    # Evento criado fora do catalogo (ex.: outro worker com a ponte fora do ar)
+    if event_cache.is_loaded():
+        event_cache.put(event)
+    return event
+
+
+async def get_event_json(conn: AsyncSession, slug: str) -> Optional[bytes]:
+    """Evento já serializado (cache); consulta o banco só em caso de miss."""
+    cached = event_cache.get_json(slug)
+    if cached is not None:
+        return cached
+    event = await get_event_by_slug(conn, slug)
+    return event.model_dump_json().encode() if event else None
 
 
 async def create_event(conn: AsyncSession, event_data: CreateEventIn) -> EventOut:
@@ -31,11 +50,19 @@ async def create_event(conn: AsyncSession, event_data: CreateEventIn) -> EventOu
     result = await conn.execute(stmt)
     await conn.commit()
     row = result.mappings().first()
-    return EventOut.model_validate(row)  # ✅ Usar .model_validate() para Pydantic v2
+    event = EventOut.model_validate(row)
+    event_cache.put(event)
+
+    # Collection de faces criada uma única vez aqui, nunca no caminho de busca
+    await face_registry.provision(conn, row["slug"])
+
+    return event  # ✅ Usar .model_validate() para Pydantic v2
 
 
 # Listar eventos
 async def list_events(conn: AsyncSession) -> List[EventOut]:
+    if event_cache.is_loaded():
+        return event_cache.list_all()
     stmt = select(events_table)
     result = await conn.execute(stmt)
     rows = result.mappings().all()
@@ -72,4 +99,8 @@ async def update_event(conn: AsyncSession, slug: str, payload: UpdateEventIn) ->
     row = result.mappings().first()
 
     # Se 'row' for None, significa que o evento com aquele slug não foi encontrado.
-    return EventOut.model_validate(row) if row else None
\ No newline at end of file
+    if not row:
+        return None
+    event = EventOut.model_validate(row)
+    event_cache.put(event)
+    return event
\ No newline at end of file
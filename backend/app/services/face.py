@@ -6,6 +6,7 @@ Usa lazy import para evitar falhas se o provider nao estiver configurado.
 """
 
 from app.settings import settings
+from app.services.instrumentation import track_call
 
 
 def _get_impl():
@@ -20,19 +21,118 @@ def _get_impl():
     raise RuntimeError(f"FACE_PROVIDER invalido: {provider!r}. Use 'azure' ou 'aws'.")
 
 
+def startup() -> None:
+    """Importa (e cria o cliente do) provider configurado: fora da primeira busca."""
+    _get_impl()
+
+
+def _track(operation: str):
+    return track_call("face", operation, getattr(settings, "FACE_PROVIDER", "azure"))
+
+
+def collection_id_for(event_slug: str) -> str:
+    """Id da collection/facelist do evento no provider atual."""
+    return _get_impl().collection_id_for(event_slug)
+
+
 def ensure_collection(event_slug: str) -> str:
     """Garante que a collection/facelist do evento exista."""
-    return _get_impl().ensure_collection(event_slug)
+    with _track("ensure_collection"):
+        return _get_impl().ensure_collection(event_slug)
 
 
 def index_s3_object(event_slug: str, bucket: str, file_key: str, external_image_id: str = None) -> dict:
     """Indexa faces de uma imagem no storage."""
-    return _get_impl().index_s3_object(event_slug, bucket, file_key, external_image_id)
+    with _track("index"):
+        return _get_impl().index_s3_object(event_slug, bucket, file_key, external_image_id)
+
+
+def face_ids_of(index_result: dict) -> list[str]:
+    """Ids das faces criadas por index_s3_object (FaceIds / persistedFaceIds)."""
+    return _get_impl().face_ids_of(index_result)
+
+
+def delete_face_ids(event_slug: str, face_ids: list[str]) -> int:
+    """Remove faces pelos ids guardados na indexacao (sem listar a collection)."""
+    if not face_ids:
+        return 0
+    with _track("delete_face_ids"):
+        return _get_impl().delete_face_ids(event_slug, face_ids)
+
+
+def delete_faces(event_slug: str, should_delete) -> int:
+    """Remove as faces cujo ExternalImageId/userData satisfaz should_delete(ext_id)."""
+    with _track("delete_faces"):
+        return _get_impl().delete_faces(event_slug, should_delete)
+
+
+def drop_collection(event_slug: str) -> bool:
+    """Apaga a collection/facelist inteira do evento."""
+    with _track("drop_collection"):
+        return _get_impl().drop_collection(event_slug)
+
+
+def search_by_image_bytes(
+    event_slug: str,
+    data: bytes,
+    max_faces: int = 50,
+    threshold: int = 75,
+    multi_face: bool = False,
+    ranking: str = "best",
+) -> dict:
+    """
+    Busca faces similares a partir de bytes da imagem.
+    Com multi_face=True busca todas as faces da selfie e retorna, alem dos
+    matches fundidos, os grupos por face em "FaceGroups".
+    """
+    impl = _get_impl()
+    if not multi_face:
+        with _track("search"):
+            return impl.search_by_image_bytes(event_slug, data, max_faces, threshold)
+
+    with _track("search_multi"):
+        groups = impl.search_faces_in_image(
+            event_slug, data, max_faces, threshold, max_detected=settings.FACE_SEARCH_MAX_FACES
+        )
+    return {"FaceMatches": merge_face_matches(groups, ranking), "FaceGroups": groups}
+
+
+def merge_face_matches(groups: list[dict], ranking: str = "best") -> list[dict]:
+    """
+    Funde os matches de varias faces em um por ExternalImageId.
+    - best: score = maior similaridade entre as faces
+    - combined: score = soma da melhor similaridade de cada face
+      (fotos com mais pessoas do grupo sobem no ranking)
+    """
+    merged: dict[str, dict] = {}
+    for group in groups:
+        best_in_group: dict[str, dict] = {}
+        for match in group.get("FaceMatches", []):
+            image_id = match["Face"]["ExternalImageId"]
+            current = best_in_group.get(image_id)
+            if current is None or match["Similarity"] > current["Similarity"]:
+                best_in_group[image_id] = match
 
+        for image_id, match in best_in_group.items():
+            entry = merged.get(image_id)
+            if entry is None:
+                merged[image_id] = entry = {
+                    "Similarity": match["Similarity"],
+                    "Score": 0.0,
+                    "Face": match["Face"],
+                    "FaceIndexes": [],
+                }
+            elif match["Similarity"] > entry["Similarity"]:
+                entry["Similarity"] = match["Similarity"]
+                entry["Face"] = match["Face"]
+            entry["FaceIndexes"].append(group.get("FaceIndex"))
+            if ranking == "combined":
+                entry["Score"] += match["Similarity"]
 
-def search_by_image_bytes(event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75) -> dict:
-    """Busca faces similares a partir de bytes da imagem."""
-    return _get_impl().search_by_image_bytes(event_slug, data, max_faces, threshold)
+    for entry in merged.values():
+        if ranking != "combined":
+            entry["Score"] = entry["Similarity"]
+    return sorted(merged.values(), key=lambda m: m["Score"], reverse=True)
 
 
 def sanitize_key_for_rekognition(s: str) -> str:
@@ -42,4 +142,5 @@ def sanitize_key_for_rekognition(s: str) -> str:
 
 def reindex_all(event_slug: str, bucket: str, keys: list[str]):
     """Reindexa todas as fotos de um evento."""
-    return _get_impl().reindex_all(event_slug, bucket, keys)
+    with _track("reindex"):
+        return _get_impl().reindex_all(event_slug, bucket, keys)
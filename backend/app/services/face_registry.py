@@ -0,0 +1,76 @@
+"""
+face_registry.py - Registro de collections/facelists provisionadas por evento
+
+A fonte da verdade e a coluna events.face_collection_id: a collection e
+criada uma unica vez, na criacao do evento, e o id gravado no banco.
+Cada worker carrega esse registro no startup (warm_up), entao nenhum
+worker precisa consultar o provider de faces no caminho de busca.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.event import events_table
+from app.services import face
+
+log = logging.getLogger("face_registry")
+
+# Collections confirmadas neste processo (carregadas do banco ou provisionadas)
+KNOWN_COLLECTIONS: set[str] = set()
+
+
+def is_known(collection_id: str) -> bool:
+    return collection_id in KNOWN_COLLECTIONS
+
+
+def mark_known(collection_id: str) -> None:
+    KNOWN_COLLECTIONS.add(collection_id)
+
+
+def forget(collection_id: str) -> None:
+    KNOWN_COLLECTIONS.discard(collection_id)
+
+
+async def warm_up(conn: AsyncSession) -> int:
+    """Carrega do banco as collections ja provisionadas para o provider atual."""
+    result = await conn.execute(
+        select(events_table.c.slug, events_table.c.face_collection_id)
+        .where(events_table.c.face_collection_id.is_not(None))
+    )
+    loaded = 0
+    for slug, collection_id in result.all():
+        # Ignora ids gravados por outro provider (ex.: troca de aws -> azure)
+        if collection_id == face.collection_id_for(slug):
+            mark_known(collection_id)
+            loaded += 1
+    log.info("Registro de collections carregado: %d eventos", loaded)
+    return loaded
+
+
+async def provision(conn: AsyncSession, event_slug: str) -> Optional[str]:
+    """
+    Cria a collection do evento no provider (uma vez) e grava o id no banco.
+    Falhas no provider nao impedem a criacao do evento: a collection sera
+    criada sob demanda na primeira indexacao.
+    """
+    collection_id = face.collection_id_for(event_slug)
+    if not is_known(collection_id):
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, face.ensure_collection, event_slug)
+        except Exception as e:
+            log.warning("Falha ao provisionar collection '%s': %s", collection_id, e)
+            return None
+
+    await conn.execute(
+        update(events_table)
+        .where(events_table.c.slug == event_slug)
+        .values(face_collection_id=collection_id)
+    )
+    await conn.commit()
+    mark_known(collection_id)
+    return collection_id
@@ -0,0 +1,24 @@
+"""
+feed.py - Mensagens do feed de um evento (SSE em /stream/{evento})
+
+As rotas de escrita publicam aqui o que mudou (foto adicionada/removida,
+comentário novo); os clientes conectados no stream recebem só o
+incremento, sem refazer a listagem inteira.
+"""
+
+from typing import Any
+
+from app.services import pubsub
+
+PHOTO_ADDED = "photo_added"
+PHOTO_DELETED = "photo_deleted"
+PHOTOS_DELETED = "photos_deleted"
+COMMENT_ADDED = "comment_added"
+
+
+def topic(event_slug: str) -> str:
+    return f"event:{event_slug}"
+
+
+async def publish(event_slug: str, kind: str, data: Any) -> None:
+    await pubsub.publish(topic(event_slug), {"type": kind, "data": data})
@@ -0,0 +1,44 @@
+"""
+hashing.py - Hash e verificação de senhas com bcrypt
+
+Funções puras, executadas nos processos do pool de passwords.py. Este
+módulo não importa nada da aplicação, para que os processos filhos subam
+rápido.
+"""
+
+from typing import Optional
+
+from passlib.hash import bcrypt
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def hash_many(passwords: list[str], rounds: int) -> list[str]:
+    """Um lote de senhas em uma ida ao processo (cadastro em massa)."""
+    hasher = bcrypt.using(rounds=rounds)
+    return [hasher.hash(password) for password in passwords]
+
+
+def cost(password_hash: str) -> Optional[int]:
+    """Custo gravado no hash ($2b$12$... -> 12); None se não for bcrypt."""
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def verify(password: str, password_hash: str, rounds: int) -> tuple[bool, Optional[str]]:
+    """
+    Confere a senha. Se ela confere e o hash foi gerado com outro custo,
+    devolve também o hash novo (com `rounds`) para ser gravado.
+    """
+    try:
+        valid = bcrypt.verify(password, password_hash)
+    except ValueError:
+        # Hash malformado ou de outro esquema
+        return False, None
+    if not valid or cost(password_hash) == rounds:
+        return valid, None
+    return True, hash_password(password, rounds)
@@ -0,0 +1,189 @@
+"""
+http_cache.py - Cache HTTP das rotas de leitura mais consultadas
+
+Durante um evento o frontend faz polling constante de eventos, comentários,
+fotos e galeria. Este middleware:
+
+- guarda o corpo serializado das respostas 200 em memória (TTL curto);
+- associa cada rota a "recursos" com contadores de versão; as escritas
+  chamam bump() e invalidam na hora as respostas que dependem do recurso;
+- responde com ETag fraco / Last-Modified e devolve 304 quando o cliente
+  já tem a versão atual (If-None-Match / If-Modified-Since).
+
+O ETag vem de (rota, query, versões), não do corpo: o corpo traz URLs
+pré-assinadas novas a cada render, então o hash dele mudaria a cada TTL.
+Para o cliente não ficar com URLs vencidas, o ETag também gira a cada
+meia validade das URLs (PRESIGNED_EXPIRE_SECONDS / 2).
+
+Um hit não consulta o banco pela rota (requisições autenticadas ainda
+passam pelo UPDATE de last_seen, que fica por fora deste middleware). Os bumps são repassados aos outros workers
+pelo pubsub (LISTEN/NOTIFY); se a ponte estiver fora, a resposta antiga
+vale no máximo HTTP_CACHE_TTL_SECONDS em outro worker.
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.services import pubsub
+from app.settings import settings
+
+_TOPIC = "http_cache"
+
+# Versão atual de cada recurso (ex.: "events", "comments:{slug}")
+_versions: dict[str, int] = {}
+# Quando cada recurso mudou pela última vez (time.monotonic)
+_changed_at: dict[str, float] = {}
+
+
+@dataclass
+class _Entry:
+    versions: tuple
+    expires_at: float
+    modified_at: float
+    etag: str
+    body: bytes
+    # Headers da resposta original (sem content-length e os de cache)
+    headers: list
+
+
+_cache: "OrderedDict[str, _Entry]" = OrderedDict()
+
+# rota (GET) -> recursos de que a resposta depende
+_RULES = [
+    (re.compile(r"^/events/?$"), lambda m: ["events"]),
+    (re.compile(r"^/events/([^/]+)$"), lambda m: ["events"]),
+    (re.compile(r"^/comments/([^/]+)$"), lambda m: [f"comments:{m.group(1)}"]),
+    (re.compile(r"^/photos/([^/]+)$"), lambda m: [f"photos:{m.group(1)}"]),
+    (re.compile(r"^/gallery/([^/]+)/(general|videos)$"), lambda m: [f"gallery:{m.group(1)}"]),
+]
+
+
+def _bump_local(resources) -> None:
+    now = time.monotonic()
+    for resource in resources:
+        _versions[resource] = _versions.get(resource, 0) + 1
+        _changed_at[resource] = now
+
+
+def bump(*resources: str) -> None:
+    """Marca os recursos como alterados (chamar após o commit da escrita)."""
+    if not resources:
+        return
+    _bump_local(resources)
+    pubsub.publish_nowait(_TOPIC, list(resources))
+
+
+def _on_remote(topic: str, message) -> None:
+    if topic == _TOPIC:
+        _bump_local(message)
+
+
+pubsub.add_handler(_on_remote)
+
+
+def resources_for(path: str) -> Optional[list[str]]:
+    for pattern, resources in _RULES:
+        match = pattern.match(path)
+        if match:
+            return resources(match)
+    return None
+
+
+def changed_within(path: str, seconds: float) -> bool:
+    """Algum recurso da rota mudou nos últimos `seconds` (réplica pode não ter a escrita)."""
+    since = time.monotonic() - seconds
+    return any(_changed_at.get(r, since) > since for r in resources_for(path) or ())
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparação fraca: ignora o prefixo W/
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _not_modified(request: Request, entry: _Entry) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, entry.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry.modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# Headers que este middleware define (ou que o Response recalcula)
+_OWN_HEADERS = {b"content-length", b"etag", b"last-modified", b"cache-control"}
+
+
+def _etag(key: str, versions: tuple, now: float) -> str:
+    url_epoch = int(now // max(settings.PRESIGNED_EXPIRE_SECONDS // 2, 1))
+    digest = hashlib.blake2b(repr((key, versions, url_epoch)).encode(), digest_size=16).hexdigest()
+    return 'W/"%s"' % digest
+
+
+def _store(key: str, entry: _Entry) -> None:
+    _cache[key] = entry
+    _cache.move_to_end(key)
+    while len(_cache) > settings.HTTP_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def middleware(request: Request, call_next):
+    if request.method != "GET" or settings.HTTP_CACHE_TTL_SECONDS <= 0:
+        return await call_next(request)
+    resources = resources_for(request.url.path)
+    if resources is None:
+        return await call_next(request)
+
+    key = f"{request.url.path}?{request.url.query}"
+    # Versões lidas antes de gerar a resposta: uma escrita concorrente invalida a entrada
+    versions = tuple(_versions.get(r, 0) for r in resources)
+    now = time.time()
+    entry = _cache.get(key)
+
+    if entry is None or entry.versions != versions or entry.expires_at <= now:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        previous = entry
+        etag = _etag(key, versions, now)
+        # Mesmas versões de antes (TTL expirou sem mudança): mantém Last-Modified
+        modified_at = previous.modified_at if previous and previous.etag == etag else now
+        entry = _Entry(
+            versions=versions,
+            expires_at=now + settings.HTTP_CACHE_TTL_SECONDS,
+            modified_at=modified_at,
+            etag=etag,
+            body=body,
+            headers=[(k, v) for k, v in response.raw_headers if k.lower() not in _OWN_HEADERS],
+        )
+        _store(key, entry)
+
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.modified_at, usegmt=True),
+        # O cliente sempre revalida; com o ETag a revalidação custa um 304
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, entry):
+        response = Response(status_code=304, headers=headers)
+        response.raw_headers.extend((k, v) for k, v in entry.headers if k.lower() != b"content-type")
+        return response
+    response = Response(content=entry.body, headers=headers)
+    response.raw_headers.extend(entry.headers)
+    return response
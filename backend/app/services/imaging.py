@@ -0,0 +1,55 @@
+"""
+imaging.py - Geração das renditions (thumb/web) com Pillow
+
+Funções puras (bytes -> bytes), executadas nos processos do pool de
+renditions.py. Este módulo não importa nada da aplicação, para que os
+processos filhos subam rápido.
+"""
+
+import io
+
+# variante -> (lado maior em px, qualidade)
+VARIANTS = {
+    "thumb": (320, 70),
+    "web": (1600, 82),
+}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+
+def render_box(data: bytes, width: int, height: int, fmt: str = "webp", quality: int = 82) -> bytes:
+    """Reduz a imagem para caber em width x height (mantém a proporção, nunca amplia)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        original.draft("RGB", (width, height))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    image.thumbnail((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, FORMATS[fmt][0], quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def render_variants(data: bytes, fmt: str = "webp", variants: dict = None) -> dict[str, bytes]:
+    """Gera cada variante reduzindo a imagem original (respeita a orientação EXIF)."""
+    from PIL import Image, ImageOps
+
+    pil_format = FORMATS[fmt][0]
+    variants = variants or VARIANTS
+    with Image.open(io.BytesIO(data)) as original:
+        # draft() deixa o decoder do JPEG já reduzir na leitura (bem mais rápido)
+        largest = max(size for size, _ in variants.values())
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    out = {}
+    # Da maior para a menor: cada variante parte da anterior, já reduzida
+    for name, (size, quality) in sorted(variants.items(), key=lambda v: v[1][0], reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, quality=quality, optimize=True)
+        out[name] = buffer.getvalue()
+    return out
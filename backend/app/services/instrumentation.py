@@ -0,0 +1,301 @@
+"""
+instrumentation.py - Métricas Prometheus dos caminhos quentes
+
+Responde "onde foi o tempo" de uma requisição lenta:
+- http_request_duration_seconds: latência por rota (template, não a URL);
+- db_query_duration_seconds: cada query (eventos do engine SQLAlchemy);
+- db_pool_checkout_wait_seconds / db_pool_checked_out / db_pool_capacity /
+  db_pool_timeouts_total / db_pool_connections_opened_total: espera por
+  conexão, saturação e rotatividade de cada pool (write, read, jobs);
+- db_replica_lag_seconds / db_replica_healthy / db_reads_routed_total:
+  atraso das réplicas de leitura e para onde as leituras foram;
+- external_call_duration_seconds: chamadas ao storage e ao provider de
+  faces, por operação e provider (track_call);
+- http_request_presign_seconds: tempo total assinando URLs na requisição
+  (somado por requisição: uma observação por assinatura custaria ~10% do
+  tempo da própria assinatura);
+- executor_queue_depth: tarefas aguardando nos executors registrados.
+
+Multiprocess (uvicorn --workers N): com PROMETHEUS_MULTIPROC_DIR definido
+cada worker grava as métricas em arquivos nesse diretório e o /metrics de
+qualquer worker agrega todos (registry()). O diretório deve ser limpo
+antes de subir os workers (ver Dockerfile).
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Optional, Union
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, ProcessCollector, multiprocess
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.settings import settings
+from app.services import tracing
+from app.services.tracing import route_label
+
+log = logging.getLogger("instrumentation")
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Latência das requisições por rota",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS,
+)
+HTTP_PRESIGN_SECONDS = Histogram(
+    "http_request_presign_seconds", "Tempo assinando URLs por requisição",
+    ["route"], buckets=FAST_BUCKETS,
+)
+PRESIGNED_URLS = Counter("storage_presigned_urls_total", "URLs assinadas", ["provider"])
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Duração das queries", ["operation"], buckets=FAST_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obter conexão do pool (inclui abrir conexão nova)",
+    ["pool"], buckets=FAST_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Conexões em uso", ["pool"], multiprocess_mode="livesum")
+DB_POOL_CAPACITY = Gauge("db_pool_capacity", "pool_size + max_overflow", ["pool"], multiprocess_mode="livesum")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts que estouraram o pool_timeout", ["pool"])
+DB_POOL_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened_total", "Conexões novas abertas pelo pool (inclui recycle/pre-ping)", ["pool"],
+)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds", "Atraso de replicação medido em cada réplica", ["replica"], multiprocess_mode="max",
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy", "Réplica na rotação de leituras (1) ou fora (0)", ["replica"], multiprocess_mode="min",
+)
+DB_READS_ROUTED = Counter(
+    "db_reads_routed_total", "Sessões de leitura por destino (com réplicas configuradas)", ["target", "reason"],
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "external_call_duration_seconds", "Chamadas ao storage e ao provider de faces",
+    ["component", "operation", "provider", "outcome"], buckets=REQUEST_BUCKETS,
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth", "Tarefas aguardando worker livre", ["executor"], multiprocess_mode="livesum",
+)
+PASSWORD_QUEUE_REJECTED = Counter(
+    "password_queue_rejected_total", "Operações de senha recusadas com a fila cheia (503)", ["operation"],
+)
+METRICS_QUEUE = Counter(
+    "metrics_queue_total", "Métricas de uso (tabela metrics) na fila: queued, written, dropped, failed", ["outcome"],
+)
+
+
+def registry() -> CollectorRegistry:
+    """Registry do /metrics: agrega os arquivos de todos os workers em multiprocess."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    # Memória/CPU do worker que respondeu o scrape
+    ProcessCollector(registry=registry)
+    return registry
+
+
+# ============================================================
+# REQUISIÇÕES
+# ============================================================
+
+class _RequestStats:
+    __slots__ = ("presign_seconds", "presign_count")
+
+    def __init__(self):
+        self.presign_seconds = 0.0
+        self.presign_count = 0
+
+
+_request_stats: contextvars.ContextVar[Optional[_RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI: latência por rota até o fim do corpo (SSE fica de fora)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        finished: Optional[float] = None
+        status, streaming = 500, False
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+
+        async def _send(message):
+            nonlocal status, streaming, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks rodam depois da resposta: não entram na latência
+                finished = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _request_stats.reset(token)
+            if not streaming:
+                route = route_label(scope)
+                elapsed = (finished or time.perf_counter()) - started
+                HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(elapsed)
+                if stats.presign_count:
+                    HTTP_PRESIGN_SECONDS.labels(route).observe(stats.presign_seconds)
+                    PRESIGNED_URLS.labels(getattr(settings, "STORAGE_PROVIDER", "azure")).inc(stats.presign_count)
+
+
+def record_presign(seconds: float) -> None:
+    """Soma o tempo de uma assinatura na requisição atual (fora de requisição é ignorado)."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.presign_seconds += seconds
+        stats.presign_count += 1
+
+
+# ============================================================
+# CHAMADAS EXTERNAS
+# ============================================================
+
+@contextmanager
+def track_call(component: str, operation: str, provider: str):
+    """Mede uma chamada ao storage/provider de faces (sync ou `with` em volta de um await), com span."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        with tracing.span(f"{component}.{operation}", "client", provider=provider):
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(component, operation, provider, outcome).observe(time.perf_counter() - started)
+
+
+# ============================================================
+# BANCO
+# ============================================================
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono que mede a espera por conexão (label = pool_logging_name)."""
+
+    def _do_get(self):
+        pool = self._orig_logging_name or "default"
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(pool).inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(pool).observe(time.perf_counter() - started)
+
+
+def _operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, pool_name: str = "default") -> None:
+    """Registra os timers de query e os gauges do pool (label pool_name) no engine."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            DB_QUERY_SECONDS.labels(_operation(statement)).observe(time.perf_counter() - started)
+
+    def _update_pool(*_):
+        pool = sync_engine.pool
+        if hasattr(pool, "checkedout"):
+            DB_POOL_CHECKED_OUT.labels(pool_name).set(pool.checkedout())
+
+    event.listen(sync_engine, "checkout", _update_pool)
+    event.listen(sync_engine, "checkin", _update_pool)
+    event.listen(sync_engine, "connect", lambda *_: DB_POOL_CONNECTIONS_OPENED.labels(pool_name).inc())
+
+    pool = sync_engine.pool
+    if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+        DB_POOL_CAPACITY.labels(pool_name).set(pool.size() + max(pool._max_overflow, 0))
+
+
+# ============================================================
+# EXECUTORS
+# ============================================================
+
+ExecutorSource = Union[Executor, Callable[[], Optional[Executor]]]
+_executors: dict[str, ExecutorSource] = {}
+_sampler: Optional[asyncio.Task] = None
+
+
+def register_executor(name: str, source: ExecutorSource) -> None:
+    """Executor (ou função que o retorna, para pools criados sob demanda) a amostrar."""
+    _executors[name] = source
+
+
+def _queue_depth(executor: Executor) -> int:
+    if isinstance(executor, ThreadPoolExecutor):
+        return executor._work_queue.qsize()
+    if isinstance(executor, ProcessPoolExecutor):
+        # Itens pendentes incluem os que estão rodando (um por processo)
+        return max(0, len(executor._pending_work_items) - executor._max_workers)
+    return 0
+
+
+def sample_executors() -> None:
+    for name, source in _executors.items():
+        executor = source() if not isinstance(source, Executor) else source
+        EXECUTOR_QUEUE_DEPTH.labels(name).set(_queue_depth(executor) if executor is not None else 0)
+
+
+async def _sample_loop(interval: float) -> None:
+    while True:
+        try:
+            sample_executors()
+        except Exception:
+            log.exception("Falha ao amostrar executors")
+        await asyncio.sleep(interval)
+
+
+def startup() -> None:
+    """Executor padrão do loop registrado e amostragem periódica (startup da app)."""
+    global _sampler
+    loop = asyncio.get_running_loop()
+    default_executor = tracing.ContextThreadPoolExecutor(thread_name_prefix="default")
+    loop.set_default_executor(default_executor)
+    register_executor("default", default_executor)
+    if _sampler is None and settings.INSTRUMENTATION_SAMPLE_SECONDS > 0:
+        _sampler = asyncio.create_task(_sample_loop(settings.INSTRUMENTATION_SAMPLE_SECONDS), name="executor-sampler")
+
+
+async def shutdown() -> None:
+    global _sampler
+    if _sampler is not None:
+        _sampler.cancel()
+        await asyncio.gather(_sampler, return_exceptions=True)
+        _sampler = None
+    if MULTIPROCESS:
+        # Gauges "livesum" deste worker deixam de contar
+        multiprocess.mark_process_dead(os.getpid())
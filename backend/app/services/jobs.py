@@ -0,0 +1,76 @@
+"""
+jobs.py - Tarefas periodicas em background
+
+Cada worker do uvicorn roda o mesmo startup, entao as tarefas periodicas
+usam um advisory lock do Postgres: em cada rodada apenas o worker que
+consegue o lock executa o job; os demais pulam aquela rodada.
+"""
+
+import asyncio
+import logging
+import zlib
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.db import get_engine
+
+log = logging.getLogger("jobs")
+
+_tasks: list[asyncio.Task] = []
+
+
+def _lock_id(name: str) -> int:
+    # Id estavel (entre processos) para o advisory lock do job
+    return zlib.crc32(f"jobs:{name}".encode())
+
+
+async def run_exclusive(name: str, job: Callable[[AsyncSession], Awaitable]) -> bool:
+    """
+    Executa `job(session)` se nenhum outro processo estiver rodando o mesmo job.
+    Retorna False quando o lock ja esta com outro worker.
+    """
+    lock_id = _lock_id(name)
+    # Advisory lock e por conexao: a sessao do job fica presa a esta conexao
+    # (commits do job nao devolvem a conexao ao pool antes do unlock)
+    async with get_engine("jobs").connect() as conn:
+        got = (await conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id})).scalar()
+        await conn.commit()
+        if not got:
+            return False
+        try:
+            async with AsyncSession(bind=conn, expire_on_commit=False) as session:
+                await job(session)
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+            await conn.commit()
+    return True
+
+
+def run_periodic(name: str, interval_seconds: int, job: Callable[[AsyncSession], Awaitable]) -> None:
+    """Agenda `job` a cada interval_seconds (a primeira rodada e imediata)."""
+    if interval_seconds <= 0:
+        log.info("Job %s desabilitado (intervalo %s)", name, interval_seconds)
+        return
+
+    async def _loop():
+        while True:
+            try:
+                await run_exclusive(name, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Falha no job %s", name)
+            await asyncio.sleep(interval_seconds)
+
+    _tasks.append(asyncio.create_task(_loop(), name=f"job:{name}"))
+
+
+async def shutdown() -> None:
+    """Cancela as tarefas periodicas (chamado no shutdown da app)."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
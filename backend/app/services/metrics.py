@@ -1,9 +1,16 @@
+import asyncio
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert, select
 from app.schemas.metrics import metrics_table, MetricIn
+from app.services.db import async_session_maker
+from app.services.instrumentation import METRICS_QUEUE
+from app.settings import settings
 from typing import Optional
 from datetime import datetime
 
+log = logging.getLogger("metrics")
+
 
 # Adiciona uma nova métrica
 async def add_metric(conn: AsyncSession, metric: MetricIn):
@@ -69,3 +76,104 @@ def _normalize_metric_row(row):
             else str(row["created_at"])
         ),
     }
+
+
+# ============================================================
+# FILA DE MÉTRICAS (gravadas em lote, fora da requisição)
+# ============================================================
+
+_queue: Optional[asyncio.Queue] = None
+_writer: Optional[asyncio.Task] = None
+_pending: set[asyncio.Task] = set()
+# Posto na fila pelo shutdown: o writer grava o lote em mãos e termina
+_STOP = object()
+
+
+async def _write(rows: list[dict]) -> None:
+    try:
+        async with async_session_maker("jobs") as session:
+            await session.execute(insert(metrics_table), rows)
+            await session.commit()
+    except Exception:
+        METRICS_QUEUE.labels("failed").inc(len(rows))
+        log.exception("Falha ao gravar %d métricas", len(rows))
+        return
+    METRICS_QUEUE.labels("written").inc(len(rows))
+
+
+def _drain(rows: list[dict]) -> tuple[list[dict], bool]:
+    """Completa o lote com o que está na fila; o bool indica se o _STOP saiu dela."""
+    stop = False
+    while len(rows) < settings.METRICS_BATCH_SIZE and not _queue.empty():
+        row = _queue.get_nowait()
+        if row is _STOP:
+            stop = True
+        else:
+            rows.append(row)
+    return rows, stop
+
+
+async def _write_loop() -> None:
+    while True:
+        first = await _queue.get()
+        if first is _STOP:
+            return
+        # Junta o que chegar na janela num INSERT só
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        rows, stop = _drain([first])
+        await _write(rows)
+        if stop:
+            return
+
+
+def track_nowait(
+    action: str,
+    user_id: Optional[str] = None,
+    event_slug: Optional[str] = None,
+    data: Optional[dict] = None,
+) -> None:
+    """
+    track() sem esperar o banco: a métrica entra na fila e é gravada em lote
+    (sessão própria). Com a fila cheia a métrica é descartada e contada.
+    """
+    row = MetricIn(user_id=user_id, event_slug=event_slug, type=action, data=data).model_dump()
+    if _queue is None:
+        # Fora do lifespan da app (scripts): grava em background, sem lote
+        task = asyncio.get_running_loop().create_task(_write([row]))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+        return
+    try:
+        _queue.put_nowait(row)
+    except asyncio.QueueFull:
+        METRICS_QUEUE.labels("dropped").inc()
+        return
+    METRICS_QUEUE.labels("queued").inc()
+
+
+async def startup() -> None:
+    global _queue, _writer
+    _queue = asyncio.Queue(maxsize=settings.METRICS_QUEUE_SIZE)
+    _writer = asyncio.create_task(_write_loop(), name="metrics-writer")
+
+
+async def shutdown() -> None:
+    """
+    Para o writer e grava o que ainda estava na fila. O writer não é
+    cancelado (perderia as métricas já retiradas da fila): recebe o _STOP,
+    grava o lote em mãos e termina.
+    """
+    global _queue, _writer
+    if _writer is not None:
+        if not _writer.done():
+            await _queue.put(_STOP)
+        await asyncio.gather(_writer, return_exceptions=True)
+        _writer = None
+    if _queue is not None:
+        while not _queue.empty():
+            rows, _ = _drain([])
+            if rows:
+                await _write(rows)
+        _queue = None
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
@@ -0,0 +1,115 @@
+"""
+passwords.py - Hash e verificação de senhas fora do event loop
+
+Cada bcrypt custa centenas de ms de CPU; num pico de cadastros (convidados
+lendo o QR do evento ao mesmo tempo) isso travaria o event loop.
+
+- As operações rodam em um ProcessPoolExecutor (hashing.py), sem disputar
+  o GIL dos workers da API;
+- Fila limitada: no máximo PASSWORD_QUEUE_SIZE operações no pool por worker
+  da API. Com a fila cheia a requisição espera até
+  PASSWORD_QUEUE_TIMEOUT_SECONDS por uma vaga e então recebe 503 com
+  Retry-After, em vez de acumular latência sem limite;
+- Custo configurável (PASSWORD_BCRYPT_ROUNDS): no login, uma senha correta
+  com hash de outro custo ganha um hash novo (verify_password devolve o
+  hash para quem chama gravar).
+"""
+
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.services import hashing
+from app.services.instrumentation import PASSWORD_QUEUE_REJECTED, register_executor, track_call
+from app.settings import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: os filhos não herdam o event loop nem as conexões abertas
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+# O pool nasce sob demanda: o amostrador lê o atual a cada ciclo
+register_executor("passwords", lambda: _pool)
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PASSWORD_QUEUE_SIZE)
+    return _slots
+
+
+async def _run(operation: str, fn, *args, wait: bool = False):
+    """
+    Executa uma função de hashing.py no pool, ocupando uma vaga da fila
+    (wait=True espera a vaga sem prazo).
+    """
+    slots = _get_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), None if wait else settings.PASSWORD_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        PASSWORD_QUEUE_REJECTED.labels(operation).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos cadastros e logins no momento. Tente novamente em instantes.",
+            headers={"Retry-After": str(max(1, math.ceil(settings.PASSWORD_QUEUE_TIMEOUT_SECONDS)))},
+        )
+    try:
+        with track_call("passwords", operation, "bcrypt"):
+            return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        slots.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", hashing.hash_password, password, settings.PASSWORD_BCRYPT_ROUNDS)
+
+
+async def hash_many(passwords: list[str]) -> list[str]:
+    """
+    Hash de várias senhas (cadastro em massa), em lotes de PASSWORD_BULK_CHUNK.
+    No máximo um lote por processo do pool de cada vez: cadastros e logins
+    avulsos continuam intercalando com a importação. Os lotes esperam vaga
+    sem prazo (a importação é lenta, mas não é recusada).
+    """
+    size = max(1, settings.PASSWORD_BULK_CHUNK)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    limit = asyncio.Semaphore(settings.PASSWORD_WORKERS)
+
+    async def _chunk(chunk: list[str]) -> list[str]:
+        async with limit:
+            return await _run("hash_many", hashing.hash_many, chunk, settings.PASSWORD_BCRYPT_ROUNDS, wait=True)
+
+    results = await asyncio.gather(*(_chunk(chunk) for chunk in chunks))
+    return [password_hash for chunk in results for password_hash in chunk]
+
+
+async def verify_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """
+    Confere a senha. Retorna (válida, hash novo): o hash novo vem quando o
+    custo do hash gravado difere de PASSWORD_BCRYPT_ROUNDS e deve ser salvo.
+    """
+    return await _run("verify", hashing.verify, password, password_hash, settings.PASSWORD_BCRYPT_ROUNDS)
+
+
+def shutdown() -> None:
+    """Encerra o pool de processos (chamado no shutdown da app)."""
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _slots = None
@@ -0,0 +1,251 @@
+"""
+profiling.py - Profiler por amostragem e dump de tasks do worker
+
+Nada roda enquanto ninguém pede um perfil; o middleware por requisição só
+procura o header X-Profile.
+- profile(): amostra as pilhas de todas as threads (sys._current_frames)
+  por N segundos e devolve no formato "collapsed" (flamegraph.pl,
+  speedscope, inferno). mode="wall" conta todas as amostras; mode="cpu"
+  só as das threads que gastaram CPU desde a amostra anterior e não estão
+  paradas numa espera conhecida (select do event loop, fila do executor),
+  então I/O e ociosidade somem do gráfico;
+- ProfileRequestMiddleware: com `X-Profile: wall|cpu` e token de admin, a
+  resposta da requisição é trocada pelo perfil dela (o status original vai
+  em X-Profile-Status). As outras requisições no mesmo worker aparecem
+  junto: é um perfil do processo durante a requisição;
+- dump_tasks(): tasks asyncio pendentes, pilha e o que cada uma aguarda.
+
+Um perfil por vez por worker (o perfil é do worker que atendeu; o pid vai
+na resposta).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.schemas.user import UserRole
+from app.security.jwt import require_role
+from app.services.db import async_session_maker
+from app.settings import settings
+
+MODES = ("wall", "cpu")
+
+# Funções (Python) em que uma thread fica parada esperando: fora do modo cpu
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_busy = threading.Lock()
+_labels: dict = {}
+
+
+class ProfilerBusy(RuntimeError):
+    """Já existe um perfil em andamento neste worker."""
+
+
+def _short_path(path: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    return path[len(cwd):] if path.startswith(cwd) else path
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _cpu_ns(ident: int) -> Optional[int]:
+    try:
+        return time.clock_gettime_ns(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, ProcessLookupError):
+        return None
+
+
+def sample(stop: threading.Event, mode: str = "wall", hz: int = 100) -> tuple[Counter, int]:
+    """Amostra até `stop` ser sinalizado. Retorna (pilhas -> peso, amostras)."""
+    if mode not in MODES:
+        raise ValueError(f"modo invalido: {mode!r}")
+    interval = 1.0 / max(1, hz)
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    last_cpu: dict[int, int] = {}
+    samples = 0
+
+    while not stop.wait(interval):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if mode == "cpu":
+                now = _cpu_ns(ident)
+                before = last_cpu.get(ident)
+                if now is None:
+                    continue
+                last_cpu[ident] = now
+                code = frame.f_code
+                if before is None or now == before or (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+            stacks[f"{names.get(ident, ident)};{_stack(frame)}"] += 1
+    return stacks, samples
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {weight}\n" for stack, weight in stacks.most_common())
+
+
+def profile(seconds: float, mode: str = "wall", hz: Optional[int] = None) -> tuple[str, int]:
+    """Perfil do worker por `seconds` (bloqueia: rode fora do event loop)."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        stop = threading.Event()
+        timer = threading.Timer(min(seconds, settings.PROFILE_MAX_SECONDS), stop.set)
+        timer.start()
+        try:
+            stacks, samples = sample(stop, mode, hz or settings.PROFILE_HZ)
+        finally:
+            timer.cancel()
+        return collapsed(stacks), samples
+    finally:
+        _busy.release()
+
+
+# ============================================================
+# PERFIL POR REQUISIÇÃO
+# ============================================================
+
+async def _is_admin(headers) -> bool:
+    auth = next((v.decode("latin-1") for k, v in headers if k == b"authorization"), "")
+    if not auth.lower().startswith("bearer "):
+        return False
+    try:
+        async with async_session_maker() as session:
+            await require_role(UserRole.ADMIN, auth.split(" ", 1)[1], session)
+    except HTTPException:
+        return False
+    return True
+
+
+class ProfileRequestMiddleware:
+    """Middleware ASGI: `X-Profile: wall|cpu` (admin) devolve o perfil da requisição."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = next((v.decode("latin-1").strip().lower() for k, v in scope["headers"] if k == b"x-profile"), None)
+        if mode is None:
+            return await self.app(scope, receive, send)
+        if mode not in MODES:
+            mode = "wall"
+        if not await _is_admin(scope["headers"]) or not _busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        stop = threading.Event()
+        result: dict = {}
+
+        def _run():
+            result["stacks"], result["samples"] = sample(stop, mode, settings.PROFILE_REQUEST_HZ)
+
+        sampler = threading.Thread(target=_run, name="request-profiler", daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+
+        status = 500
+        passthrough = False
+
+        async def _send(message):
+            nonlocal status, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if any(k == b"content-type" and v.startswith(b"text/event-stream") for k, v in message.get("headers", ())):
+                    # Stream sem fim: não dá para perfilar, segue normal
+                    passthrough = True
+                    stop.set()
+                    await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            _busy.release()
+        if passthrough:
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        body = collapsed(result.get("stacks", Counter())).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-disposition", f'attachment; filename="request-{os.getpid()}.collapsed"'.encode()),
+                (b"x-profile-status", str(status).encode()),
+                (b"x-profile-samples", str(result.get("samples", 0)).encode()),
+                (b"x-profile-duration-ms", f"{elapsed_ms:.1f}".encode()),
+                (b"x-profile-pid", str(os.getpid()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# ============================================================
+# TASKS
+# ============================================================
+
+def _suspended_in(task: asyncio.Task) -> Optional[str]:
+    """Coroutine mais interna da cadeia de awaits (onde a task está parada)."""
+    coro, innermost = task.get_coro(), None
+    while coro is not None and hasattr(coro, "cr_code"):
+        innermost = coro
+        coro = coro.cr_await
+    return getattr(innermost, "__qualname__", None)
+
+
+def dump_tasks(max_frames: int = 12) -> list[dict]:
+    """Tasks do event loop atual (chame de dentro do loop)."""
+    current = asyncio.current_task()
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "current": task is current,
+            "suspended_in": _suspended_in(task),
+            # Future que a task aguarda (_fut_waiter é interno, mas estável no CPython)
+            "awaiting": repr(getattr(task, "_fut_waiter", None))[:300],
+            "stack": [
+                f"{frame.f_code.co_qualname} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})"
+                for frame in task.get_stack(limit=max_frames)
+            ],
+        })
+    return sorted(tasks, key=lambda t: (t["coro"], t["name"]))
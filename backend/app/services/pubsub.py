@@ -0,0 +1,186 @@
+"""
+pubsub.py - Pub/sub em processo com ponte LISTEN/NOTIFY do Postgres
+
+Cada worker do uvicorn tem seus próprios assinantes (filas asyncio por
+tópico). publish() entrega localmente e envia um NOTIFY; os outros
+workers recebem pelo LISTEN e entregam aos seus assinantes.
+
+Além dos tópicos de eventos (SSE), outros módulos registram handlers
+(add_handler) para as mensagens vindas de outros workers, ex.:
+invalidação do cache HTTP.
+
+A ponte usa uma conexão asyncpg dedicada (fora do pool do SQLAlchemy),
+reconectando em caso de queda. Sem ponte (ou com banco que não é
+Postgres), a entrega fica só local.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.settings import settings
+
+log = logging.getLogger("pubsub")
+
+# Identifica este processo (mensagens próprias voltam pelo LISTEN e são ignoradas)
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Limite do payload do NOTIFY no Postgres é 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+_handlers: list[Callable[[str, Any], None]] = []
+
+_conn: Optional[asyncpg.Connection] = None
+_conn_lock = asyncio.Lock()
+_bridge_task: Optional[asyncio.Task] = None
+_pending: set[asyncio.Task] = set()
+
+
+# ============================================================
+# ASSINANTES LOCAIS
+# ============================================================
+
+@asynccontextmanager
+async def subscribe(topic: str):
+    """Fila com as mensagens do tópico enquanto o contexto estiver aberto."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+    _subscribers.setdefault(topic, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        subscribers = _subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                _subscribers.pop(topic, None)
+
+
+def subscriber_count(topic: str = None) -> int:
+    if topic is not None:
+        return len(_subscribers.get(topic, ()))
+    return sum(len(s) for s in _subscribers.values())
+
+
+def add_handler(handler: Callable[[str, Any], None]) -> None:
+    """Registra um handler chamado para as mensagens vindas de outros workers."""
+    _handlers.append(handler)
+
+
+def _dispatch(topic: str, message: Any, remote: bool = False) -> None:
+    for queue in _subscribers.get(topic, ()):
+        if queue.full():
+            # Cliente lento: descarta a mensagem mais antiga em vez de bloquear
+            queue.get_nowait()
+        queue.put_nowait(message)
+    if not remote:
+        return
+    for handler in _handlers:
+        try:
+            handler(topic, message)
+        except Exception:
+            log.exception("Falha no handler de %s", topic)
+
+
+# ============================================================
+# PUBLICAÇÃO
+# ============================================================
+
+async def publish(topic: str, message: Any) -> None:
+    """Entrega a mensagem aos assinantes locais e aos outros workers."""
+    _dispatch(topic, message)
+    payload = json.dumps({"o": ORIGIN, "t": topic, "m": message}, default=str)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        log.warning("Mensagem de %s grande demais para NOTIFY (%d bytes); entregue so localmente", topic, len(payload))
+        return
+    if _conn is None:
+        return
+    try:
+        async with _conn_lock:
+            await _conn.execute("SELECT pg_notify($1, $2)", settings.PUBSUB_CHANNEL, payload)
+    except Exception:
+        log.exception("Falha ao enviar NOTIFY de %s", topic)
+
+
+def publish_nowait(topic: str, message: Any) -> None:
+    """publish() para código síncrono: agenda o envio no event loop atual."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _dispatch(topic, message)
+        return
+    task = loop.create_task(publish(topic, message))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+# ============================================================
+# PONTE LISTEN/NOTIFY
+# ============================================================
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return
+    if data.get("o") == ORIGIN:
+        return
+    _dispatch(data["t"], data["m"], remote=True)
+
+
+def _database_url() -> str:
+    # Com PgBouncer o LISTEN vai direto ao Postgres (PUBSUB_DATABASE_URL)
+    return settings.PUBSUB_DATABASE_URL or os.getenv("DATABASE_URL") or ""
+
+
+def _dsn() -> str:
+    # O asyncpg recebe a URL sem o "+asyncpg" do dialeto do SQLAlchemy
+    url = make_url(_database_url()).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def _bridge() -> None:
+    global _conn
+    while True:
+        try:
+            conn = await asyncpg.connect(_dsn())
+            await conn.add_listener(settings.PUBSUB_CHANNEL, _on_notify)
+            _conn = conn
+            log.info("Ponte LISTEN/NOTIFY conectada (%s)", settings.PUBSUB_CHANNEL)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            await closed.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Falha na ponte LISTEN/NOTIFY; reconectando")
+        _conn = None
+        await asyncio.sleep(settings.PUBSUB_RECONNECT_SECONDS)
+
+
+async def startup() -> None:
+    global _bridge_task
+    if not _database_url().startswith("postgresql"):
+        # Sem Postgres (ex.: SQLite dos benchmarks) não há LISTEN/NOTIFY: entrega só local
+        log.info("Banco sem LISTEN/NOTIFY; pubsub só local")
+        return
+    if _bridge_task is None:
+        _bridge_task = asyncio.create_task(_bridge(), name="pubsub-bridge")
+
+
+async def shutdown() -> None:
+    global _bridge_task, _conn
+    if _bridge_task is not None:
+        _bridge_task.cancel()
+        await asyncio.gather(_bridge_task, return_exceptions=True)
+        _bridge_task = None
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
@@ -1,15 +1,36 @@
 import boto3
+import io
+import logging
 import os
 import re
 from concurrent.futures import ThreadPoolExecutor
 
+from app.services import face_registry
+from app.services.instrumentation import register_executor
+from app.services.tracing import ContextThreadPoolExecutor
+from app.settings import settings
+
+log = logging.getLogger("rekognition")
+
 rk = boto3.client(
     "rekognition",
     region_name=os.getenv("AWS_REGION", "us-east-1"),
     aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
     aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
 )
-COLLECTIONS_CACHE = set()
+
+# Pool para as buscas concorrentes da busca multi-face: todas as faces de
+# FACE_SEARCH_MULTI_CONCURRENCY selfies em paralelo
+_search_executor = ContextThreadPoolExecutor(
+    max_workers=settings.FACE_SEARCH_MAX_FACES * settings.FACE_SEARCH_MULTI_CONCURRENCY,
+    thread_name_prefix="rk_face_search",
+)
+register_executor("face_multi_search", _search_executor)
+
+
+def collection_id_for(event_slug: str) -> str:
+    """Id da collection do evento no Rekognition."""
+    return f"evt-{event_slug}"
 
 
 def ensure_collection(event_slug: str) -> str:
@@ -17,25 +38,82 @@ def ensure_collection(event_slug: str) -> str:
     Garante que a collection do evento exista no Rekognition.
     Se não existir, cria automaticamente.
     """
-    collection_id = f"evt-{event_slug}"
+    collection_id = collection_id_for(event_slug)
 
-    # Se já estiver no cache, não tenta criar novamente
-    if collection_id in COLLECTIONS_CACHE:
+    # Se já estiver no registro, não consulta a AWS novamente
+    if face_registry.is_known(collection_id):
         return collection_id
 
     try:
-        # Verifica se a collection já existe na AWS
-        existing_collections = rk.list_collections(MaxResults=100)["CollectionIds"]
-        if collection_id not in existing_collections:
+        # describe_collection é O(1), ao contrário de list_collections (limitado a 100)
+        rk.describe_collection(CollectionId=collection_id)
+    except rk.exceptions.ResourceNotFoundException:
+        try:
             rk.create_collection(CollectionId=collection_id)
-            print(f"[Rekognition] Collection criada: {collection_id}")
+            log.info("Collection criada: %s", collection_id)
+        except rk.exceptions.ResourceAlreadyExistsException:
+            pass
     except Exception as e:
-        print(f"[Rekognition] Erro ao garantir collection '{collection_id}': {e}")
+        log.error("Erro ao garantir collection %r: %s", collection_id, e)
+        raise
 
-    COLLECTIONS_CACHE.add(collection_id)
+    face_registry.mark_known(collection_id)
     return collection_id
 
 
+def face_ids_of(index_result: dict) -> list[str]:
+    """FaceIds criados por index_s3_object (guardados em photos.face_ids)."""
+    return [record["Face"]["FaceId"] for record in (index_result or {}).get("FaceRecords", [])]
+
+
+def delete_face_ids(event_slug: str, face_ids: list[str]) -> int:
+    """Remove faces pelo FaceId com DeleteFaces em lotes de 4096, sem listar a collection."""
+    collection_id = collection_id_for(event_slug)
+    deleted = 0
+    try:
+        for start in range(0, len(face_ids), 4096):
+            res = rk.delete_faces(CollectionId=collection_id, FaceIds=face_ids[start:start + 4096])
+            deleted += len(res.get("DeletedFaces", []))
+    except rk.exceptions.ResourceNotFoundException:
+        pass
+    return deleted
+
+
+def delete_faces(event_slug: str, should_delete) -> int:
+    """
+    Remove da collection as faces cujo ExternalImageId satisfaz should_delete.
+    Lista a collection paginada e apaga com DeleteFaces em lotes de 4096
+    (O(tamanho da collection): só para fotos sem face_ids registrados).
+    """
+    collection_id = collection_id_for(event_slug)
+    face_ids = []
+    try:
+        paginator = rk.get_paginator("list_faces")
+        for page in paginator.paginate(CollectionId=collection_id, PaginationConfig={"PageSize": 4096}):
+            for f in page.get("Faces", []):
+                if should_delete(f.get("ExternalImageId", "")):
+                    face_ids.append(f["FaceId"])
+    except rk.exceptions.ResourceNotFoundException:
+        return 0
+
+    for start in range(0, len(face_ids), 4096):
+        rk.delete_faces(CollectionId=collection_id, FaceIds=face_ids[start:start + 4096])
+    return len(face_ids)
+
+
+def drop_collection(event_slug: str) -> bool:
+    """Apaga a collection do evento inteira."""
+    collection_id = collection_id_for(event_slug)
+    try:
+        rk.delete_collection(CollectionId=collection_id)
+    except rk.exceptions.ResourceNotFoundException:
+        return False
+    finally:
+        face_registry.forget(collection_id)
+    log.info("Collection apagada: %s", collection_id)
+    return True
+
+
 def sanitize_key_for_rekognition(s: str) -> str:
     safe = re.sub(r"[^a-zA-Z0-9_.:-]", "_", s)
     return safe[:100]
@@ -60,7 +138,7 @@ def index_s3_object(event_slug: str, bucket: str, file_key: str, external_image_
     except rk.exceptions.ResourceNotFoundException:
         # Se ainda assim não existir, cria e tenta de novo
         rk.create_collection(CollectionId=collection_id)
-        print(f"[Rekognition] Collection criada sob demanda: {collection_id}")
+        log.info("Collection criada sob demanda: %s", collection_id)
         return rk.index_faces(
             CollectionId=collection_id,
             Image={"S3Object": {"Bucket": bucket, "Name": file_key}},
@@ -73,9 +151,10 @@ def index_s3_object(event_slug: str, bucket: str, file_key: str, external_image_
 
 def search_by_image_bytes(event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75):
     """
-    Busca faces por imagem, garantindo que a collection exista.
+    Busca faces por imagem. A collection é provisionada na criação do evento,
+    então o caminho de busca nunca cria collections.
     """
-    collection_id = ensure_collection(event_slug)
+    collection_id = collection_id_for(event_slug)
     try:
         return rk.search_faces_by_image(
             CollectionId=collection_id,
@@ -84,14 +163,71 @@ def search_by_image_bytes(event_slug: str, data: bytes, max_faces: int = 50, thr
             FaceMatchThreshold=threshold,
         )
     except rk.exceptions.ResourceNotFoundException:
-        rk.create_collection(CollectionId=collection_id)
-        print(f"[Rekognition] Collection criada sob demanda para busca: {collection_id}")
-        return rk.search_faces_by_image(
+        # Evento sem collection = nenhuma foto indexada ainda
+        log.info("Collection inexistente na busca: %s", collection_id)
+        return {"FaceMatches": []}
+
+
+def _crop_face(image, box: dict, margin: float = 0.25) -> bytes:
+    """Recorta a face (BoundingBox relativo do Rekognition) com uma margem."""
+    width, height = image.size
+    left = max(0.0, box["Left"] - box["Width"] * margin)
+    top = max(0.0, box["Top"] - box["Height"] * margin)
+    right = min(1.0, box["Left"] + box["Width"] * (1 + margin))
+    bottom = min(1.0, box["Top"] + box["Height"] * (1 + margin))
+    crop = image.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+    out = io.BytesIO()
+    crop.convert("RGB").save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def _search_crop(collection_id: str, crop: bytes, max_faces: int, threshold: int) -> list:
+    try:
+        res = rk.search_faces_by_image(
             CollectionId=collection_id,
-            Image={"Bytes": data},
+            Image={"Bytes": crop},
             MaxFaces=max_faces,
             FaceMatchThreshold=threshold,
         )
+        return res.get("FaceMatches", [])
+    except (rk.exceptions.ResourceNotFoundException, rk.exceptions.InvalidParameterException):
+        # Collection inexistente ou recorte sem face detectável
+        return []
+
+
+def search_faces_in_image(event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75, max_detected: int = 10) -> list[dict]:
+    """
+    Busca cada face da selfie (SearchFacesByImage só usa a maior face).
+    A busca da imagem inteira (que cobre a maior face) roda em paralelo com a
+    detecção; só as demais faces são recortadas e buscadas.
+    """
+    collection_id = collection_id_for(event_slug)
+    whole = _search_executor.submit(_search_crop, collection_id, data, max_faces, threshold)
+    details = rk.detect_faces(Image={"Bytes": data}, Attributes=["DEFAULT"]).get("FaceDetails", [])[:max_detected]
+    if not details:
+        whole.cancel()
+        return []
+
+    largest = max(range(len(details)), key=lambda i: details[i]["BoundingBox"]["Width"] * details[i]["BoundingBox"]["Height"])
+
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        # Sem Pillow não há recorte: fica só a busca da maior face
+        return [{"FaceIndex": 0, "BoundingBox": details[largest]["BoundingBox"], "FaceMatches": whole.result()}]
+
+    # Os BoundingBoxes são relativos à imagem já com a orientação EXIF aplicada
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    futures = {
+        index: _search_executor.submit(_search_crop, collection_id, _crop_face(image, detail["BoundingBox"]), max_faces, threshold)
+        for index, detail in enumerate(details)
+        if index != largest
+    }
+    futures[largest] = whole
+    return [
+        {"FaceIndex": index, "BoundingBox": detail["BoundingBox"], "FaceMatches": futures[index].result()}
+        for index, detail in enumerate(details)
+    ]
 
 
 def reindex_all(event_slug: str, bucket: str, keys: list[str]):
@@ -105,9 +241,9 @@ def reindex_all(event_slug: str, bucket: str, keys: list[str]):
         try:
             image_id = key.split("/")[-1]
             index_s3_object(event_slug, bucket, key, image_id)
-            print(f"[Reindexação] Reindexado com sucesso: {key}")
+            log.debug("Reindexado com sucesso: %s", key)
         except Exception as e:
-            print(f"[Reindexação] Erro ao reindexar {key}: {e}")
+            log.warning("Erro ao reindexar %s: %s", key, e)
 
     with ThreadPoolExecutor(max_workers=5) as executor:
         executor.map(_index, keys)
@@ -0,0 +1,130 @@
+"""
+render_cache.py - Cache LRU em disco das imagens redimensionadas sob demanda
+
+Cada variante (foto + largura + altura + formato) vira um arquivo em
+RENDER_CACHE_DIR/{photo_id}/, com nome = hash da variante; apagar a foto
+remove o diretório inteiro (evict_photos). O mtime do arquivo marca
+o último acesso; quando o total passa de RENDER_CACHE_MAX_BYTES, os
+arquivos menos usados são removidos. Os workers do uvicorn compartilham
+o diretório: a escrita é atômica (arquivo temporário + rename) e um
+arquivo removido por outro worker é só um miss.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Optional
+
+from app.settings import settings
+
+log = logging.getLogger("render_cache")
+
+
+class DiskLRUCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    def _group_dir(self, group: str) -> str:
+        return os.path.join(self.directory, group)
+
+    def _path(self, group: str, key: str) -> str:
+        return os.path.join(self.directory, group, key)
+
+    def _entries(self) -> list[os.DirEntry]:
+        try:
+            groups = [e for e in os.scandir(self.directory) if e.is_dir()]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for group in groups:
+            try:
+                entries.extend(e for e in os.scandir(group.path) if e.is_file() and not e.name.startswith("."))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def get(self, group: str, key: str) -> Optional[bytes]:
+        path = self._path(group, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # marca como usado recentemente
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, group: str, key: str, data: bytes) -> None:
+        try:
+            os.makedirs(self._group_dir(group), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._group_dir(group), prefix=".tmp-")
+        except OSError:
+            log.exception("Falha ao gravar %s no cache de renders", key)
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(group, key))
+        except OSError:
+            log.exception("Falha ao gravar %s no cache de renders", key)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            if self._total is None:
+                self._total = sum(e.stat().st_size for e in self._entries())
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove os arquivos menos usados até ficar em 90% do limite."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
+
+    def evict_group(self, group: str) -> None:
+        """Remove todas as entradas de um grupo (todas as variantes de uma foto)."""
+        shutil.rmtree(self._group_dir(group), ignore_errors=True)
+        with self._lock:
+            # Recalcula no próximo put
+            self._total = None
+
+
+cache = DiskLRUCache(settings.RENDER_CACHE_DIR, settings.RENDER_CACHE_MAX_BYTES)
+
+
+def variant_key(photo_id, width: int, height: int, fmt: str) -> str:
+    """Hash da variante: nome do arquivo no cache e ETag forte da resposta."""
+    return hashlib.sha256(f"{photo_id}:{width}x{height}:{fmt}".encode()).hexdigest()
+
+
+def evict_photos(photo_ids) -> None:
+    """Remove do cache os renders das fotos apagadas (bloqueante: rodar em executor)."""
+    for photo_id in photo_ids:
+        cache.evict_group(str(photo_id))
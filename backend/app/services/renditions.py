@@ -0,0 +1,165 @@
+"""
+renditions.py - Pipeline de renditions (thumbnail e tamanho web) das fotos
+
+As listagens e a busca devolvem URLs das renditions em vez do original
+da câmera; o original continua disponível para download (s3_url).
+
+- O processamento de imagem roda em um ProcessPoolExecutor (imaging.py),
+  nunca no event loop nem no GIL dos workers da API.
+- Chaves determinísticas: {evento}/renditions/{photo_id}/{variante}.{ext}
+- As chaves geradas ficam em photos.thumb_key / photos.web_key.
+- Falhas não impedem o upload: a foto fica sem rendition e o backfill
+  periódico tenta de novo.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.photo import photos_table
+from app.services import http_cache, imaging, storage_aio
+from app.services.instrumentation import register_executor
+from app.services.storage import get_bucket_raw, presign_get
+from app.settings import settings
+
+log = logging.getLogger("renditions")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: os filhos não herdam o event loop nem as conexões abertas
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RENDITION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+# O pool nasce sob demanda: o amostrador lê o atual a cada ciclo
+register_executor("renditions", lambda: _pool)
+
+
+async def run_in_pool(fn, *args):
+    """Executa uma função de imaging.py no pool de processos."""
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+
+
+def shutdown() -> None:
+    """Encerra o pool de processos (chamado no shutdown da app)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def rendition_key(event_slug: str, photo_id: uuid.UUID, variant: str, fmt: str = None) -> str:
+    ext = imaging.FORMATS[fmt or settings.RENDITION_FORMAT][2]
+    return f"{event_slug}/renditions/{photo_id}/{variant}.{ext}"
+
+
+class UnrenderableImage(Exception):
+    """O original não pôde ser decodificado (arquivo corrompido ou não é imagem)."""
+
+
+async def _render_and_upload(event_slug: str, photo_id: uuid.UUID, data: bytes) -> dict[str, str]:
+    fmt = settings.RENDITION_FORMAT
+    try:
+        rendered = await run_in_pool(imaging.render_variants, data, fmt)
+    except (OSError, ValueError) as e:
+        # UnidentifiedImageError/arquivo truncado (o pool não toca em rede/storage)
+        raise UnrenderableImage(str(e)) from e
+    bucket = get_bucket_raw()
+    content_type = imaging.FORMATS[fmt][1]
+    keys = {variant: rendition_key(event_slug, photo_id, variant, fmt) for variant in rendered}
+    await asyncio.gather(*(
+        storage_aio.put_bytes(bucket, keys[variant], body, content_type)
+        for variant, body in rendered.items()
+    ))
+    return keys
+
+
+async def generate(event_slug: str, photo_id: uuid.UUID, data: bytes) -> dict[str, str]:
+    """
+    Gera e envia as renditions de uma foto. Retorna {variante: chave}
+    ({} em caso de falha).
+    """
+    try:
+        return await _render_and_upload(event_slug, photo_id, data)
+    except Exception:
+        log.exception("Falha ao gerar renditions da foto %s", photo_id)
+        return {}
+
+
+def columns_for(keys: dict[str, str]) -> dict:
+    """Valores das colunas de photos_table para as renditions geradas."""
+    return {"thumb_key": keys.get("thumb"), "web_key": keys.get("web")}
+
+
+def urls_for(row: dict, bucket: str) -> dict:
+    """thumb_url/web_url assinadas; sem rendition, cai no original."""
+    original = row.get("s3_key")
+    thumb_key = row.get("thumb_key") or original
+    web_key = row.get("web_key") or original
+    return {
+        "thumb_url": presign_get(bucket, thumb_key) if thumb_key else None,
+        "web_url": presign_get(bucket, web_key) if web_key else None,
+    }
+
+
+def keys_of(row) -> list[str]:
+    """Chaves das renditions de uma linha de photos (para apagar junto com a foto)."""
+    return [key for key in (row.thumb_key, row.web_key) if key]
+
+
+async def backfill(conn: AsyncSession, batch_size: int = None) -> int:
+    """Gera renditions das fotos que ainda não têm (uploads antigos ou falhas)."""
+    batch_size = batch_size or settings.RENDITION_BACKFILL_BATCH
+    rows = (
+        await conn.execute(
+            select(photos_table.c.id, photos_table.c.event_slug, photos_table.c.s3_key)
+            .where(photos_table.c.thumb_key.is_(None), photos_table.c.status == "active")
+            .order_by(photos_table.c.created_at.desc())
+            .limit(batch_size)
+        )
+    ).all()
+
+    bucket = get_bucket_raw()
+    done = 0
+    for row in rows:
+        try:
+            data = await storage_aio.get_bytes(bucket, row.s3_key)
+            keys = await _render_and_upload(row.event_slug, row.id, data)
+        except HTTPException as e:
+            if e.status_code != 404:
+                # Falha transitória: thumb_key continua NULL e a próxima rodada tenta de novo
+                log.warning("Falha ao gerar rendition de %s: %s", row.s3_key, e.detail)
+                continue
+            log.warning("Original nao encontrado para rendition: %s", row.s3_key)
+            keys = {}
+        except UnrenderableImage as e:
+            log.warning("Original invalido para rendition: %s (%s)", row.s3_key, e)
+            keys = {}
+        except Exception:
+            log.exception("Falha ao gerar rendition de %s", row.s3_key)
+            continue
+        # "" marca a foto como sem rendition possivel (original sumiu ou não
+        # decodifica): não entra de novo no backfill
+        values = columns_for(keys) if keys else {"thumb_key": "", "web_key": ""}
+        await conn.execute(update(photos_table).where(photos_table.c.id == row.id).values(**values))
+        await conn.commit()
+        http_cache.bump(f"photos:{row.event_slug}")
+        done += 1 if keys else 0
+
+    if done:
+        log.info("Renditions geradas (backfill): %d", done)
+    return done
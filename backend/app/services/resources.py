@@ -0,0 +1,106 @@
+"""
+resources.py - Recursos do ciclo de vida da aplicação (lifespan)
+
+Cada recurso (banco, storage, faces, pubsub, jobs...) se registra com uma
+função de início e outra de parada. No startup os estágios sobem em ordem
+e, dentro de um estágio, os recursos sobem em paralelo; no shutdown param
+na ordem inversa.
+
+Falha de um recurso não crítico só é logada (a app sobe degradada, como
+antes); um recurso crítico derruba o startup. O tempo de cada recurso fica
+em `timings` (ms) e vai no log.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+log = logging.getLogger("startup")
+
+
+@dataclass
+class Resource:
+    name: str
+    start: Optional[Callable[[], Any]] = None
+    stop: Optional[Callable[[], Any]] = None
+    stage: int = 0
+    critical: bool = False
+
+
+async def _call(fn: Callable[[], Any]) -> None:
+    # Aceita funções síncronas e assíncronas
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self._resources: list[Resource] = []
+        self._started: list[Resource] = []
+        self.timings: dict[str, float] = {}
+
+    def add(
+        self,
+        name: str,
+        start: Optional[Callable[[], Any]] = None,
+        stop: Optional[Callable[[], Any]] = None,
+        *,
+        stage: int = 0,
+        critical: bool = False,
+    ) -> None:
+        """Registra um recurso (estágios menores sobem antes)."""
+        self._resources.append(Resource(name, start, stop, stage, critical))
+
+    async def _start(self, resource: Resource) -> None:
+        started = time.perf_counter()
+        try:
+            if resource.start is not None:
+                await _call(resource.start)
+        except Exception:
+            if resource.critical:
+                raise
+            log.exception("Falha ao iniciar %s", resource.name)
+        finally:
+            self.timings[resource.name] = round((time.perf_counter() - started) * 1000, 2)
+        # Parado no shutdown mesmo se o início falhou (pode ter aberto algo)
+        self._started.append(resource)
+
+    async def startup(self) -> None:
+        started = time.perf_counter()
+        for stage in sorted({r.stage for r in self._resources}):
+            batch = [r for r in self._resources if r.stage == stage]
+            results = await asyncio.gather(*(self._start(r) for r in batch), return_exceptions=True)
+            # Espera o estágio inteiro antes de propagar a falha de um crítico
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        self.timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+        log.info("Startup em %.1f ms", self.timings["total"], extra={"timings_ms": dict(self.timings)})
+
+    async def shutdown(self) -> None:
+        for resource in sorted(reversed(self._started), key=lambda r: -r.stage):
+            if resource.stop is None:
+                continue
+            try:
+                await _call(resource.stop)
+            except Exception:
+                log.exception("Falha ao parar %s", resource.name)
+        self._started.clear()
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        try:
+            await self.startup()
+        except BaseException:
+            # Recurso crítico falhou: fecha o que já subiu
+            await self.shutdown()
+            raise
+        try:
+            yield
+        finally:
+            await self.shutdown()
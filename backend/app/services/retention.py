@@ -0,0 +1,212 @@
+"""
+retention.py - Motor de retenção e expurgo de dados
+
+Política por evento: events.retention_days (nulo = RETENTION_DEFAULT_DAYS),
+contada a partir de events.event_date. Quando um evento expira:
+- fotos (originais, renditions e renders em cache) e mídias saem em lotes
+  (bulk_delete);
+- a collection/facelist de faces é apagada;
+- events.purged_at marca o evento como expurgado (o cadastro continua).
+
+Além dos eventos, cada rodada limpa:
+- zips gerados (zips/) mais antigos que RETENTION_ZIP_HOURS;
+- active_sessions sem atividade há RETENTION_SESSION_DAYS;
+- token_denylist e download_links já expirados;
+- metrics mais antigas que RETENTION_METRICS_DAYS (0 = mantém).
+
+run(dry_run=True) só conta o que seria removido (relatório).
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, delete, update, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.dowload_link import download_links_table
+from app.schemas.event import events_table, EventOut
+from app.schemas.media import media_table
+from app.schemas.metrics import metrics_table
+from app.schemas.photo import photos_table
+from app.schemas.session import active_sessions_table, token_denylist_table
+from app.schemas.storage_object import storage_objects_table
+from app.services import bulk_delete, event_cache, face, storage_aio
+from app.services.storage import get_bucket_raw
+from app.settings import settings
+
+log = logging.getLogger("retention")
+
+
+def expires_on(event_date: Optional[date], retention_days: Optional[int]) -> Optional[date]:
+    """Data a partir da qual o evento está expirado (None = não expira)."""
+    days = settings.RETENTION_DEFAULT_DAYS if retention_days is None else retention_days
+    if event_date is None or days <= 0:
+        return None
+    return event_date + timedelta(days=days)
+
+
+async def expired_events(conn: AsyncSession, today: date = None) -> list[str]:
+    today = today or date.today()
+    rows = (
+        await conn.execute(
+            select(events_table.c.slug, events_table.c.event_date, events_table.c.retention_days)
+            .where(events_table.c.purged_at.is_(None), events_table.c.event_date.is_not(None))
+        )
+    ).all()
+    return [row.slug for row in rows if (limit := expires_on(row.event_date, row.retention_days)) and limit <= today]
+
+
+# ============================================================
+# EVENTOS EXPIRADOS
+# ============================================================
+
+async def _count_event(conn: AsyncSession, slug: str) -> dict:
+    photos = (await conn.execute(
+        select(func.count()).select_from(photos_table).where(photos_table.c.event_slug == slug)
+    )).scalar()
+    media = (await conn.execute(
+        select(func.count()).select_from(media_table).where(media_table.c.event_slug == slug)
+    )).scalar()
+    return {"photos": photos, "media": media}
+
+
+async def purge_event(conn: AsyncSession, slug: str) -> dict:
+    """Expurga os dados do evento em lotes e apaga a collection de faces."""
+    totals = {"photos": 0, "media": 0, "objects": 0, "faces": 0}
+    while True:
+        ids = (
+            await conn.execute(
+                select(photos_table.c.id)
+                .where(photos_table.c.event_slug == slug)
+                .limit(settings.RETENTION_BATCH_SIZE)
+            )
+        ).scalars().all()
+        if not ids:
+            break
+        # A collection inteira é apagada no fim: não precisa remover face a face
+        result = await bulk_delete.run(conn, bulk_delete.Selection(slug, photo_ids=list(ids)), remove_faces=False)
+        totals["photos"] += result.photos
+        totals["objects"] += result.objects
+
+    result = await bulk_delete.run(conn, bulk_delete.Selection(slug, whole_event=True, include_media=True), remove_faces=False)
+    totals["media"] += result.media
+    totals["objects"] += result.objects
+
+    try:
+        loop = asyncio.get_running_loop()
+        totals["faces"] = int(await loop.run_in_executor(None, face.drop_collection, slug))
+    except Exception:
+        log.exception("Falha ao apagar a collection do evento %s", slug)
+
+    row = (
+        await conn.execute(
+            update(events_table)
+            .where(events_table.c.slug == slug)
+            .values(purged_at=datetime.utcnow(), face_collection_id=None)
+            .returning(events_table)
+        )
+    ).mappings().first()
+    await conn.commit()
+    if row:
+        event_cache.put(EventOut.model_validate(row))
+    log.info("Evento %s expurgado: %s", slug, totals)
+    return totals
+
+
+# ============================================================
+# ZIPS E TABELAS QUENTES
+# ============================================================
+
+def _zip_filter(now: datetime):
+    cutoff = now - timedelta(hours=settings.RETENTION_ZIP_HOURS)
+    return and_(
+        storage_objects_table.c.bucket == get_bucket_raw(),
+        storage_objects_table.c.prefix == "zips/",
+        storage_objects_table.c.created_at < cutoff,
+    )
+
+
+def _table_filters(now: datetime) -> dict:
+    """tabela -> (tabela, condição de expurgo, coluna id)"""
+    filters = {
+        "active_sessions": (
+            active_sessions_table,
+            active_sessions_table.c.last_seen_at < now - timedelta(days=settings.RETENTION_SESSION_DAYS),
+            active_sessions_table.c.id,
+        ),
+        "token_denylist": (token_denylist_table, token_denylist_table.c.expires_at < now, token_denylist_table.c.id),
+        "download_links": (download_links_table, download_links_table.c.expires_at < now, download_links_table.c.id),
+    }
+    if settings.RETENTION_METRICS_DAYS > 0:
+        filters["metrics"] = (
+            metrics_table,
+            metrics_table.c.created_at < now - timedelta(days=settings.RETENTION_METRICS_DAYS),
+            metrics_table.c.id,
+        )
+    return filters
+
+
+async def _purge_zips(conn: AsyncSession, now: datetime) -> int:
+    """Remove zips expirados em lotes, paginando pela chave (falhas ficam para a proxima rodada)."""
+    removed, last_key = 0, ""
+    while True:
+        keys = (
+            await conn.execute(
+                select(storage_objects_table.c.key)
+                .where(_zip_filter(now), storage_objects_table.c.key > last_key)
+                .order_by(storage_objects_table.c.key)
+                .limit(settings.RETENTION_BATCH_SIZE)
+            )
+        ).scalars().all()
+        if not keys:
+            return removed
+        last_key = keys[-1]
+        failed = await storage_aio.delete_objects(get_bucket_raw(), list(keys))
+        removed += len(keys) - len(failed)
+        if failed:
+            log.warning("%d zips nao removidos; ficam para a proxima rodada", len(failed))
+
+
+async def _prune_table(conn: AsyncSession, table, condition, id_column) -> int:
+    """DELETE em lotes (transações curtas, sem travar a tabela)."""
+    removed = 0
+    while True:
+        batch = select(id_column).where(condition).limit(settings.RETENTION_BATCH_SIZE).scalar_subquery()
+        result = await conn.execute(delete(table).where(id_column.in_(batch)))
+        await conn.commit()
+        removed += result.rowcount or 0
+        if not result.rowcount or result.rowcount < settings.RETENTION_BATCH_SIZE:
+            return removed
+
+
+# ============================================================
+# RODADA COMPLETA
+# ============================================================
+
+async def run(conn: AsyncSession, dry_run: bool = True) -> dict:
+    """Executa (ou simula, com dry_run) uma rodada de retenção e retorna o relatório."""
+    now = datetime.now(timezone.utc)
+    report = {"dry_run": dry_run, "events": {}, "zips": 0, "tables": {}}
+
+    for slug in await expired_events(conn):
+        report["events"][slug] = await _count_event(conn, slug) if dry_run else await purge_event(conn, slug)
+
+    naive_now = now.replace(tzinfo=None)  # storage_objects usa DateTime sem fuso
+    if dry_run:
+        report["zips"] = (await conn.execute(
+            select(func.count()).select_from(storage_objects_table).where(_zip_filter(naive_now))
+        )).scalar()
+    else:
+        report["zips"] = await _purge_zips(conn, naive_now)
+
+    for name, (table, condition, id_column) in _table_filters(now).items():
+        if dry_run:
+            report["tables"][name] = (await conn.execute(select(func.count()).select_from(table).where(condition))).scalar()
+        else:
+            report["tables"][name] = await _prune_table(conn, table, condition, id_column)
+
+    if not dry_run:
+        log.info("Retencao executada: %s", report)
+    return report
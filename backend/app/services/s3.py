@@ -1,13 +1,18 @@
 import io
+import logging
 import mimetypes
 import uuid
 import time
 import boto3
+from boto3.s3.transfer import TransferConfig as S3TransferConfig
 from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException
 
 from ..settings import settings
+from .transfer import DEFAULT_CONFIG
+
+log = logging.getLogger("s3")
 
 # --- Configuração base ---
 s3 = boto3.client(
@@ -19,6 +24,29 @@ s3 = boto3.client(
 BUCKET_RAW = settings.S3_BUCKET_RAW
 EXPIRE = settings.PRESIGNED_EXPIRE_SECONDS
 
+# Multipart/ranged GET paralelos conforme o motor de transferência
+TRANSFER = S3TransferConfig(
+    multipart_threshold=DEFAULT_CONFIG.single_put_threshold,
+    multipart_chunksize=DEFAULT_CONFIG.block_size,
+    max_concurrency=DEFAULT_CONFIG.max_concurrency,
+)
+
+
+# Resultado da validação dos buckets feita no startup, exposto em /health
+CONTAINER_STATUS: dict[str, dict] = {}
+
+
+def ensure_containers(buckets: list[str]) -> dict[str, dict]:
+    """Valida no startup que os buckets existem e estão acessíveis (o /health revalida os que falharam)."""
+    for bucket in buckets:
+        try:
+            s3.head_bucket(Bucket=bucket)
+            CONTAINER_STATUS[bucket] = {"ok": True, "created": False}
+        except (BotoCoreError, ClientError) as e:
+            log.warning("Bucket indisponivel %s: %s", bucket, e)
+            CONTAINER_STATUS[bucket] = {"ok": False, "created": False, "error": str(e)}
+    return CONTAINER_STATUS
+
 
 # --- Função de upload robusta ---
 def put_bytes(bucket: str, key: str, data: bytes, content_type="application/octet-stream"):
@@ -29,18 +57,27 @@ def put_bytes(bucket: str, key: str, data: bytes, content_type="application/octe
         # ⚙️ Só adiciona encriptação se realmente for necessária
         if getattr(settings, "ENABLE_KMS", False):
             extra_args["ServerSideEncryption"] = "aws:kms"
+        if DEFAULT_CONFIG.validate_content:
+            extra_args["ChecksumAlgorithm"] = "CRC32"
 
-        s3.upload_fileobj(io.BytesIO(data), bucket, key, ExtraArgs=extra_args)
+        s3.upload_fileobj(io.BytesIO(data), bucket, key, ExtraArgs=extra_args, Config=TRANSFER)
 
-        print(f"[S3] ✅ Upload realizado: s3://{bucket}/{key} ({len(data)} bytes)")
+        log.debug("Upload realizado: s3://%s/%s (%d bytes)", bucket, key, len(data))
     except (BotoCoreError, ClientError) as e:
-        print(f"[S3] ❌ Erro ao enviar {key}: {e}")
+        log.error("Erro ao enviar %s: %s", key, e)
         raise HTTPException(status_code=500, detail=f"Falha ao enviar {key}: {e}")
-    except Exception as e:
-        print(f"[S3] ❌ Erro inesperado: {e}")
+    except Exception:
+        log.exception("Erro inesperado ao enviar %s", key)
         raise
 
 
+def get_bytes(bucket: str, key: str) -> bytes:
+    """Baixa um objeto; acima do limite usa GETs por range em paralelo."""
+    buffer = io.BytesIO()
+    s3.download_fileobj(bucket, key, buffer, Config=TRANSFER)
+    return buffer.getvalue()
+
+
 # --- Funções auxiliares ---
 def presign_get(bucket: str, key: str, expires: int = EXPIRE) -> str:
     return s3.generate_presigned_url(
@@ -80,7 +117,7 @@ def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
             for obj in page.get("Contents", []):
                 keys.append(obj["Key"])
     except (BotoCoreError, ClientError) as e:
-        print(f"[S3] ⚠️ Erro ao listar prefixo {prefix}: {e}")
+        log.warning("Erro ao listar prefixo %s: %s", prefix, e)
     return keys
 
 
@@ -94,7 +131,7 @@ async def list_s3_files(prefix: str, bucket: str = BUCKET_RAW):
             url = f"https://{bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
             items.append({"key": key.split('/')[-1], "url": url})
     except (BotoCoreError, ClientError) as e:
-        print(f"[S3] ⚠️ Erro ao listar arquivos do prefixo {prefix}: {e}")
+        log.warning("Erro ao listar arquivos do prefixo %s: %s", prefix, e)
     return items
 
 def delete_object(bucket: str, key: str) -> None:
@@ -103,11 +140,11 @@ def delete_object(bucket: str, key: str) -> None:
     """
     try:
         s3.delete_object(Bucket=bucket, Key=key)
-        print(f"[S3] 🗑️ Removido: s3://{bucket}/{key}")
+        log.debug("Removido: s3://%s/%s", bucket, key)
     except (BotoCoreError, ClientError) as e:
         # Loga e lança para o caller decidir como tratar
-        print(f"[S3] ❌ Falha ao apagar s3://{bucket}/{key}: {e}")
+        log.error("Falha ao apagar s3://%s/%s: %s", bucket, key, e)
         raise HTTPException(status_code=500, detail=f"Erro ao apagar arquivo no S3: {e}")
-    except Exception as e:
-        print(f"[S3] ❌ Erro inesperado ao apagar s3://{bucket}/{key}: {e}")
+    except Exception:
+        log.exception("Erro inesperado ao apagar s3://%s/%s", bucket, key)
         raise HTTPException(status_code=500, detail="Erro inesperado ao apagar arquivo no S3")
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""
+s3_aio.py - Storage assíncrono com aiobotocore
+
+Mesma interface de s3.py, mas com funções awaitable. O cliente é aberto
+no startup da aplicação (com pool de conexões limitado) e fechado no
+shutdown.
+"""
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import HTTPException
+
+from ..settings import settings
+from .transfer import DEFAULT_CONFIG, Source, TransferConfig, byte_ranges, crc32_b64, gather_limited, iter_blocks
+
+log = logging.getLogger("s3_aio")
+
+BUCKET_RAW = settings.S3_BUCKET_RAW
+
+_client = None
+_exit_stack: Optional[AsyncExitStack] = None
+_lock = asyncio.Lock()
+
+
+# --- Ciclo de vida do cliente ---
+async def startup() -> None:
+    """Abre o cliente S3 e o pool de conexões (chamado no startup da app)."""
+    global _client, _exit_stack
+    async with _lock:
+        if _client is not None:
+            return
+        stack = AsyncExitStack()
+        _client = await stack.enter_async_context(
+            get_session().create_client(
+                "s3",
+                region_name=settings.AWS_REGION,
+                config=AioConfig(
+                    signature_version="s3v4",
+                    max_pool_connections=settings.STORAGE_MAX_CONNECTIONS,
+                    connect_timeout=settings.STORAGE_CONNECT_TIMEOUT,
+                    read_timeout=settings.STORAGE_READ_TIMEOUT,
+                ),
+            )
+        )
+        _exit_stack = stack
+
+
+async def shutdown() -> None:
+    """Fecha o cliente S3."""
+    global _client, _exit_stack
+    async with _lock:
+        if _exit_stack is not None:
+            await _exit_stack.aclose()
+        _client, _exit_stack = None, None
+
+
+async def _get_client():
+    if _client is None:
+        await startup()
+    return _client
+
+
+# --- Operações ---
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _extra_args(content_type: str) -> dict:
+    extra_args = {"ContentType": content_type or "application/octet-stream"}
+    if getattr(settings, "ENABLE_KMS", False):
+        extra_args["ServerSideEncryption"] = "aws:kms"
+    return extra_args
+
+
+async def put_bytes(bucket: str, key: str, data: bytes, content_type="application/octet-stream"):
+    """Faz upload de bytes para o S3 (multipart paralelo acima do limite)."""
+    if len(data) > DEFAULT_CONFIG.single_put_threshold:
+        return await put_stream(bucket, key, data, content_type, length=len(data))
+
+    extra_args = _extra_args(content_type)
+    if DEFAULT_CONFIG.validate_content:
+        extra_args["ChecksumCRC32"] = crc32_b64(data)
+    try:
+        client = await _get_client()
+        await client.put_object(Bucket=bucket, Key=key, Body=data, **extra_args)
+        log.debug("Upload realizado: s3://%s/%s (%d bytes)", bucket, key, len(data))
+    except (BotoCoreError, ClientError) as e:
+        log.error("Erro ao enviar %s: %s", key, e)
+        raise HTTPException(status_code=500, detail=f"Falha ao enviar {key}: {e}")
+
+
+async def put_stream(
+    bucket: str,
+    key: str,
+    source: Source,
+    content_type: str = "application/octet-stream",
+    length: Optional[int] = None,
+    config: TransferConfig = DEFAULT_CONFIG,
+):
+    """
+    Multipart upload com até max_concurrency partes em voo (limita também
+    a memória usada) e CRC32 validado pelo S3 em cada parte.
+    `source` pode ser bytes, um arquivo ou um async iterator.
+    """
+    client = await _get_client()
+    validate = config.validate_content
+    extra_args = _extra_args(content_type)
+    if validate:
+        extra_args["ChecksumAlgorithm"] = "CRC32"
+
+    upload = await client.create_multipart_upload(Bucket=bucket, Key=key, **extra_args)
+    upload_id = upload["UploadId"]
+    semaphore = asyncio.Semaphore(config.max_concurrency)
+    parts: list[dict] = []
+    tasks: list[asyncio.Task] = []
+
+    async def _upload_part(number: int, block: bytes):
+        try:
+            checksum = {"ChecksumCRC32": crc32_b64(block)} if validate else {}
+            resp = await client.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=block, **checksum
+            )
+            parts.append({"PartNumber": number, "ETag": resp["ETag"], **checksum})
+        finally:
+            semaphore.release()
+
+    try:
+        number = 0
+        async for block in iter_blocks(source, max(config.block_size, S3_MIN_PART_SIZE)):
+            await semaphore.acquire()
+            number += 1
+            tasks.append(asyncio.create_task(_upload_part(number, block)))
+        await asyncio.gather(*tasks)
+
+        if not parts:
+            await client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            await client.put_object(Bucket=bucket, Key=key, Body=b"", **_extra_args(content_type))
+            return
+
+        await client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+        )
+        log.debug("Upload multipart realizado: s3://%s/%s (%d partes)", bucket, key, len(parts))
+    except BaseException as e:
+        # Qualquer falha (leitura da origem, validação, cancelamento pelo
+        # cliente) aborta o multipart para não deixar partes órfãs cobradas
+        for task in tasks:
+            task.cancel()
+        try:
+            await client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            log.exception("Falha ao abortar o multipart de %s (%s)", key, upload_id)
+        if isinstance(e, (BotoCoreError, ClientError)):
+            log.error("Erro ao enviar %s: %s", key, e)
+            raise HTTPException(status_code=500, detail=f"Falha ao enviar {key}: {e}")
+        raise
+
+
+async def _read_body(resp) -> bytes:
+    async with resp["Body"] as stream:
+        return await stream.read()
+
+
+async def get_bytes(bucket: str, key: str, config: TransferConfig = DEFAULT_CONFIG) -> bytes:
+    """
+    Baixa um objeto como bytes. O primeiro GET já traz o primeiro range e o
+    tamanho total (Content-Range); o restante é baixado em ranges paralelos.
+    """
+    try:
+        client = await _get_client()
+        try:
+            first = await client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{config.range_size - 1}")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "InvalidRange":
+                raise
+            # Objeto vazio não aceita Range
+            return await _read_body(await client.get_object(Bucket=bucket, Key=key))
+
+        head = await _read_body(first)
+        content_range = first.get("ContentRange")
+        size = int(content_range.rsplit("/", 1)[1]) if content_range else len(head)
+        if size <= len(head):
+            return head
+
+        buffer = bytearray(size)
+        buffer[:len(head)] = head
+        etag = first["ETag"]
+
+        async def _get_range(start: int, end: int):
+            resp = await client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)
+            chunk = await _read_body(resp)
+            if len(chunk) != end - start + 1:
+                raise HTTPException(status_code=500, detail=f"Range incompleto ao baixar {key}")
+            buffer[start:end + 1] = chunk
+
+        ranges = byte_ranges(size, config.range_size)[1:]
+        await gather_limited((_get_range(start, end) for start, end in ranges), config.max_concurrency)
+        return bytes(buffer)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            raise HTTPException(status_code=404, detail=f"Arquivo nao encontrado: {key}")
+        log.error("Erro ao baixar %s: %s", key, e)
+        raise HTTPException(status_code=500, detail=f"Falha ao baixar {key}: {e}")
+    except BotoCoreError as e:
+        log.error("Erro ao baixar %s: %s", key, e)
+        raise HTTPException(status_code=500, detail=f"Falha ao baixar {key}: {e}")
+
+
+async def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
+    keys = []
+    try:
+        client = await _get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                keys.append(obj["Key"])
+    except (BotoCoreError, ClientError) as e:
+        log.error("Erro ao listar prefixo %s: %s", prefix, e)
+    return keys
+
+
+async def delete_object(bucket: str, key: str) -> None:
+    """Remove o objeto do S3. Lança HTTPException(500) em caso de erro fatal."""
+    try:
+        client = await _get_client()
+        await client.delete_object(Bucket=bucket, Key=key)
+    except (BotoCoreError, ClientError) as e:
+        log.error("Falha ao apagar s3://%s/%s: %s", bucket, key, e)
+        raise HTTPException(status_code=500, detail=f"Erro ao apagar arquivo no S3: {e}")
+
+
+# Limite do DeleteObjects
+BATCH_DELETE_SIZE = 1000
+
+
+async def delete_objects(bucket: str, keys: list[str]) -> list[str]:
+    """Remove vários objetos com DeleteObjects (até 1000 por chamada). Retorna as chaves que falharam."""
+    failed = []
+    client = await _get_client()
+    for start in range(0, len(keys), BATCH_DELETE_SIZE):
+        chunk = keys[start:start + BATCH_DELETE_SIZE]
+        try:
+            resp = await client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+            failed.extend(err["Key"] for err in resp.get("Errors", []))
+        except (BotoCoreError, ClientError) as e:
+            log.error("Falha no DeleteObjects em %s: %s", bucket, e)
+            failed.extend(chunk)
+    return failed
@@ -0,0 +1,117 @@
+"""
+search_results.py - Agregacao dos matches de face em resultados por foto
+
+O provider retorna um match por face indexada, entao a mesma foto aparece
+varias vezes (varias faces, reindexacoes). Aqui os matches sao agrupados
+por foto, mantendo a maior similaridade, e os ExternalImageIds sao
+resolvidos para chaves do storage em lote (photos e, para ids legados, o catalogo).
+
+Formatos de ExternalImageId aceitos:
+- UUID da foto (uploads atuais)             -> photos.id
+- nome/chave "{ts}-{uuid hex}-{nome}"       -> photos.id pelo hex, ou a propria chave
+- chave sanitizada do ingest_photo legado   -> usada como chave do storage,
+                                               se o objeto ainda estiver no catalogo
+"""
+
+import re
+import uuid
+from typing import Optional
+
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.photo import photos_table
+from app.schemas.storage_object import storage_objects_table
+
+# "{ts}-{uuid.hex}-" no inicio do nome ou apos "/" ou "_" (chave sanitizada)
+_KEY_UUID_RE = re.compile(r"(?:^|[/_])\d+-([0-9a-f]{32})-")
+
+
+def parse_external_id(external_id: str) -> tuple[Optional[uuid.UUID], Optional[str]]:
+    """Retorna (photo_id, chave) que o ExternalImageId permite inferir."""
+    try:
+        return uuid.UUID(external_id), None
+    except ValueError:
+        pass
+    match = _KEY_UUID_RE.search(external_id)
+    photo_id = uuid.UUID(match.group(1)) if match else None
+    return photo_id, external_id
+
+
+async def build_resolution_index(conn: AsyncSession, bucket: str, external_ids: list[str]) -> dict[str, dict]:
+    """
+    Resolve ExternalImageIds para {"photo_id", "key"}.
+    Ids de fotos apagadas ficam de fora: a linha em photos some (ou fica sem
+    chave) e o objeto sai do catalogo, entao o id nao resolve nem como legado.
+    """
+    parsed = {ext: parse_external_id(ext) for ext in set(external_ids) if ext}
+    ids = {pid for pid, _ in parsed.values() if pid}
+    keys = {key for _, key in parsed.values() if key}
+
+    by_id, by_key, known_ids = {}, {}, set()
+    if ids or keys:
+        conditions = []
+        if ids:
+            conditions.append(photos_table.c.id.in_(ids))
+        if keys:
+            conditions.append(photos_table.c.s3_key.in_(keys))
+        result = await conn.execute(
+            select(photos_table.c.id, photos_table.c.s3_key, photos_table.c.thumb_key).where(or_(*conditions))
+        )
+        for row in result.all():
+            known_ids.add(row.id)
+            if row.s3_key is None:
+                continue
+            by_id[row.id] = (row.s3_key, row.thumb_key)
+            by_key[row.s3_key] = row.id
+
+    index, legacy = {}, {}
+    for ext, (photo_id, key) in parsed.items():
+        if photo_id not in by_id and key in by_key:
+            photo_id = by_key[key]
+        if photo_id in by_id:
+            s3_key, thumb_key = by_id[photo_id]
+            index[ext] = {"photo_id": photo_id, "key": s3_key, "thumb_key": thumb_key or None}
+        elif key and photo_id not in known_ids:
+            legacy[ext] = key
+
+    if legacy:
+        # Legado (anterior a tabela photos): so vale se o objeto ainda existe
+        result = await conn.execute(
+            select(storage_objects_table.c.key).where(
+                storage_objects_table.c.bucket == bucket,
+                storage_objects_table.c.key.in_(set(legacy.values())),
+            )
+        )
+        stored = set(result.scalars().all())
+        for ext, key in legacy.items():
+            if key in stored:
+                index[ext] = {"photo_id": None, "key": key, "thumb_key": None}
+    return index
+
+
+def aggregate_matches(matches: list[dict], index: dict[str, dict]) -> list[dict]:
+    """
+    Agrupa os matches por foto (chave resolvida), mantendo a maior
+    similaridade, e retorna as fotos em ordem decrescente de score.
+    """
+    photos: dict[str, dict] = {}
+    for match in matches:
+        resolved = index.get(match["Face"]["ExternalImageId"])
+        if not resolved:
+            continue
+        similarity = match["Similarity"]
+        score = match.get("Score", similarity)
+        entry = photos.get(resolved["key"])
+        if entry is None:
+            photos[resolved["key"]] = {
+                "photo_id": resolved["photo_id"],
+                "key": resolved["key"],
+                "thumb_key": resolved.get("thumb_key"),
+                "similarity": similarity,
+                "score": score,
+            }
+        else:
+            entry["similarity"] = max(entry["similarity"], similarity)
+            entry["score"] = max(entry["score"], score)
+    return sorted(photos.values(), key=lambda p: (p["score"], p["similarity"]), reverse=True)
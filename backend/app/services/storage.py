@@ -5,7 +5,11 @@ Roteia automaticamente entre Azure e AWS baseado em settings.STORAGE_PROVIDER.
 Usa lazy import para evitar falhas se o provider nao estiver configurado.
 """
 
+import threading
+import time
+
 from app.settings import settings
+from app.services.instrumentation import record_presign, track_call
 
 
 def _get_impl():
@@ -20,14 +24,54 @@ def _get_impl():
     raise RuntimeError(f"STORAGE_PROVIDER invalido: {provider!r}. Use 'azure' ou 'aws'.")
 
 
+def _track(operation: str):
+    return track_call("storage", operation, getattr(settings, "STORAGE_PROVIDER", "azure"))
+
+
 def get_bucket_raw() -> str:
     """Retorna o bucket/container padrao."""
     return _get_impl().BUCKET_RAW
 
 
+def ensure_containers(containers: list[str] = None) -> dict[str, dict]:
+    """Valida/cria os containers (startup e revalidacao). Padrao: o bucket raw."""
+    with _track("ensure_containers"):
+        return _get_impl().ensure_containers(containers or [get_bucket_raw()])
+
+
+def container_status() -> dict[str, dict]:
+    """Status dos containers validados no startup (vazio se ainda nao validou)."""
+    return dict(_get_impl().CONTAINER_STATUS)
+
+
+_recheck_lock = threading.Lock()
+_last_recheck = 0.0
+
+
+def recheck_failed_containers() -> dict[str, dict]:
+    """
+    Revalida os containers que falharam, no maximo uma vez a cada
+    STORAGE_RECHECK_SECONDS (uma falha transitoria no startup nao deixa o
+    /health em 503 para sempre). Containers ok nao geram chamada ao storage.
+    """
+    global _last_recheck
+    failed = [name for name, status in container_status().items() if not status["ok"]]
+    if not failed or time.monotonic() - _last_recheck < settings.STORAGE_RECHECK_SECONDS:
+        return container_status()
+    # Uma revalidacao por vez; as demais chamadas respondem com o status atual
+    if not _recheck_lock.acquire(blocking=False):
+        return container_status()
+    try:
+        _last_recheck = time.monotonic()
+        return dict(ensure_containers(failed))
+    finally:
+        _recheck_lock.release()
+
+
 def put_bytes(bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
     """Upload de bytes para storage."""
-    return _get_impl().put_bytes(bucket, key, data, content_type)
+    with _track("put"):
+        return _get_impl().put_bytes(bucket, key, data, content_type)
 
 
 def get_bytes(bucket: str, key: str) -> bytes:
@@ -35,26 +79,35 @@ def get_bytes(bucket: str, key: str) -> bytes:
     impl = _get_impl()
     provider = getattr(settings, "STORAGE_PROVIDER", "azure")
 
-    if provider == "azure":
-        return impl.get_blob_bytes(bucket, key)
+    with _track("get"):
+        if provider == "azure":
+            return impl.get_blob_bytes(bucket, key)
 
-    # AWS fallback
-    obj = impl.s3.get_object(Bucket=bucket, Key=key)
-    return obj["Body"].read()
+        # AWS: download_fileobj com ranges paralelos
+        return impl.get_bytes(bucket, key)
 
 
 def presign_get(bucket: str, key: str, expires: int = None) -> str:
     """Gera URL assinada para download."""
     if expires is None:
         expires = settings.PRESIGNED_EXPIRE_SECONDS
-    return _get_impl().presign_get(bucket, key, expires)
+    # Assinatura e local e rapida: soma por requisicao em vez de um histograma por chamada
+    started = time.perf_counter()
+    try:
+        return _get_impl().presign_get(bucket, key, expires)
+    finally:
+        record_presign(time.perf_counter() - started)
 
 
 def presign_put(bucket: str, key: str, content_type: str, expires: int = None) -> str:
     """Gera URL assinada para upload."""
     if expires is None:
         expires = settings.PRESIGNED_EXPIRE_SECONDS
-    return _get_impl().presign_put(bucket, key, content_type, expires)
+    started = time.perf_counter()
+    try:
+        return _get_impl().presign_put(bucket, key, content_type, expires)
+    finally:
+        record_presign(time.perf_counter() - started)
 
 
 def make_object_key(event_slug: str, original_name: str) -> str:
@@ -64,7 +117,8 @@ def make_object_key(event_slug: str, original_name: str) -> str:
 
 def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
     """Lista chaves com determinado prefixo."""
-    return _get_impl().list_keys_in_prefix(bucket, prefix)
+    with _track("list"):
+        return _get_impl().list_keys_in_prefix(bucket, prefix)
 
 
 async def list_s3_files(prefix: str, bucket: str = None) -> list[dict]:
@@ -72,12 +126,14 @@ async def list_s3_files(prefix: str, bucket: str = None) -> list[dict]:
     impl = _get_impl()
     if bucket is None:
         bucket = impl.BUCKET_RAW
-    return await impl.list_s3_files(prefix, bucket=bucket)
+    with _track("list"):
+        return await impl.list_s3_files(prefix, bucket=bucket)
 
 
 def delete_object(bucket: str, key: str) -> None:
     """Remove objeto do storage."""
-    return _get_impl().delete_object(bucket, key)
+    with _track("delete"):
+        return _get_impl().delete_object(bucket, key)
 
 
 def guess_ext(content_type: str) -> str:
@@ -0,0 +1,99 @@
+"""
+storage_aio.py - Wrapper assíncrono para Storage (Azure Blob / AWS S3)
+
+Versão awaitable de storage.py para uso dentro dos handlers async:
+um upload lento não trava as outras requisições do worker.
+Roteia entre azure_blob_aio e s3_aio baseado em settings.STORAGE_PROVIDER.
+
+Uploads e deletes tambem atualizam o catalogo (storage_catalog), usado
+pelas listagens no lugar de list_keys_in_prefix.
+"""
+
+from app.settings import settings
+from app.services import storage_catalog
+from app.services.instrumentation import track_call
+
+
+def _get_impl():
+    """Lazy import do modulo correto baseado no provider."""
+    provider = getattr(settings, "STORAGE_PROVIDER", "azure")
+    if provider == "azure":
+        from app.services import azure_blob_aio as impl
+        return impl
+    if provider == "aws":
+        from app.services import s3_aio as impl
+        return impl
+    raise RuntimeError(f"STORAGE_PROVIDER invalido: {provider!r}. Use 'azure' ou 'aws'.")
+
+
+def _track(operation: str):
+    return track_call("storage", operation, getattr(settings, "STORAGE_PROVIDER", "azure"))
+
+
+async def startup() -> None:
+    """Abre o cliente assincrono e seu pool de conexoes."""
+    await _get_impl().startup()
+
+
+async def shutdown() -> None:
+    """Fecha o cliente assincrono."""
+    await _get_impl().shutdown()
+
+
+async def put_bytes(bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+    """Upload de bytes para storage."""
+    with _track("put"):
+        result = await _get_impl().put_bytes(bucket, key, data, content_type)
+    await storage_catalog.record_put(bucket, key, len(data), content_type)
+    return result
+
+
+async def put_stream(
+    bucket: str,
+    key: str,
+    source,
+    content_type: str = "application/octet-stream",
+    length: int = None,
+):
+    """
+    Upload em streaming (arquivo, UploadFile ou async iterator) em blocos
+    paralelos, sem carregar o arquivo inteiro em memoria.
+    """
+    with _track("put_stream"):
+        result = await _get_impl().put_stream(bucket, key, source, content_type, length=length)
+    await storage_catalog.record_put(bucket, key, length, content_type)
+    return result
+
+
+async def get_bytes(bucket: str, key: str) -> bytes:
+    """Download de bytes do storage."""
+    with _track("get"):
+        return await _get_impl().get_bytes(bucket, key)
+
+
+async def list_keys_in_prefix(bucket: str, prefix: str) -> list[str]:
+    """Lista chaves com determinado prefixo direto no storage (usar storage_catalog.list_keys nas rotas)."""
+    with _track("list"):
+        return await _get_impl().list_keys_in_prefix(bucket, prefix)
+
+
+async def delete_objects(bucket: str, keys: list[str]) -> list[str]:
+    """
+    Remove varios objetos em lote (Blob Batch / DeleteObjects).
+    Retorna as chaves que nao puderam ser removidas.
+    """
+    if not keys:
+        return []
+    with _track("delete_many"):
+        failed = await _get_impl().delete_objects(bucket, keys)
+    failed_set = set(failed)
+    await storage_catalog.record_delete_many(bucket, [k for k in keys if k not in failed_set])
+    return failed
+
+
+async def delete_object(bucket: str, key: str) -> None:
+    """Remove objeto do storage."""
+    with _track("delete"):
+        result = await _get_impl().delete_object(bucket, key)
+    await storage_catalog.record_delete(bucket, key)
+    return result
@@ -0,0 +1,196 @@
+"""
+storage_catalog.py - Catalogo de objetos do storage no Postgres
+
+Listar um prefixo no Blob/S3 e uma listagem paginada a cada requisicao.
+O catalogo (tabela storage_objects) e atualizado a cada upload/delete feito
+por storage_aio, e as rotas de listagem leem dele com uma unica consulta
+por faixa de chave (key >= prefixo AND key < proximo prefixo), servida pela
+PK (bucket, key) em collation "C".
+
+Uploads/deletes feitos por fora da aplicacao (ou que falharam ao registrar
+no catalogo) sao corrigidos pelo reconciliador periodico (reconcile), que
+compara o catalogo com a listagem real do container.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, select, delete, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.storage_object import storage_objects_table
+from app.services import http_cache
+from app.services.db import async_session_maker
+
+log = logging.getLogger("storage_catalog")
+
+RECONCILE_BATCH_SIZE = 1000
+
+
+def prefix_of(key: str) -> str:
+    """Prefixo ("pasta") de uma chave, com a barra final."""
+    return key.rsplit("/", 1)[0] + "/" if "/" in key else ""
+
+
+def _bump_listing(keys) -> None:
+    # Listagens da galeria dependem do catalogo ("{evento}/general|videos/...")
+    http_cache.bump(*{f"gallery:{key.split('/', 1)[0]}" for key in keys})
+
+
+def _normalize_prefix(prefix: str) -> str:
+    return prefix if not prefix or prefix.endswith("/") else prefix + "/"
+
+
+def _prefix_range(prefix: str):
+    """Condicao "chave comeca com prefix" como faixa, usavel pelo indice da PK."""
+    key = storage_objects_table.c.key
+    if not prefix:
+        return true()
+    # Menor string maior que todas as chaves com o prefixo ("ev/" -> "ev0")
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(key >= prefix, key < upper)
+
+
+# ============================================================
+# ESCRITA (chamada por storage_aio apos upload/delete)
+# ============================================================
+
+async def record_put(bucket: str, key: str, size: Optional[int] = None, content_type: Optional[str] = None) -> None:
+    """Registra (ou atualiza) um objeto no catalogo. Falhas so geram log."""
+    now = datetime.utcnow()
+    stmt = insert(storage_objects_table).values(
+        bucket=bucket,
+        key=key,
+        prefix=prefix_of(key),
+        size=size,
+        content_type=content_type,
+        created_at=now,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket", "key"],
+        set_={"size": stmt.excluded.size, "content_type": stmt.excluded.content_type, "updated_at": now},
+    )
+    try:
+        async with async_session_maker() as session:
+            await session.execute(stmt)
+            await session.commit()
+        _bump_listing([key])
+    except Exception:
+        # O objeto ja esta no storage; o reconciliador corrige o catalogo depois
+        log.exception("Falha ao registrar %s/%s no catalogo", bucket, key)
+
+
+async def record_delete(bucket: str, key: str) -> None:
+    """Remove um objeto do catalogo. Falhas so geram log."""
+    try:
+        async with async_session_maker() as session:
+            await session.execute(
+                delete(storage_objects_table).where(
+                    storage_objects_table.c.bucket == bucket,
+                    storage_objects_table.c.key == key,
+                )
+            )
+            await session.commit()
+        _bump_listing([key])
+    except Exception:
+        log.exception("Falha ao remover %s/%s do catalogo", bucket, key)
+
+
+async def record_delete_many(bucket: str, keys: list[str]) -> None:
+    """Remove varios objetos do catalogo (lotes de RECONCILE_BATCH_SIZE)."""
+    if not keys:
+        return
+    try:
+        async with async_session_maker() as session:
+            for i in range(0, len(keys), RECONCILE_BATCH_SIZE):
+                await session.execute(
+                    delete(storage_objects_table).where(
+                        storage_objects_table.c.bucket == bucket,
+                        storage_objects_table.c.key.in_(keys[i:i + RECONCILE_BATCH_SIZE]),
+                    )
+                )
+            await session.commit()
+        _bump_listing(keys)
+    except Exception:
+        log.exception("Falha ao remover %d objetos do catalogo", len(keys))
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+async def list_keys(
+    conn: AsyncSession,
+    bucket: str,
+    prefix: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> list[str]:
+    """
+    Lista as chaves sob um prefixo (recursivo, como a listagem do storage),
+    ordenadas pela chave. Sem limit retorna todas.
+    """
+    query = (
+        select(storage_objects_table.c.key)
+        .where(
+            storage_objects_table.c.bucket == bucket,
+            _prefix_range(_normalize_prefix(prefix)),
+        )
+        .order_by(storage_objects_table.c.key)
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await conn.execute(query)
+    return list(result.scalars().all())
+
+
+# ============================================================
+# RECONCILIACAO
+# ============================================================
+
+async def reconcile(conn: AsyncSession, bucket: str, prefix: str = "") -> dict:
+    """
+    Compara o catalogo com a listagem real do storage: insere o que falta e
+    remove o que nao existe mais. Linhas gravadas depois do inicio da
+    listagem sao preservadas (uploads concorrentes com a reconciliacao).
+    """
+    from app.services import storage_aio
+
+    started_at = datetime.utcnow()
+    actual = set(await storage_aio.list_keys_in_prefix(bucket, prefix))
+
+    query = select(storage_objects_table.c.key, storage_objects_table.c.updated_at).where(
+        storage_objects_table.c.bucket == bucket
+    )
+    if prefix:
+        query = query.where(_prefix_range(prefix))
+    catalog = {row.key: row.updated_at for row in (await conn.execute(query)).all()}
+
+    missing = sorted(actual - catalog.keys())
+    stale = sorted(key for key, updated_at in catalog.items() if key not in actual and updated_at < started_at)
+
+    for i in range(0, len(missing), RECONCILE_BATCH_SIZE):
+        rows = [
+            {"bucket": bucket, "key": key, "prefix": prefix_of(key), "created_at": started_at, "updated_at": started_at}
+            for key in missing[i:i + RECONCILE_BATCH_SIZE]
+        ]
+        await conn.execute(insert(storage_objects_table).values(rows).on_conflict_do_nothing())
+
+    for i in range(0, len(stale), RECONCILE_BATCH_SIZE):
+        await conn.execute(
+            delete(storage_objects_table).where(
+                storage_objects_table.c.bucket == bucket,
+                storage_objects_table.c.key.in_(stale[i:i + RECONCILE_BATCH_SIZE]),
+                storage_objects_table.c.updated_at < started_at,
+            )
+        )
+    await conn.commit()
+    _bump_listing(missing + stale)
+
+    if missing or stale:
+        log.info("Catalogo %s reconciliado: +%d / -%d objetos", bucket, len(missing), len(stale))
+    return {"bucket": bucket, "added": len(missing), "removed": len(stale), "total": len(actual)}
@@ -0,0 +1,402 @@
+"""
+tracing.py - Spans das requisições (rota, banco, storage, faces, zips)
+
+Tracer próprio no formato do OpenTelemetry (trace/span ids W3C, atributos,
+status), sem dependência externa: funciona offline e exporta localmente.
+- span(): abre um span filho do atual (ou uma trace nova, sem pai);
+- TracingMiddleware: span raiz por requisição, continua o `traceparent`
+  recebido e devolve o da trace no header da resposta;
+- instrument_engine(): um span por statement SQL;
+- ContextThreadPoolExecutor: leva o span atual para as threads (as chamadas
+  ao provider de faces rodam em executors).
+
+Amostragem na cauda: a trace inteira fica em memória até o span raiz
+terminar e só é exportada se for lenta (acima de TRACE_SLOW_MS ou do
+quantil TRACE_ADAPTIVE_QUANTILE das últimas traces da mesma rota), com
+erro, pedida pelo cliente (flag sampled do traceparent) ou sorteada em
+TRACE_SAMPLE_RATE. Exportadas vão para um buffer em memória (recent(),
+/admin/traces) e, com TRACE_EXPORT_PATH, para um arquivo JSON lines.
+"""
+
+import contextvars
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.settings import settings
+
+log = logging.getLogger("tracing")
+
+SERVICE_NAME = "moments-api"
+MAX_STATEMENT_CHARS = 500
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "dropped", "forced", "closed")
+
+    def __init__(self, trace_id: str, forced: bool = False):
+        self.trace_id = trace_id
+        self.spans: list["Span"] = []
+        self.dropped = 0
+        self.forced = forced
+        self.closed = False
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[str], kind: str, attributes: dict):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        trace = self.trace
+        if len(trace.spans) < settings.TRACE_MAX_SPANS:
+            trace.spans.append(self)
+        else:
+            trace.dropped += 1
+        if self.parent_id is None or self.kind == "server":
+            _finish(trace, self)
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_ids() -> tuple[Optional[str], Optional[str]]:
+    """(trace_id, span_id) do span atual, para os logs."""
+    span = _current.get()
+    if span is None:
+        return None, None
+    return span.trace.trace_id, span.span_id
+
+
+def start_span(name: str, kind: str = "internal", root: bool = False, **attributes) -> Optional[Span]:
+    """
+    Cria um span sem torná-lo o atual (termine com span.end()). Sem span
+    atual, com a trace do pai já exportada ou com root=True, começa uma trace
+    nova ligada à anterior. Background tasks usam root=True: rodam enquanto
+    a resposta ainda está saindo e seus spans chegariam depois da exportação.
+    """
+    if not settings.TRACING_ENABLED:
+        return None
+    parent = _current.get()
+    if root or parent is None or parent.trace.closed:
+        if parent is not None:
+            attributes["link.trace_id"] = parent.trace.trace_id
+        return Span(_Trace(_new_id(128)), name, None, kind, attributes)
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", root: bool = False, **attributes):
+    """Span filho do atual enquanto o bloco roda (sync ou em volta de awaits)."""
+    current = start_span(name, kind, root, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def record_span(name: str, start_ns: int, end_ns: int, error: Optional[str] = None, **attributes) -> None:
+    """Span já medido, filho do atual; fora de uma trace aberta é descartado."""
+    parent = _current.get()
+    if parent is None or parent.trace.closed:
+        return
+    child = Span(parent.trace, name, parent.span_id, "client", attributes)
+    child.start_ns = start_ns
+    child.error = error
+    child.end_ns = end_ns
+    if len(parent.trace.spans) < settings.TRACE_MAX_SPANS:
+        parent.trace.spans.append(child)
+    else:
+        parent.trace.dropped += 1
+
+
+# ============================================================
+# AMOSTRAGEM E EXPORTAÇÃO
+# ============================================================
+
+class _SlowTracker:
+    """Quantil das durações recentes por nome de raiz (recalculado a cada 32 traces)."""
+
+    def __init__(self):
+        self._durations: dict[str, deque] = {}
+        self._thresholds: dict[str, float] = {}
+        self._since: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def is_slow(self, name: str, duration_ms: float) -> bool:
+        window = settings.TRACE_ADAPTIVE_WINDOW
+        if window <= 0:
+            return False
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=window)
+            durations.append(duration_ms)
+            since = self._since.get(name, 0) + 1
+            if since >= 32 and len(durations) == window:
+                ordered = sorted(durations)
+                index = min(window - 1, int(window * settings.TRACE_ADAPTIVE_QUANTILE))
+                self._thresholds[name] = ordered[index]
+                since = 0
+            self._since[name] = since
+            threshold = self._thresholds.get(name)
+        return threshold is not None and duration_ms >= threshold
+
+
+_slow = _SlowTracker()
+_recent: deque = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+_file_queue: Optional[queue.SimpleQueue] = None
+_file_lock = threading.Lock()
+
+
+def _finish(trace: _Trace, root: Span) -> None:
+    if trace.closed:
+        return
+    trace.closed = True
+    duration_ms = (root.end_ns - root.start_ns) / 1e6
+    errored = any(s.error for s in trace.spans)
+    slow = duration_ms >= settings.TRACE_SLOW_MS or _slow.is_slow(root.name, duration_ms)
+    if not (trace.forced or errored or slow or random.random() < settings.TRACE_SAMPLE_RATE):
+        return
+    _export({
+        "traceId": trace.trace_id,
+        "name": root.name,
+        "durationMs": round(duration_ms, 3),
+        "sampledBy": "forced" if trace.forced else "error" if errored else "slow" if slow else "rate",
+        "resource": {"service.name": SERVICE_NAME, "process.pid": os.getpid()},
+        "droppedSpans": trace.dropped,
+        "spans": [s.to_dict() for s in trace.spans],
+    })
+
+
+def _export(record: dict) -> None:
+    _recent.append(record)
+    if settings.TRACE_EXPORT_PATH:
+        _file_writer().put(record)
+
+
+def _file_writer() -> queue.SimpleQueue:
+    """Fila para a thread que grava o arquivo (disco fora do event loop)."""
+    global _file_queue
+    with _file_lock:
+        if _file_queue is None:
+            _file_queue = queue.SimpleQueue()
+            threading.Thread(target=_write_loop, args=(_file_queue,), name="trace-exporter", daemon=True).start()
+    return _file_queue
+
+
+def _write_loop(records: queue.SimpleQueue) -> None:
+    while True:
+        record = records.get()
+        try:
+            with open(settings.TRACE_EXPORT_PATH, "ab") as fh:
+                fh.write(orjson.dumps(record, default=str) + b"\n")
+        except OSError:
+            log.exception("Falha ao exportar trace %s", record.get("traceId"))
+
+
+def recent(limit: int = 50) -> list[dict]:
+    """Traces exportadas deste worker, mais recentes primeiro (sem os spans)."""
+    items = list(_recent)[-limit:][::-1]
+    return [{k: v for k, v in item.items() if k != "spans"} | {"spans": len(item["spans"])} for item in items]
+
+
+def get_trace(trace_id: str) -> Optional[dict]:
+    for item in reversed(_recent):
+        if item["traceId"] == trace_id:
+            return item
+    return None
+
+
+# ============================================================
+# REQUISIÇÕES
+# ============================================================
+
+def route_label(scope) -> str:
+    """Template da rota (não a URL), para nomes de span e rótulos de métricas."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope.get("path", "").startswith("/metrics"):
+        return "/metrics"
+    # Sem rota (404): um rótulo só, para não criar uma série por URL
+    return "<unmatched>"
+
+
+def _parse_traceparent(headers) -> Optional[tuple[str, str, bool]]:
+    for name, value in headers:
+        if name == b"traceparent":
+            match = _TRACEPARENT.match(value.decode("latin-1").strip().lower())
+            if match and match.group(1) != "0" * 32:
+                return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+            return None
+    return None
+
+
+class TracingMiddleware:
+    """Middleware ASGI: span raiz da requisição (termina com o corpo da resposta)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        incoming = _parse_traceparent(scope.get("headers", ()))
+        if incoming:
+            trace = _Trace(incoming[0], forced=incoming[2])
+            root = Span(trace, scope["method"], incoming[1], "server", {})
+        else:
+            root = Span(_Trace(_new_id(128)), scope["method"], None, "server", {})
+        root.attributes["http.method"] = scope["method"]
+        root.attributes["http.target"] = scope.get("path", "")
+        token = _current.set(root)
+
+        def _close(status: int) -> None:
+            if root.end_ns is not None:
+                return
+            root.name = f"{scope['method']} {route_label(scope)}"
+            root.attributes["http.route"] = route_label(scope)
+            root.attributes["http.status_code"] = status
+            if status >= 500 and root.error is None:
+                root.error = f"HTTP {status}"
+            root.end()
+
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                traceparent = f"00-{root.trace.trace_id}-{root.span_id}-01".encode()
+                message = {**message, "headers": [*message.get("headers", ()), (b"traceparent", traceparent)]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks depois daqui abrem uma trace própria (ligada a esta)
+                _close(status)
+
+        try:
+            await self.app(scope, receive, _send)
+        except BaseException as exc:
+            root.record_error(exc)
+            raise
+        finally:
+            _current.reset(token)
+            _close(status)
+
+
+# ============================================================
+# BANCO
+# ============================================================
+
+def _operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    return words[0].upper() if words else ""
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Um span por statement, filho do span atual (sessões fora de trace não geram spans)."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._trace_started = time.time_ns()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_trace_started", None)
+        if started is not None:
+            record_span(
+                f"db.{_operation(statement).lower() or 'query'}", started, time.time_ns(),
+                **{"db.system": sync_engine.dialect.name, "db.statement": statement[:MAX_STATEMENT_CHARS]},
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        context = exception_context.execution_context
+        started = getattr(context, "_trace_started", None) if context is not None else None
+        if started is not None:
+            statement = exception_context.statement or ""
+            record_span(
+                f"db.{_operation(statement).lower() or 'query'}", started, time.time_ns(),
+                error=f"{type(exception_context.original_exception).__name__}",
+                **{"db.system": sync_engine.dialect.name, "db.statement": statement[:MAX_STATEMENT_CHARS]},
+            )
+
+
+# ============================================================
+# EXECUTORS
+# ============================================================
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor que roda cada tarefa no contexto de quem submeteu (span atual)."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
@@ -0,0 +1,87 @@
+"""
+transfer.py - Configuração e utilitários de transferência de blobs grandes
+
+Define os parâmetros usados pelos backends de storage para:
+- upload em blocos paralelos (block_size / max_concurrency)
+- download em ranges paralelos (range_size / max_concurrency)
+- validação por bloco (MD5 no Azure, CRC32 no S3)
+- upload em streaming a partir de arquivo ou async iterator
+
+Os valores padrão vêm de settings (TRANSFER_*).
+"""
+
+import asyncio
+import base64
+import inspect
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, BinaryIO, Iterable, Union
+
+from app.settings import settings
+
+# Fontes aceitas pelo upload em streaming
+Source = Union[bytes, BinaryIO, AsyncIterator[bytes]]
+
+
+@dataclass(frozen=True)
+class TransferConfig:
+    block_size: int = settings.TRANSFER_BLOCK_SIZE
+    range_size: int = settings.TRANSFER_RANGE_SIZE
+    max_concurrency: int = settings.TRANSFER_MAX_CONCURRENCY
+    single_put_threshold: int = settings.TRANSFER_SINGLE_PUT_THRESHOLD
+    validate_content: bool = settings.TRANSFER_VALIDATE_CONTENT
+
+
+DEFAULT_CONFIG = TransferConfig()
+
+
+def crc32_b64(block: bytes) -> str:
+    """CRC32 no formato esperado pelo S3 (ChecksumCRC32: base64 big-endian)."""
+    return base64.b64encode(zlib.crc32(block).to_bytes(4, "big")).decode()
+
+
+def byte_ranges(size: int, range_size: int) -> list[tuple[int, int]]:
+    """Divide [0, size) em ranges inclusivos (start, end) para GETs paralelos."""
+    return [(start, min(start + range_size, size) - 1) for start in range(0, size, range_size)]
+
+
+async def iter_blocks(source: Source, block_size: int) -> AsyncIterator[bytes]:
+    """
+    Itera uma fonte em blocos de block_size bytes, sem carregar tudo em memória.
+    Aceita bytes, arquivos (sync ou com read() async, ex.: UploadFile) e
+    async iterators (os blocos do iterator são reagrupados em block_size).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), block_size):
+            yield bytes(view[start:start + block_size])
+        return
+
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(block_size)
+            if inspect.isawaitable(chunk):
+                chunk = await chunk
+            if not chunk:
+                return
+            yield chunk
+
+    buffer = bytearray()
+    async for chunk in source:
+        buffer.extend(chunk)
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def gather_limited(coros: Iterable[Awaitable], limit: int) -> list:
+    """asyncio.gather com no máximo `limit` corrotinas em andamento."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(_run(c) for c in coros))
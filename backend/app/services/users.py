@@ -1,10 +1,12 @@
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, select
-from passlib.hash import bcrypt
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import HTTPException, status
 from app.schemas.user import users_table, UserCreate, AdminCreate, UserRole
-from app.services.metrics import track
+from app.services import passwords
+from app.services.db import autocommit_conn, release_conn
+from app.services.metrics import track_nowait
 
 # -------------------------------
 # Função auxiliar para validar role
@@ -15,53 +17,67 @@ def validate_role(role: str) -> UserRole:
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Role inválida: {role}")
 # -------------------------------
+# Colunas de um cadastro (usuário normal/fotógrafo)
+# -------------------------------
+def _user_values(data: UserCreate, email: str, password_hash: str) -> dict:
+    return dict(
+        name=data.name,
+        email=email,
+        last_name=data.last_name,
+        password_hash=password_hash,
+        whatsapp=data.whatsapp,
+        instagram=data.instagram,
+        accepted_lgpd=data.accepted_lgpd,
+        biometric_acceptance=data.biometric_acceptance,
+        international_transfer_data=data.international_transfer_data,
+        image_usage_portifolio=data.image_usage_portifolio,
+        marketing_communication_usage=data.marketing_communication_usage,
+        age_declaration=data.age_declaration,
+        responsible_consent=data.responsible_consent,
+        event_slug=data.event_slug,
+        role=validate_role(data.role.value),
+    )
+
+# -------------------------------
 # Criar ou obter usuário normal
 # -------------------------------
 async def create_or_get_user(conn: AsyncSession, data: UserCreate):
+    """
+    Cadastro idempotente por e-mail. Um SELECT pelo e-mail (em autocommit,
+    fora da transação da sessão) devolve o usuário existente (convidado lendo
+    o QR de novo) sem passar pelo bcrypt; só um e-mail novo gera hash, e entra
+    com INSERT ... ON CONFLICT (email) DO NOTHING RETURNING (cadastro
+    concorrente do mesmo e-mail = busca o existente) e um único COMMIT.
+    A métrica "register" vai para a fila (gravada fora da requisição).
+    """
+    validate_role(data.role.value)
     email = data.email.lower().strip()
-    stmt = select(users_table).where(users_table.c.email == email)
-    result = await conn.execute(stmt)
-    existing = result.mappings().first()
-    
-    if existing:
-        return existing
-    
-    password_hash = bcrypt.hash(data.password)
-    role_enum = validate_role(data.role.value)
+    # A sessão não abre transação antes do bcrypt: nada a devolver ao pool
+    # nem COMMIT extra depois da leitura
+    async with autocommit_conn(conn) as probe:
+        result = await probe.execute(select(users_table).where(users_table.c.email == email))
+        row = result.mappings().first()
+    if row is not None:
+        return row
+
+    values = _user_values(data, email, await passwords.hash_password(data.password))
 
     stmt = (
-        insert(users_table)
-        .values(
-            name=data.name,
-            email=email,
-            last_name=data.last_name,
-            password_hash=password_hash, 
-            whatsapp=data.whatsapp,
-            instagram=data.instagram,
-            accepted_lgpd=data.accepted_lgpd,
-            biometric_acceptance=data.biometric_acceptance,
-            international_transfer_data=data.international_transfer_data,
-            image_usage_portifolio=data.image_usage_portifolio,
-            marketing_communication_usage=data.marketing_communication_usage,
-            age_declaration=data.age_declaration,
-            responsible_consent=data.responsible_consent,
-            event_slug=data.event_slug,
-            role=role_enum,
-        )
+        pg_insert(users_table)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=[users_table.c.email])
         .returning(users_table)
     )
     result = await conn.execute(stmt)
     row = result.mappings().first()
-    
-    if row:
-        await track(
-            conn,
-            action="register",
-            user_id=str(row["id"]),
-            event_slug=data.event_slug
-        )
-        await conn.commit()
-        
+    created = row is not None
+    if not created:
+        result = await conn.execute(select(users_table).where(users_table.c.email == email))
+        row = result.mappings().first()
+    await conn.commit()
+
+    if created:
+        track_nowait("register", user_id=str(row["id"]), event_slug=data.event_slug)
     return row
 
 # -------------------------------
@@ -74,7 +90,8 @@ async def create_admin_user(conn: AsyncSession, data: AdminCreate):
     if result.mappings().first():
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Um usuário com este e-mail já existe.")
 
-    password_hash = bcrypt.hash(data.password)
+    await release_conn(conn)
+    password_hash = await passwords.hash_password(data.password)
     role_enum = UserRole.ADMIN  # enum direto
 
     stmt = (
@@ -104,15 +121,73 @@ async def create_admin_user(conn: AsyncSession, data: AdminCreate):
 
     return row
 
+# -------------------------------
+# Cadastro em massa (lista de convidados)
+# -------------------------------
+async def create_users_bulk(conn: AsyncSession, items: list[UserCreate]):
+    """
+    Cadastra vários usuários de uma vez: e-mails já cadastrados (ou repetidos
+    na lista) devolvem o usuário existente, como em create_or_get_user. As
+    senhas novas são processadas em lote no pool de processos e os usuários
+    entram num INSERT ... ON CONFLICT só (quem foi cadastrado por outra
+    requisição no meio tempo é buscado depois). Retorna os usuários na ordem
+    da lista.
+    """
+    pending: dict[str, UserCreate] = {}
+    for data in items:
+        validate_role(data.role.value)
+        pending.setdefault(data.email.lower().strip(), data)
+    if not pending:
+        return []
+
+    result = await conn.execute(select(users_table).where(users_table.c.email.in_(list(pending))))
+    by_email = {row["email"]: row for row in result.mappings().all()}
+    new = {email: data for email, data in pending.items() if email not in by_email}
+
+    if new:
+        await release_conn(conn)
+        hashes = await passwords.hash_many([data.password for data in new.values()])
+        stmt = (
+            pg_insert(users_table)
+            .values([
+                _user_values(data, email, password_hash)
+                for (email, data), password_hash in zip(new.items(), hashes)
+            ])
+            .on_conflict_do_nothing(index_elements=[users_table.c.email])
+            .returning(users_table)
+        )
+        result = await conn.execute(stmt)
+        created = result.mappings().all()
+        by_email.update({row["email"]: row for row in created})
+        missing = [email for email in new if email not in by_email]
+        if missing:
+            result = await conn.execute(select(users_table).where(users_table.c.email.in_(missing)))
+            by_email.update({row["email"]: row for row in result.mappings().all()})
+        await conn.commit()
+        for row in created:
+            track_nowait("register", user_id=str(row["id"]), event_slug=row["event_slug"])
+
+    return [by_email[data.email.lower().strip()] for data in items]
+
 # -------------------------------
 # Autenticação
 # -------------------------------
 async def authenticate_user(conn: AsyncSession, email: str, password: str):
+    """
+    Usuário com a senha conferida, ou None. Se o hash foi gerado com outro
+    custo, grava o hash novo na transação da sessão (quem chama faz o commit).
+    """
     stmt = select(users_table).where(users_table.c.email == email.lower().strip())
     result = await conn.execute(stmt)
     user = result.mappings().first()
     if not user or not user["password_hash"]:
         return None
-    if not bcrypt.verify(password, user["password_hash"]):
+    await release_conn(conn)
+    valid, new_hash = await passwords.verify_password(password, user["password_hash"])
+    if not valid:
         return None
+    if new_hash:
+        await conn.execute(
+            update(users_table).where(users_table.c.id == user["id"]).values(password_hash=new_hash)
+        )
     return user
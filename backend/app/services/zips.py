@@ -1,80 +1,83 @@
-import io
-import zipfile
-import boto3
-import httpx  # Usamos httpx para requisições assíncronas
 import asyncio
 import hashlib  # Usamos hashlib para uma chave consistente
+import io
+import logging
+import zipfile
 from typing import List, Optional
-from botocore.exceptions import ClientError
-from .s3 import BUCKET_RAW, presign_get
 
-s3 = boto3.client("s3")
+from fastapi import HTTPException
+
+from . import storage, storage_aio, tracing
+from .transfer import gather_limited
+from ..settings import settings
+
+log = logging.getLogger("zips")
+
+
+def build_zip(files: list[tuple[str, bytes]]) -> bytes:
+    """Compacta os arquivos em memória (CPU-bound, roda fora do event loop)."""
+    in_memory_zip = io.BytesIO()
+    with zipfile.ZipFile(in_memory_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for file_name, data in files:
+            zf.writestr(file_name, data)
+    return in_memory_zip.getvalue()
+
+
+def zip_key_for(keys: List[str]) -> str:
+    """Chave consistente: a mesma lista (em qualquer ordem) gera o mesmo zip."""
+    keys_tuple = tuple(sorted(keys))
+    zip_hash = hashlib.md5(str(keys_tuple).encode()).hexdigest()
+    return f"zips/search-{zip_hash}.zip"
+
 
-async def create_zip_from_keys(keys: List[str]) -> Optional[str]:
+async def create_zip_from_keys(keys: List[str], zip_key: Optional[str] = None) -> Optional[str]:
     """
-    Cria um arquivo ZIP a partir de uma lista de chaves S3 de forma assíncrona.
-    
-    Esta função baixa os arquivos em paralelo, os compacta em memória,
-    faz o upload do ZIP para o S3 e retorna uma URL pré-assinada para download.
+    Cria um arquivo ZIP a partir de uma lista de chaves do storage.
+
+    Baixa os arquivos em paralelo, compacta fora do event loop, faz o upload
+    do ZIP e retorna uma URL pré-assinada para download. Roda como background
+    task da busca: ganha uma trace própria, ligada à da requisição.
     """
     if not keys:
         return None
 
-    # 1. Geração de chave consistente para o arquivo ZIP usando MD5
-    # Ordenamos as chaves para garantir que a mesma lista sempre produza o mesmo hash
-    keys_tuple = tuple(sorted(keys))
-    zip_hash = hashlib.md5(str(keys_tuple).encode()).hexdigest()
-    zip_key = f"zips/search-result-{zip_hash}.zip"
-
-    # Criar o buffer para o ZIP em memória
-    zip_buffer = io.BytesIO()
+    zip_key = zip_key or zip_key_for(keys)
+    bucket = storage.get_bucket_raw()
 
-    async with httpx.AsyncClient() as client:
-        # Função interna para baixar e adicionar um único arquivo ao ZIP
-        async def download_and_add_to_zip(key: str, zip_file: zipfile.ZipFile):
+    with tracing.span("zip.build", root=True, **{"zip.key": zip_key, "zip.files": len(keys)}) as span:
+        async def _fetch(key: str):
+            # Nome da imagem mais limpo dentro do zip: remove o timestamp e o UUID
+            original_filename = key.split("-", 2)[-1]
             try:
-                # Pega o link pré-assinado
-                url = presign_get(BUCKET_RAW, key)
-                
-                # Baixa a imagem de forma assíncrona
-                resp = await client.get(url, timeout=30.0)
-                resp.raise_for_status()  # Lança um erro para status
-                
-                # 2. Nome da imagem mais limpo dentro do zip
-                # Remove o timestamp e o UUID, mantendo o nome original do arquivo
-                original_filename = key.split("-", 2)[-1]
-                zip_file.writestr(original_filename, resp.content)
-                print(f"Adicionado ao ZIP: {original_filename}")
-
-            except httpx.HTTPStatusError as e:
-                print(f"Erro HTTP ao baixar {key}: {e.response.status_code}")
-            except Exception as e:
-                print(f"Erro ao processar a chave {key}: {e}")
-
-        # Cria as tarefas para baixar todas as imagens em paralelo
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            tasks = [download_and_add_to_zip(key, zf) for key in keys]
-            await asyncio.gather(*tasks)
-
-    # Verifica se o ZIP não está vazio
-    if not zip_buffer.getbuffer().nbytes:
-        print("Buffer do ZIP está vazio. Nenhuma imagem foi adicionada.")
-        return None
+                return original_filename, await storage_aio.get_bytes(bucket, key)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+                log.warning("Foto %s nao encontrada no storage; fora do zip", key)
+                return None
 
-    zip_buffer.seek(0)
-
-    # 3. Upload do zip no S3 com tratamento de erro
-    try:
-        s3.put_object(
-            Bucket=BUCKET_RAW,
-            Key=zip_key,
-            Body=zip_buffer.getvalue(),
-            ContentType='application/zip'
-        )
-        print(f"Upload do ZIP concluído para a chave: {zip_key}")
-    except ClientError as e:
-        print(f"Erro ao fazer upload do ZIP para o S3: {e}")
-        return None
+        try:
+            results = await gather_limited((_fetch(k) for k in keys), settings.TRANSFER_MAX_CONCURRENCY)
+        except Exception:
+            log.exception("Falha ao baixar as fotos do zip %s", zip_key)
+            return None
+
+        files = [r for r in results if r]
+        if not files:
+            log.warning("Nenhuma imagem foi adicionada ao zip %s", zip_key)
+            return None
+
+        loop = asyncio.get_running_loop()
+        with tracing.span("zip.compress"):
+            zip_bytes = await loop.run_in_executor(None, build_zip, files)
+        if span is not None:
+            span.set_attribute("zip.bytes", len(zip_bytes))
+
+        try:
+            await storage_aio.put_bytes(bucket, zip_key, zip_bytes, "application/zip")
+        except Exception:
+            log.exception("Erro ao fazer upload do zip %s", zip_key)
+            return None
 
     # Retornar link pré-assinado para o arquivo ZIP
-    return presign_get(BUCKET_RAW, zip_key, expires=3600)
\ No newline at end of file
+    return storage.presign_get(bucket, zip_key, expires=3600)
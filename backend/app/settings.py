@@ -1,10 +1,19 @@
 ﻿import os
 
+from dotenv import load_dotenv
+
+# .env carregado antes de ler qualquer setting (o banco lê DATABASE_URL sob demanda)
+load_dotenv()
+
 class Settings:
     # Ambiente
     APP_ENV = os.getenv("APP_ENV", "dev")
     PORT = int(os.getenv("PORT", "8080"))
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # por logger: "azure_blob=DEBUG,httpx=WARNING"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
 
     # Providers (qual servico usar)
     STORAGE_PROVIDER = os.getenv("STORAGE_PROVIDER", "azure")
@@ -21,12 +30,126 @@ class Settings:
     AZURE_FACE_KEY = os.getenv("AZURE_FACE_KEY", "")
     AZURE_FACELIST_PREFIX = os.getenv("AZURE_FACELIST_PREFIX", "evt-")
 
+    # Busca de faces
+    FACE_SEARCH_MAX_CANDIDATES = int(os.getenv("FACE_SEARCH_MAX_CANDIDATES", "100"))
+    FACE_SEARCH_MAX_FACES = int(os.getenv("FACE_SEARCH_MAX_FACES", "10"))
+    # Buscas multi-face atendidas ao mesmo tempo por worker (o pool de buscas
+    # tem FACE_SEARCH_MAX_FACES threads para cada uma)
+    FACE_SEARCH_MULTI_CONCURRENCY = int(os.getenv("FACE_SEARCH_MULTI_CONCURRENCY", "4"))
+
     # Azure Blob Storage
     AZURE_BLOB_CONNECTION_STRING = os.getenv("AZURE_BLOB_CONNECTION_STRING", "")
     AZURE_BLOB_ACCOUNT_NAME = os.getenv("AZURE_BLOB_ACCOUNT_NAME", "")
     AZURE_BLOB_ACCOUNT_KEY = os.getenv("AZURE_BLOB_ACCOUNT_KEY", "")
     AZURE_BLOB_CONTAINER = os.getenv("AZURE_BLOB_CONTAINER", "photo-find-raw")
 
+    # Pools do banco por classe de carga (por worker): write = sessoes das
+    # requisicoes (get_conn), read = rotas so de leitura (get_read_conn),
+    # jobs = tarefas em background
+    DB_POOL_WRITE_SIZE = int(os.getenv("DB_POOL_WRITE_SIZE", "15"))
+    DB_POOL_WRITE_OVERFLOW = int(os.getenv("DB_POOL_WRITE_OVERFLOW", "5"))
+    DB_POOL_READ_SIZE = int(os.getenv("DB_POOL_READ_SIZE", "15"))
+    DB_POOL_READ_OVERFLOW = int(os.getenv("DB_POOL_READ_OVERFLOW", "10"))
+    DB_POOL_JOBS_SIZE = int(os.getenv("DB_POOL_JOBS_SIZE", "2"))
+    DB_POOL_JOBS_OVERFLOW = int(os.getenv("DB_POOL_JOBS_OVERFLOW", "3"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Replicas de leitura (get_read_conn): URLs separadas por virgula, pool
+    # "read" em cada uma; replica com atraso acima do limite (ou fora do ar)
+    # sai da rotacao e a leitura vai ao primario
+    DATABASE_READ_URLS = os.getenv("DATABASE_READ_URLS", "")
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+    # Atras do PgBouncer (transaction pooling): sem cache de prepared statements
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+    # Pool de conexoes dos clientes assincronos de storage
+    STORAGE_MAX_CONNECTIONS = int(os.getenv("STORAGE_MAX_CONNECTIONS", "64"))
+    STORAGE_CONNECT_TIMEOUT = int(os.getenv("STORAGE_CONNECT_TIMEOUT", "10"))
+    STORAGE_READ_TIMEOUT = int(os.getenv("STORAGE_READ_TIMEOUT", "120"))
+    # Intervalo minimo entre novas validacoes (via /health) de containers que falharam
+    STORAGE_RECHECK_SECONDS = int(os.getenv("STORAGE_RECHECK_SECONDS", "30"))
+
+    # Transferencias grandes (upload em blocos / download em ranges paralelos)
+    TRANSFER_BLOCK_SIZE = int(os.getenv("TRANSFER_BLOCK_SIZE", str(8 * 1024 * 1024)))
+    TRANSFER_RANGE_SIZE = int(os.getenv("TRANSFER_RANGE_SIZE", str(4 * 1024 * 1024)))
+    TRANSFER_MAX_CONCURRENCY = int(os.getenv("TRANSFER_MAX_CONCURRENCY", "8"))
+    TRANSFER_SINGLE_PUT_THRESHOLD = int(os.getenv("TRANSFER_SINGLE_PUT_THRESHOLD", str(32 * 1024 * 1024)))
+    TRANSFER_VALIDATE_CONTENT = os.getenv("TRANSFER_VALIDATE_CONTENT", "true").lower() == "true"
+
+    # Renditions das fotos (thumb/web): formato webp ou jpeg, processos do pool e backfill
+    RENDITION_FORMAT = os.getenv("RENDITION_FORMAT", "webp")
+    RENDITION_WORKERS = int(os.getenv("RENDITION_WORKERS", "2"))
+    RENDITION_BACKFILL_SECONDS = int(os.getenv("RENDITION_BACKFILL_SECONDS", "300"))
+    RENDITION_BACKFILL_BATCH = int(os.getenv("RENDITION_BACKFILL_BATCH", "20"))
+
+    # Senhas (bcrypt): custo (log2 das rodadas; hashes com outro custo são
+    # refeitos no login), processos do pool e fila limitada por worker da API
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+    PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", "32"))
+    PASSWORD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_QUEUE_TIMEOUT_SECONDS", "3"))
+    PASSWORD_BULK_CHUNK = int(os.getenv("PASSWORD_BULK_CHUNK", "8"))
+    USERS_BULK_MAX = int(os.getenv("USERS_BULK_MAX", "500"))
+
+    # Fila das métricas de uso gravadas fora da requisição (track_nowait)
+    METRICS_QUEUE_SIZE = int(os.getenv("METRICS_QUEUE_SIZE", "10000"))
+    METRICS_BATCH_SIZE = int(os.getenv("METRICS_BATCH_SIZE", "500"))
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "0.5"))
+
+    # Resize sob demanda (/photos/{id}/render): cache LRU em disco
+    RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "/tmp/moments-render-cache")
+    RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    RENDER_MAX_DIMENSION = int(os.getenv("RENDER_MAX_DIMENSION", "2560"))
+    # Tempo em cache publico (CDN/proxy); limita quanto uma foto apagada segue servida
+    RENDER_CDN_MAX_AGE_SECONDS = int(os.getenv("RENDER_CDN_MAX_AGE_SECONDS", "300"))
+
+    # Cache HTTP das rotas de leitura (ETag/304); TTL 0 desabilita
+    HTTP_CACHE_TTL_SECONDS = int(os.getenv("HTTP_CACHE_TTL_SECONDS", "30"))
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "2048"))
+
+    # Pub/sub entre workers (LISTEN/NOTIFY) e feed SSE por evento
+    PUBSUB_CHANNEL = os.getenv("PUBSUB_CHANNEL", "moments_events")
+    PUBSUB_RECONNECT_SECONDS = int(os.getenv("PUBSUB_RECONNECT_SECONDS", "5"))
+    # LISTEN precisa de conexao direta com o Postgres (nao passa pelo PgBouncer em transaction mode)
+    PUBSUB_DATABASE_URL = os.getenv("PUBSUB_DATABASE_URL", "")
+    SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+    SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+
+    # Remocao em lote: acima deste numero de fotos roda em background
+    BULK_DELETE_SYNC_LIMIT = int(os.getenv("BULK_DELETE_SYNC_LIMIT", "200"))
+
+    # Retencao: expurgo agendado so com RETENTION_ENABLED (relatorio/dry-run sempre disponivel)
+    RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+    RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+    RETENTION_DEFAULT_DAYS = int(os.getenv("RETENTION_DEFAULT_DAYS", "10"))
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+    RETENTION_ZIP_HOURS = int(os.getenv("RETENTION_ZIP_HOURS", "24"))
+    RETENTION_SESSION_DAYS = int(os.getenv("RETENTION_SESSION_DAYS", "1"))
+    RETENTION_METRICS_DAYS = int(os.getenv("RETENTION_METRICS_DAYS", "0"))
+
+    # Metricas Prometheus: intervalo de amostragem das filas dos executors
+    INSTRUMENTATION_SAMPLE_SECONDS = int(os.getenv("INSTRUMENTATION_SAMPLE_SECONDS", "5"))
+
+    # Tracing (spans locais): exporta traces lentas/com erro + amostra TRACE_SAMPLE_RATE
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1000"))
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+    TRACE_ADAPTIVE_WINDOW = int(os.getenv("TRACE_ADAPTIVE_WINDOW", "256"))  # 0 desliga o limiar por rota
+    TRACE_ADAPTIVE_QUANTILE = float(os.getenv("TRACE_ADAPTIVE_QUANTILE", "0.99"))
+    TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+    TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")  # JSON lines; vazio = só memoria
+
+    # Profiler por amostragem (/admin/profile e header X-Profile)
+    PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_HZ = int(os.getenv("PROFILE_HZ", "100"))
+    PROFILE_REQUEST_HZ = int(os.getenv("PROFILE_REQUEST_HZ", "1000"))
+
+    # Catalogo de objetos (storage_objects): intervalo do reconciliador, 0 desabilita
+    STORAGE_CATALOG_RECONCILE_SECONDS = int(os.getenv("STORAGE_CATALOG_RECONCILE_SECONDS", "900"))
+
     # URLs Pre-assinadas
     PRESIGNED_EXPIRE_SECONDS = int(os.getenv("PRESIGNED_EXPIRE_SECONDS", "3600"))
 
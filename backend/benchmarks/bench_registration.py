@@ -0,0 +1,235 @@
+"""
+bench_registration.py - Cadastros simultâneos (convidados lendo o QR)
+
+Dispara --signups cadastros com --concurrency em paralelo sobre --emails
+e-mails distintos (cada e-mail cadastrado várias vezes ao mesmo tempo) e
+compara dois caminhos:
+- anterior: SELECT por e-mail, INSERT ... RETURNING, track (outro INSERT)
+  e commit;
+- upsert: services.users.create_or_get_user (SELECT do existente em
+  autocommit, sem bcrypt; e-mail novo: INSERT ... ON CONFLICT (email) DO
+  NOTHING RETURNING e commit, busca do existente no conflito, métrica na fila).
+
+Mede a latência dos cadastros em paralelo e, antes, as idas ao banco por
+cadastro (statements + commit/rollback) em cadastros sequenciais de usuário
+novo e de existente. A métrica da fila é gravada depois, em outra sessão,
+e não conta.
+
+Checagens do upsert (qualquer falha dá saída 1, para rodar no CI):
+- nenhum erro, um usuário e uma métrica "register" por e-mail e o mesmo
+  id em todas as respostas de um e-mail;
+- e-mail existente sem escrita e sem transação: só o SELECT;
+- e-mail novo com menos idas ao banco que o caminho anterior, e existente
+  com no máximo as mesmas.
+
+O custo do bcrypt é baixo por padrão (--rounds 4): o hash vai para o pool
+de processos nos dois caminhos e não é o que está sendo medido.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_registration [--signups 400] [--emails 100] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+from benchmarks import env
+
+env.prepare()
+
+from sqlalchemy import event, func, insert, select  # noqa: E402
+
+# Registra a tabela events no metadata (FK de metrics.event_slug)
+import app.schemas.event  # noqa: E402,F401
+from app.schemas.metrics import metrics_table  # noqa: E402
+from app.schemas.user import UserCreate, metadata, users_table  # noqa: E402
+from app.services import metrics as usage_metrics, passwords  # noqa: E402
+from app.services.db import async_session_maker, dispose_engine, get_engine  # noqa: E402
+from app.services.metrics import track  # noqa: E402
+from app.services.users import _user_values, create_or_get_user  # noqa: E402
+from app.settings import settings  # noqa: E402
+from benchmarks import stats  # noqa: E402
+
+# Statements, commits e rollbacks no engine (idas ao banco), só das tarefas
+# que estão medindo: o writer da fila de métricas (outra tarefa) não conta
+_round_trips = 0
+_counting: contextvars.ContextVar[bool] = contextvars.ContextVar("bench_counting", default=False)
+
+
+def _count(*_args, **_kwargs) -> None:
+    global _round_trips
+    if _counting.get():
+        _round_trips += 1
+
+
+def _count_end(conn, *_args, **_kwargs) -> None:
+    # Em AUTOCOMMIT o commit/rollback do SQLAlchemy não chega ao banco
+    if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        _count()
+
+
+async def legacy_create_or_get_user(conn, data: UserCreate):
+    """Caminho anterior do cadastro (sujeito a corrida entre o SELECT e o INSERT)."""
+    email = data.email.lower().strip()
+    result = await conn.execute(select(users_table).where(users_table.c.email == email))
+    existing = result.mappings().first()
+    if existing:
+        return existing
+
+    values = _user_values(data, email, await passwords.hash_password(data.password))
+    result = await conn.execute(insert(users_table).values(values).returning(users_table))
+    row = result.mappings().first()
+    await track(conn, action="register", user_id=str(row["id"]), event_slug=data.event_slug)
+    await conn.commit()
+    return row
+
+
+PATHS = {
+    "anterior": legacy_create_or_get_user,
+    "upsert": create_or_get_user,
+}
+
+
+def _user(email: str) -> UserCreate:
+    return UserCreate(name="Convidado", last_name="Bench", email=email, password="senha-do-qr")
+
+
+async def _sequential_round_trips(fn, prefix: str, count: int) -> tuple[float, float]:
+    """Idas ao banco por cadastro (média): usuário novo e mesmo e-mail de novo."""
+    per_phase = []
+    token = _counting.set(True)
+    try:
+        for _ in ("novo", "existente"):
+            before = _round_trips
+            for i in range(count):
+                async with async_session_maker() as session:
+                    await fn(session, _user(f"{prefix}-seq-{i}@example.com"))
+            per_phase.append((_round_trips - before) / count)
+    finally:
+        _counting.reset(token)
+    return per_phase[0], per_phase[1]
+
+
+async def _run_path(name: str, fn, args: argparse.Namespace) -> dict:
+    prefix = f"bench-{name}-{uuid.uuid4().hex[:8]}"
+    trips_new, trips_existing = await _sequential_round_trips(fn, prefix, args.sequential)
+
+    emails = [f"{prefix}-{i % args.emails}@example.com" for i in range(args.signups)]
+    random.Random(args.seed).shuffle(emails)
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def _signup(email: str) -> dict:
+        async with limit:
+            started = time.perf_counter()
+            try:
+                async with async_session_maker() as session:
+                    row = await fn(session, _user(email))
+            except Exception as e:
+                return {"email": email, "error": type(e).__name__}
+            return {"email": email, "id": row["id"], "ms": (time.perf_counter() - started) * 1000}
+
+    results = await asyncio.gather(*(_signup(email) for email in emails))
+    # Fila de métricas gravada antes das contagens
+    await usage_metrics.shutdown()
+    await usage_metrics.startup()
+
+    async with async_session_maker() as session:
+        users = (await session.execute(
+            select(users_table.c.id)
+            .where(users_table.c.email.like(f"{prefix}-%"), users_table.c.email.notlike(f"{prefix}-seq-%"))
+        )).scalars().all()
+        registered = (await session.execute(
+            select(func.count()).select_from(metrics_table)
+            .where(metrics_table.c.type == "register", metrics_table.c.user_id.in_(users))
+        )).scalar()
+
+    ok = [r for r in results if "error" not in r]
+    ids: dict[str, set] = {}
+    for r in ok:
+        ids.setdefault(r["email"], set()).add(r["id"])
+    latencies = sorted(r["ms"] for r in ok)
+    return {
+        "errors": dict(Counter(r["error"] for r in results if "error" in r)),
+        "users": len(users),
+        "register_metrics": registered,
+        "inconsistent_emails": sum(1 for v in ids.values() if len(v) > 1),
+        "round_trips_new": trips_new,
+        "round_trips_existing": trips_existing,
+        "p50_ms": stats.percentile(latencies, 50) if latencies else 0.0,
+        "p95_ms": stats.percentile(latencies, 95) if latencies else 0.0,
+    }
+
+
+async def _main(args: argparse.Namespace) -> int:
+    settings.PASSWORD_BCRYPT_ROUNDS = args.rounds
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    for name in ("commit", "rollback"):
+        event.listen(engine.sync_engine, name, _count_end)
+    await usage_metrics.startup()
+
+    failed = False
+    results = {}
+    print(f"{args.signups} cadastros, {args.emails} e-mails, concorrência {args.concurrency}")
+    print(f"{'caminho':<10}{'erros':>8}{'usuarios':>10}{'metricas':>10}{'idas novo':>11}{'idas exist.':>12}{'p50 ms':>9}{'p95 ms':>9}")
+    try:
+        for name, fn in PATHS.items():
+            r = results[name] = await _run_path(name, fn, args)
+            errors = sum(r["errors"].values())
+            print(
+                f"{name:<10}{errors:>8}{r['users']:>10}{r['register_metrics']:>10}"
+                f"{r['round_trips_new']:>11.1f}{r['round_trips_existing']:>12.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+                + (f"  {r['errors']}" if errors else "")
+            )
+            correct = (
+                not errors and r["users"] == args.emails
+                and r["register_metrics"] == args.emails and not r["inconsistent_emails"]
+            )
+            if name == "upsert" and not correct:
+                print(f"ERRO: cadastro concorrente incorreto no caminho upsert: {r}")
+                failed = True
+
+        upsert, legacy = results["upsert"], results["anterior"]
+        if upsert["round_trips_existing"] > 1:
+            print(f"ERRO: e-mail existente deveria custar 1 ida ao banco, custou {upsert['round_trips_existing']:.1f}")
+            failed = True
+        if upsert["round_trips_new"] >= legacy["round_trips_new"]:
+            print(
+                "ERRO: cadastro novo no upsert deveria ter menos idas ao banco que o caminho anterior: "
+                f"{upsert['round_trips_new']:.1f} >= {legacy['round_trips_new']:.1f}"
+            )
+            failed = True
+        if upsert["round_trips_existing"] > legacy["round_trips_existing"]:
+            print(
+                "ERRO: e-mail existente no upsert com mais idas ao banco que o caminho anterior: "
+                f"{upsert['round_trips_existing']:.1f} > {legacy['round_trips_existing']:.1f}"
+            )
+            failed = True
+    finally:
+        await usage_metrics.shutdown()
+        passwords.shutdown()
+        await dispose_engine()
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=400)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sequential", type=int, default=20, help="cadastros sequenciais para contar as idas ao banco")
+    parser.add_argument("--rounds", type=int, default=4, help="custo do bcrypt")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
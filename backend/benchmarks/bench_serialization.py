@@ -0,0 +1,116 @@
+"""
+bench_serialization.py - Serialização de uma galeria de 10k fotos
+
+Compara o caminho antigo das listagens (dict por linha + validação
+Pydantic do response_model + json.dumps do JSONResponse) com o caminho
+rápido de app.responses.rows_to_json (orjson direto das linhas).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.responses import ORJSONResponse, rows_to_json
+from app.schemas.photo import PhotoResponse
+
+PhotoRow = namedtuple(
+    "PhotoRow", "id uploader_id event_slug s3_key status created_at thumb_key web_key"
+)
+SIGNED = "https://acct.blob.core.windows.net/photo-find-raw/{key}?se=2026-01-01T00%3A00%3A00Z&sp=r&sv=2024-05-04&sr=b&sig=abc"
+
+
+def make_rows(n: int) -> list[PhotoRow]:
+    base = datetime(2025, 3, 1, 18, 0, 0)
+    rows = []
+    for i in range(n):
+        photo_id = uuid.uuid4()
+        key = f"evento/photos/{1700000000 + i}-{photo_id.hex}-IMG_{i:05d}.jpg"
+        rows.append(PhotoRow(
+            photo_id, uuid.uuid4(), "evento", key, "active", base + timedelta(seconds=i),
+            f"evento/renditions/{photo_id}/thumb.webp", f"evento/renditions/{photo_id}/web.webp",
+        ))
+    return rows
+
+
+def _urls(p: dict) -> dict:
+    urls = {
+        "s3_url": SIGNED.format(key=p["s3_key"]),
+        "thumb_url": SIGNED.format(key=p["thumb_key"]),
+        "web_url": SIGNED.format(key=p["web_key"]),
+    }
+    del p["thumb_key"], p["web_key"]
+    return urls
+
+
+_adapter = TypeAdapter(List[PhotoResponse])
+
+
+def old_path(rows) -> bytes:
+    # dict(row._mapping) + response_model (validação e dump) + JSONResponse
+    items = []
+    for row in rows:
+        p = row._asdict()
+        p.update(_urls(p))
+        items.append(p)
+    content = _adapter.dump_python(_adapter.validate_python(items), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def orjson_response_path(rows) -> bytes:
+    # Mesmo response_model, mas renderizado pelo ORJSONResponse (padrão da app)
+    items = []
+    for row in rows:
+        p = row._asdict()
+        p.update(_urls(p))
+        items.append(p)
+    content = _adapter.dump_python(_adapter.validate_python(items), mode="json")
+    return ORJSONResponse(content).body
+
+
+def fast_path(rows) -> bytes:
+    return rows_to_json(rows, extra=_urls)
+
+
+def bench(fn, rows, repeat: int) -> list[float]:
+    fn(rows)  # aquecimento
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    # Os caminhos precisam produzir o mesmo JSON
+    assert json.loads(old_path(rows)) == json.loads(fast_path(rows))
+
+    print(f"Galeria com {args.rows} fotos, {args.repeat} repeticoes (ms)")
+    print(f"{'caminho':<28}{'mediana':>10}{'p95':>10}{'min':>10}")
+    results = {}
+    for name, fn in [("dict+pydantic+json", old_path), ("dict+pydantic+orjson", orjson_response_path), ("rows_to_json (orjson)", fast_path)]:
+        times = sorted(bench(fn, rows, args.repeat))
+        results[name] = statistics.median(times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{name:<28}{results[name]:>10.1f}{p95:>10.1f}{times[0]:>10.1f}")
+    print(f"speedup rows_to_json vs antigo: {results['dict+pydantic+json'] / results['rows_to_json (orjson)']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
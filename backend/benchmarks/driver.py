@@ -0,0 +1,118 @@
+"""
+driver.py - Execução de um cenário em loop fechado
+
+`concurrency` clientes disparam requisições em sequência até completar
+`requests` (depois de `warmup` requisições não medidas). Durante o
+cenário um amostrador registra o RSS para o pico de memória:
+- in-process: RSS deste processo (/proc/self/statm);
+- servidor remoto: process_resident_memory_bytes do /metrics (um worker).
+"""
+
+import asyncio
+import itertools
+import os
+import resource
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from benchmarks import stats
+from benchmarks.scenarios import Context, Scenario
+
+SAMPLE_INTERVAL = 0.05
+REMOTE_SAMPLE_INTERVAL = 0.5
+
+
+def _local_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Sem /proc (macOS): pico do processo inteiro (ru_maxrss em bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class MemorySampler:
+    """Pico de RSS durante o cenário (amostragem periódica)."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client  # None = mede este processo
+        self.start_mb: Optional[float] = None
+        self.peak_mb: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> Optional[float]:
+        if self.client is None:
+            return _local_rss_mb()
+        try:
+            resp = await self.client.get("/metrics/")
+            for line in resp.text.splitlines():
+                if line.startswith("process_resident_memory_bytes"):
+                    return float(line.split()[-1]) / 2**20
+        except httpx.HTTPError:
+            pass
+        return None
+
+    async def _loop(self) -> None:
+        interval = SAMPLE_INTERVAL if self.client is None else REMOTE_SAMPLE_INTERVAL
+        while True:
+            value = await self._sample()
+            if value is not None:
+                self.peak_mb = max(self.peak_mb or 0.0, value)
+            await asyncio.sleep(interval)
+
+    async def __aenter__(self):
+        self.start_mb = await self._sample()
+        self.peak_mb = self.start_mb
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        value = await self._sample()
+        if value is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, value)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+async def run_scenario(
+    scenario: Scenario,
+    client: httpx.AsyncClient,
+    ctx: Context,
+    requests: int,
+    concurrency: int,
+    warmup: int = 0,
+    memory_client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    for i in range(warmup):
+        await scenario(client, ctx, i)
+
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    counter = itertools.count(warmup)
+    last = warmup + requests
+
+    async def _worker():
+        while (i := next(counter)) < last:
+            started = time.perf_counter()
+            try:
+                status = str(await scenario(client, ctx, i))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    async with MemorySampler(memory_client) as memory:
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return stats.summarize(latencies, statuses, elapsed, _round(memory.start_mb), _round(memory.peak_mb))
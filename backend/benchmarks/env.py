@@ -0,0 +1,107 @@
+"""
+env.py - Ambiente isolado dos benchmarks
+
+Precisa rodar antes de qualquer import de `app` (settings lê o
+ambiente no import):
+- o banco vem de BENCH_DATABASE_URL (nunca do DATABASE_URL do .env, para
+  não apontar o seed para produção); sem ele, SQLite em BENCH_ROOT;
+- storage e faces são os fakes de benchmarks/fakes.py;
+- jobs periódicos desligados (não competem com a carga medida).
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+ROOT = Path(os.getenv("BENCH_ROOT", os.path.join(tempfile.gettempdir(), "moments-bench")))
+
+_DEFAULTS = {
+    "SECRET_KEY": "bench-secret",
+    "STORAGE_PROVIDER": "azure",
+    "FACE_PROVIDER": "azure",
+    "AWS_REGION": "us-east-1",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AZURE_BLOB_CONNECTION_STRING": "DefaultEndpointsProtocol=https;AccountName=bench;AccountKey=YmVuY2g=;EndpointSuffix=core.windows.net",
+    "STORAGE_CATALOG_RECONCILE_SECONDS": "0",
+    "RENDITION_BACKFILL_SECONDS": "0",
+    "RETENTION_ENABLED": "false",
+}
+
+
+def database_url() -> str:
+    # timeout: escritas concorrentes esperam o lock do arquivo em vez de falhar
+    # com "database is locked" (o SQLite serializa os writers)
+    return os.getenv("BENCH_DATABASE_URL") or f"sqlite+aiosqlite:///{ROOT / 'bench.db'}?timeout=30"
+
+
+_prepared = False
+
+
+def prepare() -> Path:
+    """Configura o ambiente do processo para os benchmarks. Retorna o diretório de trabalho."""
+    global _prepared
+    if _prepared:
+        return ROOT
+    _prepared = True
+    ROOT.mkdir(parents=True, exist_ok=True)
+    os.environ["DATABASE_URL"] = database_url()
+    os.environ.setdefault("RENDER_CACHE_DIR", str(ROOT / "render-cache"))
+    for name, value in _DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
+    if is_sqlite():
+        _sqlite_compat()
+    return ROOT
+
+
+def is_sqlite() -> bool:
+    return database_url().startswith("sqlite")
+
+
+def _sqlite_compat() -> None:
+    """
+    Diferenças do Postgres que a aplicação assume:
+    - JSONB não existe no SQLite: a coluna é criada como JSON;
+    - ARRAY também não: vira JSON, com a lista serializada no bind;
+    - o asyncpg aceita str em colunas UUID; o bind do SQLite exige uuid.UUID.
+    """
+    import json
+    import uuid
+
+    from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.sql import sqltypes
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    @compiles(ARRAY, "sqlite")
+    def _array_sqlite(type_, compiler, **kw):
+        return "JSON"
+
+    array_bind_processor = ARRAY.bind_processor
+    array_result_processor = ARRAY.result_processor
+
+    def _array_bind(self, dialect):
+        if dialect.name != "sqlite":
+            return array_bind_processor(self, dialect)
+        return lambda value: None if value is None else json.dumps(list(value))
+
+    def _array_result(self, dialect, coltype):
+        if dialect.name != "sqlite":
+            return array_result_processor(self, dialect, coltype)
+        return lambda value: None if value is None else json.loads(value)
+
+    ARRAY.bind_processor = _array_bind
+    ARRAY.result_processor = _array_result
+
+    bind_processor = sqltypes.Uuid.bind_processor
+
+    def _uuid_bind_processor(self, dialect):
+        process = bind_processor(self, dialect)
+        if process is None or dialect.name != "sqlite":
+            return process
+        return lambda value: process(uuid.UUID(value) if isinstance(value, str) else value)
+
+    sqltypes.Uuid.bind_processor = _uuid_bind_processor
@@ -0,0 +1,381 @@
+"""
+fakes.py - Substitutos locais dos providers de storage e de faces
+
+- LocalBlobStore / AsyncLocalBlobStore: Blob/S3 em disco (um diretório por
+  container), com a mesma interface dos módulos azure_blob/s3 e
+  azure_blob_aio/s3_aio usados por storage.py e storage_aio.py.
+- FakeFaceProvider: provider de faces determinístico. Cada foto indexada
+  pertence a uma "pessoa" (crc32 do ExternalImageId) e a selfie busca as
+  fotos da pessoa dela (crc32 dos bytes). Latência, erros e throttling
+  (429) configuráveis.
+
+install() troca o _get_impl() de storage, storage_aio e face pelos fakes;
+nada do código da aplicação muda.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+BUCKET_RAW = "photo-find-raw"
+_SIGNING_KEY = b"bench-signing-key"
+
+
+@dataclass
+class FaceProfile:
+    latency_ms: float = 80.0     # latência média de cada chamada ao provider
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0      # fração de chamadas com erro 500
+    throttle_rate: float = 0.0   # fração de chamadas com 429 (ThrottlingException)
+    people: int = 200            # pessoas distintas no evento
+    seed: int = 42
+
+
+@dataclass
+class StorageProfile:
+    latency_ms: float = 5.0
+    jitter_ms: float = 2.0
+    seed: int = 42
+
+
+class _Latency:
+    """Sorteios de latência/falha reproduzíveis (mesma seed, mesma sequência)."""
+
+    def __init__(self, mean_ms: float, jitter_ms: float, seed: int):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple[float, float]:
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.mean_ms, self.jitter_ms)) / 1000
+            return delay, self._rng.random()
+
+
+# ============================================================
+# STORAGE
+# ============================================================
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class LocalBlobStore:
+    """Interface síncrona de azure_blob/s3 sobre o sistema de arquivos."""
+
+    BUCKET_RAW = BUCKET_RAW
+
+    def __init__(self, root: Path, profile: StorageProfile = StorageProfile()):
+        self.root = Path(root)
+        self.latency = _Latency(profile.latency_ms, profile.jitter_ms, profile.seed)
+        self.CONTAINER_STATUS: dict[str, dict] = {}
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return self.root / bucket / key
+
+    def _wait(self) -> None:
+        delay, _ = self.latency.draw()
+        if delay:
+            time.sleep(delay)
+
+    def ensure_containers(self, containers: list[str]) -> dict[str, dict]:
+        for container in containers:
+            (self.root / container).mkdir(parents=True, exist_ok=True)
+            self.CONTAINER_STATUS[container] = {"ok": True, "created": False, "error": None}
+        return dict(self.CONTAINER_STATUS)
+
+    def put_bytes(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        self._wait()
+        _write_atomic(self._path(bucket, key), data)
+
+    def get_bytes(self, bucket: str, key: str) -> bytes:
+        self._wait()
+        try:
+            return self._path(bucket, key).read_bytes()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Arquivo nao encontrado: {key}")
+
+    get_blob_bytes = get_bytes
+
+    def presign_get(self, bucket: str, key: str, expires: int = 3600) -> str:
+        # HMAC como no SAS/SigV4: o custo de assinar entra na medição
+        expiry = int(time.time()) + expires
+        sig = hmac.new(_SIGNING_KEY, f"{bucket}/{key}\n{expiry}".encode(), hashlib.sha256).hexdigest()
+        return f"http://storage.bench.local/{bucket}/{key}?se={expiry}&sig={sig}"
+
+    def presign_put(self, bucket: str, key: str, content_type: str, expires: int = 3600) -> str:
+        return self.presign_get(bucket, key, expires) + "&sp=w"
+
+    def make_object_key(self, event_slug: str, original_name: str) -> str:
+        return f"{event_slug}/{int(time.time())}-{original_name}"
+
+    def guess_ext(self, content_type: str) -> str:
+        return {"image/png": ".png", "video/mp4": ".mp4"}.get(content_type, ".jpg")
+
+    def list_keys_in_prefix(self, bucket: str, prefix: str) -> list[str]:
+        base = self.root / bucket
+        if not base.exists():
+            return []
+        keys = (p.relative_to(base).as_posix() for p in base.rglob("*") if p.is_file())
+        return sorted(k for k in keys if k.startswith(prefix) and not k.rsplit("/", 1)[-1].startswith("."))
+
+    async def list_s3_files(self, prefix: str, bucket: str = None) -> list[dict]:
+        bucket = bucket or self.BUCKET_RAW
+        return [{"key": k, "url": self.presign_get(bucket, k)} for k in self.list_keys_in_prefix(bucket, prefix)]
+
+    def delete_object(self, bucket: str, key: str) -> None:
+        self._wait()
+        self._path(bucket, key).unlink(missing_ok=True)
+
+
+class AsyncLocalBlobStore:
+    """Interface de azure_blob_aio/s3_aio: I/O de disco em thread, latência com asyncio.sleep."""
+
+    def __init__(self, store: LocalBlobStore, profile: StorageProfile = StorageProfile()):
+        self.store = store
+        self.latency = _Latency(profile.latency_ms, profile.jitter_ms, profile.seed + 1)
+
+    async def _wait(self) -> None:
+        delay, _ = self.latency.draw()
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def startup(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def put_bytes(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        await self._wait()
+        await asyncio.to_thread(_write_atomic, self.store._path(bucket, key), data)
+
+    async def put_stream(self, bucket, key, source, content_type="application/octet-stream", length=None):
+        from app.services.transfer import DEFAULT_CONFIG, iter_blocks
+        chunks = [block async for block in iter_blocks(source, DEFAULT_CONFIG.block_size)]
+        await self.put_bytes(bucket, key, b"".join(chunks), content_type)
+
+    async def get_bytes(self, bucket: str, key: str) -> bytes:
+        await self._wait()
+        try:
+            return await asyncio.to_thread(self.store._path(bucket, key).read_bytes)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Arquivo nao encontrado: {key}")
+
+    async def list_keys_in_prefix(self, bucket: str, prefix: str) -> list[str]:
+        await self._wait()
+        return await asyncio.to_thread(self.store.list_keys_in_prefix, bucket, prefix)
+
+    async def delete_object(self, bucket: str, key: str) -> None:
+        await self._wait()
+        self.store._path(bucket, key).unlink(missing_ok=True)
+
+    async def delete_objects(self, bucket: str, keys: list[str]) -> list[str]:
+        await self._wait()
+        for key in keys:
+            self.store._path(bucket, key).unlink(missing_ok=True)
+        return []
+
+
+# ============================================================
+# FACES
+# ============================================================
+
+def _throttled() -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"},
+         "ResponseMetadata": {"HTTPStatusCode": 429}},
+        "SearchFacesByImage",
+    )
+
+
+class FakeFaceProvider:
+    """Interface de rekognition/azure_face com resultados determinísticos."""
+
+    def __init__(self, profile: FaceProfile = FaceProfile()):
+        self.profile = profile
+        self.latency = _Latency(profile.latency_ms, profile.jitter_ms, profile.seed)
+        # evento -> pessoa -> ExternalImageIds
+        self._index: dict[str, dict[int, list[str]]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _call(self) -> None:
+        """Latência + falhas sorteadas, como uma chamada HTTP ao provider."""
+        delay, roll = self.latency.draw()
+        self.calls += 1
+        if delay:
+            time.sleep(delay)
+        if roll < self.profile.throttle_rate:
+            raise _throttled()
+        if roll < self.profile.throttle_rate + self.profile.error_rate:
+            raise RuntimeError("Falha simulada no provider de faces")
+
+    @staticmethod
+    def sanitize_key_for_rekognition(s: str) -> str:
+        return re.sub(r"[^a-zA-Z0-9_.:-]", "_", s)[:100]
+
+    def _person(self, value: bytes) -> int:
+        return zlib.crc32(value) % self.profile.people
+
+    # --- collections ---
+    def collection_id_for(self, event_slug: str) -> str:
+        return f"evt-{event_slug}"
+
+    def ensure_collection(self, event_slug: str) -> str:
+        with self._lock:
+            self._index.setdefault(event_slug, {})
+        return self.collection_id_for(event_slug)
+
+    def drop_collection(self, event_slug: str) -> bool:
+        with self._lock:
+            return self._index.pop(event_slug, None) is not None
+
+    def delete_faces(self, event_slug: str, should_delete) -> int:
+        removed = 0
+        with self._lock:
+            for ids in self._index.get(event_slug, {}).values():
+                keep = [ext for ext in ids if not should_delete(ext)]
+                removed += len(ids) - len(keep)
+                ids[:] = keep
+        return removed
+
+    def delete_face_ids(self, event_slug: str, face_ids: list[str]) -> int:
+        # FaceId == ExternalImageId nos fakes
+        wanted = set(face_ids)
+        return self.delete_faces(event_slug, lambda ext: ext in wanted)
+
+    # --- indexação ---
+    @staticmethod
+    def face_ids_of(index_result: dict) -> list[str]:
+        return [record["Face"]["FaceId"] for record in (index_result or {}).get("FaceRecords", [])]
+
+    def add_faces(self, event_slug: str, external_ids: list[str]) -> None:
+        """Popula o índice sem latência (seed do dataset)."""
+        with self._lock:
+            people = self._index.setdefault(event_slug, {})
+            for ext in external_ids:
+                people.setdefault(self._person(ext.encode()), []).append(ext)
+
+    def index_s3_object(self, event_slug: str, bucket: str, file_key: str, external_image_id: str = None) -> dict:
+        self._call()
+        ext = external_image_id or file_key
+        self.add_faces(event_slug, [ext])
+        return {"FaceRecords": [{"Face": {"FaceId": ext, "ExternalImageId": ext}}]}
+
+    def reindex_all(self, event_slug: str, bucket: str, keys: list[str]):
+        for key in keys:
+            self.index_s3_object(event_slug, bucket, key)
+
+    # --- busca ---
+    def _matches(self, event_slug: str, person: int, salt: bytes, max_faces: int, threshold: int) -> list[dict]:
+        with self._lock:
+            ids = list(self._index.get(event_slug, {}).get(person, ()))
+        matches = []
+        for ext in ids:
+            similarity = 70 + zlib.crc32(salt + ext.encode()) % 3000 / 100
+            if similarity >= threshold:
+                matches.append({"Similarity": similarity, "Face": {"FaceId": ext, "ExternalImageId": ext}})
+        matches.sort(key=lambda m: m["Similarity"], reverse=True)
+        return matches[:max_faces]
+
+    def search_by_image_bytes(self, event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75) -> dict:
+        self._call()
+        return {"FaceMatches": self._matches(event_slug, self._person(data), data[:64], max_faces, threshold)}
+
+    def search_faces_in_image(self, event_slug: str, data: bytes, max_faces: int = 50, threshold: int = 75,
+                              max_detected: int = 10) -> list[dict]:
+        self._call()
+        base = self._person(data)
+        detected = min(max_detected, 1 + zlib.crc32(data[-64:]) % 3)
+        groups = []
+        for index in range(detected):
+            self._call()
+            person = (base + index) % self.profile.people
+            groups.append({
+                "FaceIndex": index,
+                "BoundingBox": {"Left": 0.1 * index, "Top": 0.1, "Width": 0.2, "Height": 0.3},
+                "FaceMatches": self._matches(event_slug, person, data[:64], max_faces, threshold),
+            })
+        return groups
+
+
+# ============================================================
+# INSTALAÇÃO
+# ============================================================
+
+@dataclass
+class Fakes:
+    store: LocalBlobStore
+    store_aio: AsyncLocalBlobStore
+    face: FakeFaceProvider
+
+
+def install(root: Path, face_profile: FaceProfile = FaceProfile(),
+            storage_profile: StorageProfile = StorageProfile()) -> Fakes:
+    """Aponta storage, storage_aio e face para os fakes (antes de subir a app)."""
+    from app.services import face, storage, storage_aio
+
+    store = LocalBlobStore(root, storage_profile)
+    store.ensure_containers([BUCKET_RAW])
+    fakes = Fakes(store, AsyncLocalBlobStore(store, storage_profile), FakeFaceProvider(face_profile))
+    storage._get_impl = lambda: fakes.store
+    storage_aio._get_impl = lambda: fakes.store_aio
+    face._get_impl = lambda: fakes.face
+    return fakes
+
+
+
+# ============================================================
+# CONFIGURAÇÃO (CLI -> ambiente -> perfis)
+# ============================================================
+# Via ambiente para valer também nos workers do uvicorn (benchmarks.serve)
+_PROFILE_ENV = {
+    "face_latency_ms": ("BENCH_FACE_LATENCY_MS", FaceProfile.latency_ms),
+    "face_jitter_ms": ("BENCH_FACE_JITTER_MS", FaceProfile.jitter_ms),
+    "face_error_rate": ("BENCH_FACE_ERROR_RATE", FaceProfile.error_rate),
+    "face_throttle_rate": ("BENCH_FACE_THROTTLE_RATE", FaceProfile.throttle_rate),
+    "storage_latency_ms": ("BENCH_STORAGE_LATENCY_MS", StorageProfile.latency_ms),
+}
+
+
+def add_arguments(parser) -> None:
+    for name, (_, default) in _PROFILE_ENV.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+
+
+def export_arguments(args) -> None:
+    for name, (var, _) in _PROFILE_ENV.items():
+        os.environ[var] = str(getattr(args, name))
+
+
+def describe_profiles() -> dict:
+    return {name: float(os.getenv(var, default)) for name, (var, default) in _PROFILE_ENV.items()}
+
+
+def profiles_from_env() -> tuple[FaceProfile, StorageProfile]:
+    values = describe_profiles()
+    face_profile = FaceProfile(
+        latency_ms=values["face_latency_ms"],
+        jitter_ms=values["face_jitter_ms"],
+        error_rate=values["face_error_rate"],
+        throttle_rate=values["face_throttle_rate"],
+    )
+    storage_profile = StorageProfile(latency_ms=values["storage_latency_ms"])
+    return face_profile, storage_profile
+
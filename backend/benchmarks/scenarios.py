@@ -0,0 +1,152 @@
+"""
+scenarios.py - Cenários de carga dos caminhos quentes da API
+
+Cada cenário é uma corrotina (client, ctx, i) -> status HTTP que faz uma
+requisição; `i` é o número da requisição (escolhe evento, selfie, página
+de forma determinística).
+
+- search / search_multi: POST /search/{slug} com selfie (face fake)
+- upload: POST /uploads/{slug}/photos com um lote de JPEGs (storage e
+  face fakes, renditions reais no pool de processos)
+- photos: GET /photos/{slug} (lista inteira do evento)
+- gallery: GET /gallery/{slug}/general paginado
+- metrics_list / metrics_write: GET e POST /admin/metrics/
+"""
+
+import io
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+from PIL import Image
+
+from app.schemas.user import UserRole
+from app.security.jwt import create_access_token
+
+from benchmarks.seed import Dataset
+
+
+@dataclass
+class Context:
+    dataset: Dataset
+    upload_batch: int = 5
+    tokens: dict[str, str] = field(default_factory=dict)
+    selfies: list[bytes] = field(default_factory=list)
+    photos: list[bytes] = field(default_factory=list)
+    gallery_pages: int = 5
+
+    def slug(self, i: int) -> str:
+        return self.dataset.slugs[i % len(self.dataset.slugs)]
+
+    def auth(self, role: UserRole = UserRole.USER) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[role.value]}"}
+
+
+def _jpeg(width: int, height: int, rng: random.Random, quality: int = 85) -> bytes:
+    """JPEG com ruído (comprime como foto real, não como cor sólida)."""
+    noise = Image.effect_noise((width, height), rng.uniform(30, 80))
+    tint = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    image = Image.blend(tint, noise.convert("RGB"), 0.6)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def build_context(dataset: Dataset, upload_batch: int = 5, upload_size: tuple[int, int] = (2000, 1333),
+                  seed: int = 42) -> Context:
+    rng = random.Random(seed)
+    ctx = Context(dataset=dataset, upload_batch=upload_batch)
+    for role, user_id in dataset.users.items():
+        ctx.tokens[role], _ = create_access_token({"sub": str(user_id), "role": role}, jti=uuid.uuid4().hex)
+    ctx.selfies = [_jpeg(640, 640, rng) for _ in range(16)]
+    ctx.photos = [_jpeg(*upload_size, rng) for _ in range(max(upload_batch, 4))]
+    return ctx
+
+
+# ============================================================
+# CENÁRIOS
+# ============================================================
+
+async def search(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    selfie = ctx.selfies[i % len(ctx.selfies)]
+    resp = await client.post(
+        f"/search/{ctx.slug(i)}",
+        files={"selfie": ("selfie.jpg", selfie, "image/jpeg")},
+        headers=ctx.auth(),
+    )
+    return resp.status_code
+
+
+async def search_multi(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    selfie = ctx.selfies[i % len(ctx.selfies)]
+    resp = await client.post(
+        f"/search/{ctx.slug(i)}",
+        params={"multi_face": "true", "ranking": "combined"},
+        files={"selfie": ("selfie.jpg", selfie, "image/jpeg")},
+        headers=ctx.auth(),
+    )
+    return resp.status_code
+
+
+async def upload(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    files = [
+        ("files", (f"IMG_{i:05d}_{n}.jpg", ctx.photos[(i + n) % len(ctx.photos)], "image/jpeg"))
+        for n in range(ctx.upload_batch)
+    ]
+    resp = await client.post(
+        f"/uploads/{ctx.slug(i)}/photos",
+        params={"uploader_id": str(ctx.dataset.users[UserRole.PHOTOGRAPHER.value])},
+        files=files,
+    )
+    return resp.status_code
+
+
+async def photos(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    resp = await client.get(f"/photos/{ctx.slug(i)}")
+    return resp.status_code
+
+
+async def gallery(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    resp = await client.get(
+        f"/gallery/{ctx.slug(i)}/general",
+        params={"limit": 100, "offset": 100 * (i % ctx.gallery_pages)},
+    )
+    return resp.status_code
+
+
+async def metrics_list(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    resp = await client.get(
+        "/admin/metrics/",
+        params={"event_slug": ctx.slug(i), "limit": 100, "offset": 100 * (i % 3)},
+        headers=ctx.auth(UserRole.ADMIN),
+    )
+    return resp.status_code
+
+
+async def metrics_write(client: httpx.AsyncClient, ctx: Context, i: int) -> int:
+    resp = await client.post(
+        "/admin/metrics/",
+        json={
+            "user_id": str(ctx.dataset.users[UserRole.USER.value]),
+            "event_slug": ctx.slug(i),
+            "type": "view_photo",
+            "data": {"bench": i},
+        },
+    )
+    return resp.status_code
+
+
+Scenario = Callable[[httpx.AsyncClient, Context, int], Awaitable[int]]
+
+# Ordem de execução: leituras primeiro, upload por último (altera as listas)
+SCENARIOS: dict[str, Scenario] = {
+    "photos": photos,
+    "gallery": gallery,
+    "metrics_list": metrics_list,
+    "metrics_write": metrics_write,
+    "search": search,
+    "search_multi": search_multi,
+    "upload": upload,
+}
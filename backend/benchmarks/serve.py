@@ -0,0 +1,51 @@
+"""
+serve.py - API real (uvicorn) com storage e faces fakes
+
+Para medir com workers e rede de verdade (benchmarks.run --url). O banco
+precisa estar semeado antes (python -m benchmarks.seed); cada worker
+carrega as faces das fotos no provider fake no startup.
+
+Uso (a partir de backend/):
+    python -m benchmarks.serve [--port 8090] [--workers 2] [--face-latency-ms 120]
+"""
+
+import argparse
+import os
+
+from benchmarks import env
+
+env.prepare()
+
+from app import main as app_main  # noqa: E402
+from app.services.db import async_session_maker  # noqa: E402
+
+from benchmarks import fakes, seed as seeding  # noqa: E402
+
+_fakes = fakes.install(env.ROOT / "storage", *fakes.profiles_from_env())
+
+
+async def _warm_fake_faces():
+    async with async_session_maker() as session:
+        await seeding.warm_faces(session, _fakes.face)
+
+
+app_main.resources.add("bench_faces", _warm_fake_faces, stage=1)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--no-http-cache", action="store_true")
+    fakes.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Os workers reimportam este módulo (que instala os fakes) e servem a app
+    # de app.main; a configuração segue pelo ambiente
+    fakes.export_arguments(args)
+    if args.no_http_cache:
+        os.environ["HTTP_CACHE_TTL_SECONDS"] = "0"
+    uvicorn.run("benchmarks.serve:app_main.app", host=args.host, port=args.port, workers=args.workers)
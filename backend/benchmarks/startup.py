@@ -0,0 +1,192 @@
+"""
+startup.py - Tempo de partida de um worker (cold start)
+
+Cada rodada é um processo Python novo (como um worker recém-escalado),
+que mede:
+- import_ms: `import app.main` (módulos, rotas, middlewares);
+- startup_ms: lifespan da app (registro de recursos), com o tempo de cada
+  recurso em `resources`;
+- first_request_ms: primeira requisição (--path), que paga o que ficou
+  para o primeiro uso (conexão do banco, caches);
+- ready_ms: do spawn do processo até a primeira resposta.
+
+Storage e faces são os fakes de benchmarks/fakes.py; --real-face usa o
+provider de faces configurado (FACE_PROVIDER) para medir o import e o
+cliente dele (sem chamadas de rede no startup). Com SQLite, um banco
+pequeno é semeado se ainda não existir.
+
+Uso (a partir de backend/):
+    python -m benchmarks.startup [--runs 10] [--path /events] [--top-imports 15]
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import env
+
+env.prepare()
+
+from benchmarks import stats  # noqa: E402
+
+BACKEND = Path(__file__).resolve().parent.parent
+FIELDS = ("import_ms", "startup_ms", "first_request_ms", "ready_ms")
+
+
+# ============================================================
+# PROCESSO FILHO (uma partida)
+# ============================================================
+
+def _child(args: argparse.Namespace) -> None:
+    import logging
+
+    started = time.perf_counter()
+    from app.main import app, resources
+    import_ms = (time.perf_counter() - started) * 1000
+
+    from benchmarks import fakes
+    from app.services import face
+    real_face = face._get_impl
+    fakes.install(env.ROOT / "storage", *fakes.profiles_from_env())
+    if args.real_face:
+        face._get_impl = real_face
+    # Logs de startup e de acesso não entram na medição
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def _run() -> dict:
+        import httpx
+
+        lifespan = app.router.lifespan_context(app)
+        t0 = time.perf_counter()
+        await lifespan.__aenter__()
+        startup_ms = (time.perf_counter() - t0) * 1000
+        try:
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                t0 = time.perf_counter()
+                response = await client.get(args.path)
+                first_request_ms = (time.perf_counter() - t0) * 1000
+            ready_ms = (time.time() - args.spawned_at) * 1000
+        finally:
+            await lifespan.__aexit__(None, None, None)
+        return {
+            "import_ms": import_ms,
+            "startup_ms": startup_ms,
+            "first_request_ms": first_request_ms,
+            "ready_ms": ready_ms,
+            "status": response.status_code,
+            "resources": {k: v for k, v in resources.timings.items() if k != "total"},
+        }
+
+    print(json.dumps(asyncio.run(_run())))
+
+
+# ============================================================
+# PROCESSO PAI (rodadas e relatório)
+# ============================================================
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _top_imports(stderr: str, limit: int) -> list[tuple[str, float]]:
+    """Módulos mais caros até o segundo nível de import (ex.: o que app.main importa), tempo cumulativo."""
+    top = []
+    for match in _IMPORTTIME.finditer(stderr):
+        cumulative_us, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent <= 3:
+            top.append((module, cumulative_us / 1000))
+    return sorted(top, key=lambda item: -item[1])[:limit]
+
+
+def _spawn(args: argparse.Namespace, importtime: bool) -> tuple[dict, str]:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-m", "benchmarks.startup", "--child", "--path", args.path, "--spawned-at", repr(time.time())]
+    if args.real_face:
+        cmd.append("--real-face")
+    out = subprocess.run(cmd, cwd=BACKEND, capture_output=True, text=True, timeout=120)
+    if out.returncode != 0:
+        raise RuntimeError(f"partida falhou ({out.returncode}):\n{out.stderr[-4000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+
+def _ensure_dataset() -> None:
+    if env.is_sqlite() and not (env.ROOT / "bench.db").exists():
+        from benchmarks import seed as seeding
+
+        asyncio.run(seeding._main(seeding.SeedConfig(events=1, photos=50, gallery=10, videos=0, metrics=0)))
+
+
+def _summary(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "p50_ms": round(stats.percentile(values, 50), 2),
+        "p90_ms": round(stats.percentile(values, 90), 2),
+        "max_ms": round(values[-1], 2),
+    }
+
+
+def _format(report: dict) -> str:
+    rows = [("medida", "p50 ms", "p90 ms", "max ms")]
+    for name, summary in list(report["phases"].items()) + [(f"  {k}", v) for k, v in report["resources"].items()]:
+        rows.append((name, f"{summary['p50_ms']:.1f}", f"{summary['p90_ms']:.1f}", f"{summary['max_ms']:.1f}"))
+    widths = [max(len(row[i]) for row in rows) for i in range(4)]
+    return "\n".join(
+        "  ".join(cell.rjust(width) if i else cell.ljust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/events", help="rota da primeira requisição")
+    parser.add_argument("--real-face", action="store_true", help="provider de faces real (FACE_PROVIDER)")
+    parser.add_argument("--top-imports", type=int, default=0, help="módulos mais caros no import (-X importtime)")
+    parser.add_argument("--output", type=Path, help="salva o relatório em JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args)
+        return 0
+
+    _ensure_dataset()
+    # Uma partida descartada: aquece o cache de bytecode e do sistema de arquivos
+    _spawn(args, importtime=False)
+    runs = [_spawn(args, importtime=False)[0] for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "path": args.path,
+        "statuses": sorted({run["status"] for run in runs}),
+        "phases": {field: _summary([run[field] for run in runs]) for field in FIELDS},
+        "resources": {
+            name: _summary([run["resources"].get(name, 0.0) for run in runs])
+            for name in runs[0]["resources"]
+        },
+    }
+    print(_format(report))
+    print(f"\nstatus da primeira requisicao: {report['statuses']}")
+
+    if args.top_imports:
+        _, stderr = _spawn(args, importtime=True)
+        report["top_imports"] = _top_imports(stderr, args.top_imports)
+        print("\nImports mais caros (cumulativo, ms):")
+        for module, ms in report["top_imports"]:
+            print(f"  {module:<40} {ms:8.1f}")
+
+    if args.output:
+        stats.save(args.output, report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
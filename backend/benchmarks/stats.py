@@ -0,0 +1,138 @@
+"""
+stats.py - Estatísticas, relatório e comparação com o baseline
+
+Cada cenário vira um dict com vazão (req/s), latências p50/p95/p99/max em
+ms, erros por status e o pico de memória (RSS) durante o cenário. O
+baseline é o mesmo JSON de uma rodada anterior (--save-baseline).
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Optional
+
+# Métricas comparadas com o baseline: (campo, maior_e_melhor)
+COMPARED = (
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("rss_peak_mb", False),
+)
+# Aumento absoluto da taxa de erro tolerado (1 ponto percentual)
+ERROR_RATE_SLACK = 0.01
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Percentil com interpolação linear (mesmo método do numpy.percentile)."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return sorted_values[low]
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies_s: list[float], statuses: dict[str, int], elapsed_s: float,
+              rss_start_mb: Optional[float], rss_peak_mb: Optional[float]) -> dict:
+    values = sorted(v * 1000 for v in latencies_s)
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(len(values) / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+        "rss_start_mb": rss_start_mb,
+        "rss_peak_mb": rss_peak_mb,
+    }
+
+
+# ============================================================
+# RELATÓRIO
+# ============================================================
+
+_COLUMNS = (
+    ("cenario", "name", "{}"),
+    ("req", "requests", "{}"),
+    ("erros", "errors", "{}"),
+    ("req/s", "throughput_rps", "{:.1f}"),
+    ("p50 ms", "p50_ms", "{:.1f}"),
+    ("p95 ms", "p95_ms", "{:.1f}"),
+    ("p99 ms", "p99_ms", "{:.1f}"),
+    ("max ms", "max_ms", "{:.1f}"),
+    ("rss pico MB", "rss_peak_mb", "{:.1f}"),
+)
+
+
+def _cell(fmt: str, value) -> str:
+    return "-" if value is None else fmt.format(value)
+
+
+def format_table(results: dict[str, dict]) -> str:
+    rows = [[title for title, _, _ in _COLUMNS]]
+    for name, result in results.items():
+        rows.append([_cell(fmt, name if field == "name" else result.get(field)) for _, field, fmt in _COLUMNS])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(_COLUMNS))]
+    lines = ["  ".join(cell.rjust(width) if i else cell.ljust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+             for row in rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+# ============================================================
+# BASELINE
+# ============================================================
+
+def load(path: Path) -> Optional[dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save(path: Path, report: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True, default=str))
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> tuple[str, list[str]]:
+    """
+    Compara cenário a cenário. Retorna (texto, regressões): uma regressão é
+    uma métrica pior que o baseline além da tolerância (ex.: 0.10 = 10%).
+    """
+    lines, regressions = [], []
+    if current.get("params") != baseline.get("params"):
+        lines.append("AVISO: parametros diferentes do baseline; comparacao pode nao ser valida")
+        lines.append(f"  baseline: {baseline.get('params')}")
+        lines.append(f"  atual:    {current.get('params')}")
+
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            lines.append(f"{name}: sem baseline")
+            continue
+        cells = []
+        for field, higher_is_better in COMPARED:
+            old, new = base.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old
+            worse = -delta if higher_is_better else delta
+            mark = ""
+            if worse > tolerance:
+                mark = " !"
+                regressions.append(f"{name}.{field}: {old} -> {new} ({delta:+.1%})")
+            cells.append(f"{field} {old} -> {new} ({delta:+.1%}){mark}")
+        if result.get("error_rate", 0) > base.get("error_rate", 0) + ERROR_RATE_SLACK:
+            regressions.append(f"{name}.error_rate: {base.get('error_rate')} -> {result['error_rate']}")
+        lines.append(f"{name}: " + "; ".join(cells))
+    return "\n".join(lines), regressions
@@ -0,0 +1,26 @@
+"""add face_collection_id to events
+
+Revision ID: 3c9e2a7f41b6
+Revises: dd213c663f23
+Create Date: 2026-10-19 12:05:41.218734+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e2a7f41b6'
+down_revision: Union[str, None] = 'dd213c663f23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('face_collection_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('events', 'face_collection_id')
@@ -0,0 +1,28 @@
+"""add rendition keys to photos
+
+Revision ID: 5a2b7e19c0d4
+Revises: 8f41d2c7a9e3
+Create Date: 2026-10-19 16:03:47.102938+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2b7e19c0d4'
+down_revision: Union[str, None] = '8f41d2c7a9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('thumb_key', sa.String(), nullable=True))
+    op.add_column('photos', sa.Column('web_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photos', 'web_key')
+    op.drop_column('photos', 'thumb_key')
@@ -0,0 +1,44 @@
+"""create storage_objects catalog
+
+Revision ID: 8f41d2c7a9e3
+Revises: 3c9e2a7f41b6
+Create Date: 2026-10-19 14:22:09.513827+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f41d2c7a9e3'
+down_revision: Union[str, None] = '3c9e2a7f41b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A tabela nasce vazia: a primeira execucao do reconciliador popula o catalogo
+    op.create_table(
+        'storage_objects',
+        sa.Column('bucket', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('prefix', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'key'),
+    )
+    op.create_index(
+        'ix_storage_objects_bucket_prefix_key',
+        'storage_objects',
+        ['bucket', 'prefix', 'key'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_storage_objects_bucket_prefix_key', table_name='storage_objects')
+    op.drop_table('storage_objects')
@@ -0,0 +1,28 @@
+"""add retention policy to events
+
+Revision ID: b91e4f6a2d38
+Revises: 5a2b7e19c0d4
+Create Date: 2026-10-19 18:41:12.664019+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b91e4f6a2d38'
+down_revision: Union[str, None] = '5a2b7e19c0d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('retention_days', sa.Integer(), nullable=True))
+    op.add_column('events', sa.Column('purged_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('events', 'purged_at')
+    op.drop_column('events', 'retention_days')
@@ -0,0 +1,27 @@
+"""add face ids to photos
+
+Revision ID: c4e8a1d7f203
+Revises: b91e4f6a2d38
+Create Date: 2026-10-19 21:12:05.318442+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d7f203'
+down_revision: Union[str, None] = 'b91e4f6a2d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('face_ids', postgresql.ARRAY(sa.String()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photos', 'face_ids')
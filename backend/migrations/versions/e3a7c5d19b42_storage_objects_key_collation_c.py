@@ -0,0 +1,40 @@
+"""storage_objects key collation C
+
+Revision ID: e3a7c5d19b42
+Revises: c4e8a1d7f203
+Create Date: 2026-10-19 22:40:17.604215+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c5d19b42'
+down_revision: Union[str, None] = 'c4e8a1d7f203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reconstroi a PK (bucket, key) em ordem de bytes: a listagem por prefixo
+    # vira um range scan no indice, ja na ordem do ORDER BY key
+    op.alter_column(
+        'storage_objects',
+        'key',
+        type_=sa.String(collation='C'),
+        existing_type=sa.String(),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'storage_objects',
+        'key',
+        type_=sa.String(),
+        existing_type=sa.String(collation='C'),
+        existing_nullable=False,
+    )